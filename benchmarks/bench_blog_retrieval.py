@@ -0,0 +1,104 @@
+"""
+Benchmark blog context retrieval latency as the corpus grows.
+
+Compares querying the persistent collection directly against the previous
+approach of re-embedding every stored chunk per /blog command. A deterministic
+local embedding stands in for OpenAI so the run is offline and repeatable.
+
+Usage:
+    python -m benchmarks.bench_blog_retrieval --sizes 500 1000 2000 4000
+"""
+import argparse
+import hashlib
+import json
+import random
+import time
+from typing import List
+
+import chromadb
+from langchain_chroma import Chroma
+from langchain_core.embeddings import Embeddings
+
+from src.crud.get_semantic_data import get_relevant_docs
+
+WORDS = ["remittance", "payment", "api", "webhook", "compliance", "currency", "transfer",
+         "ledger", "settlement", "fraud", "kyc", "payout", "invoice", "refund", "latency"]
+
+
+class CountingEmbeddings(Embeddings):
+    """Deterministic bag-of-words embedding that counts how many texts it embeds."""
+
+    def __init__(self, dim: int = 256):
+        self.dim = dim
+        self.embedded_texts = 0
+
+    def _embed(self, text: str) -> List[float]:
+        vector = [0.0] * self.dim
+        for word in text.lower().split():
+            bucket = int(hashlib.md5(word.encode()).hexdigest(), 16) % self.dim
+            vector[bucket] += 1.0
+        norm = sum(v * v for v in vector) ** 0.5 or 1.0
+        return [v / norm for v in vector]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.embedded_texts += len(texts)
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        self.embedded_texts += 1
+        return self._embed(text)
+
+
+def make_corpus(size: int, seed: int = 7) -> List[str]:
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(WORDS) for _ in range(40)) for _ in range(size)]
+
+
+def run(sizes: List[int], queries: int) -> List[dict]:
+    results = []
+    for size in sizes:
+        embeddings = CountingEmbeddings()
+        vector_db = Chroma(
+            collection_name=f"bench_{size}",
+            embedding_function=embeddings,
+            client=chromadb.EphemeralClient(),
+        )
+        corpus = make_corpus(size)
+        vector_db.add_texts(corpus)
+
+        embeddings.embedded_texts = 0
+        start = time.perf_counter()
+        for _ in range(queries):
+            get_relevant_docs(vector_db, "payment compliance", k=5)
+        direct_ms = (time.perf_counter() - start) * 1000 / queries
+        direct_embedded = embeddings.embedded_texts / queries
+
+        embeddings.embedded_texts = 0
+        start = time.perf_counter()
+        for _ in range(queries):
+            # Previous behaviour: every stored chunk is embedded again per command
+            embeddings.embed_documents(vector_db.get(include=["documents"])["documents"])
+            embeddings.embed_query("payment compliance")
+        legacy_ms = (time.perf_counter() - start) * 1000 / queries
+        legacy_embedded = embeddings.embedded_texts / queries
+
+        results.append({
+            "corpus_size": size,
+            "direct_ms": round(direct_ms, 3),
+            "direct_texts_embedded": direct_embedded,
+            "legacy_ms": round(legacy_ms, 3),
+            "legacy_texts_embedded": legacy_embedded,
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[500, 1000, 2000, 4000])
+    parser.add_argument("--queries", type=int, default=20)
+    args = parser.parse_args()
+    print(json.dumps(run(args.sizes, args.queries), indent=2))
+
+
+if __name__ == "__main__":
+    main()
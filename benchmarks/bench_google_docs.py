@@ -0,0 +1,78 @@
+"""
+Measure per-blog Google Docs publish latency against a local API stub.
+
+Compares three ways of publishing the blogs of one /blog command:
+
+- ``rebuild``: the old path, building both services (and a new connection)
+  for every blog, then three sequential calls per blog,
+- ``cached``: ``GoogleDocsPublisher.upload`` per blog on services built once,
+- ``batch``: ``GoogleDocsPublisher.upload_many`` with batch HTTP requests.
+
+Usage:
+    python -m benchmarks.bench_google_docs --blogs 2 5 10 --latency 0.05 --connect-latency 0.1
+"""
+import argparse
+import json
+import time
+
+from googleapiclient.discovery import build
+
+from benchmarks.fakes import FakeGoogleHttp
+from src.publishers.google_docs import SHARE_PERMISSION, GoogleDocsPublisher
+
+CONTENT = "Paragraph about cross-border payments. " * 60
+
+
+def _rebuild_per_blog(blogs, make_http):
+    for title, content in blogs:
+        http = make_http()
+        docs_service = build("docs", "v1", http=http, static_discovery=True, cache_discovery=False)
+        drive_service = build("drive", "v3", http=http, static_discovery=True, cache_discovery=False)
+        doc_id = docs_service.documents().create(body={"title": title}).execute()["documentId"]
+        requests = [{"insertText": {"location": {"index": 1}, "text": content}}]
+        docs_service.documents().batchUpdate(documentId=doc_id, body={"requests": requests}).execute()
+        drive_service.permissions().create(fileId=doc_id, body=SHARE_PERMISSION).execute()
+
+
+def run(blog_counts, latency: float, connect_latency: float) -> dict:
+    make_http = lambda: FakeGoogleHttp(latency=latency, connect_latency=connect_latency)
+    results = []
+    for count in blog_counts:
+        blogs = [(f"Blog {i}", CONTENT) for i in range(count)]
+        modes = {
+            "rebuild": lambda: _rebuild_per_blog(blogs, make_http),
+            "cached": lambda publisher: [publisher.upload(title, content) for title, content in blogs],
+            "batch": lambda publisher: publisher.upload_many(blogs),
+        }
+        for mode, publish in modes.items():
+            FakeGoogleHttp.reset()
+            start = time.perf_counter()
+            if mode == "rebuild":
+                publish()
+            else:
+                # A fresh publisher per mode, so each pays its own connection once
+                publish(GoogleDocsPublisher(http_factory=make_http))
+            elapsed = time.perf_counter() - start
+            results.append({
+                "blogs": count,
+                "mode": mode,
+                "wall_seconds": round(elapsed, 3),
+                "per_blog_seconds": round(elapsed / count, 3),
+                "http_round_trips": FakeGoogleHttp.round_trips,
+                "api_calls": sum(count for kind, count in FakeGoogleHttp.requests.items() if kind != "batch"),
+                "connections": FakeGoogleHttp.connections,
+            })
+    return {"latency_seconds": latency, "connect_latency_seconds": connect_latency, "results": results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--blogs", type=int, nargs="+", default=[2, 5, 10])
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--connect-latency", type=float, default=0.1)
+    args = parser.parse_args()
+    print(json.dumps(run(args.blogs, args.latency, args.connect_latency), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Measure HTML cleaning throughput in MB/s.
+
+Cleans a batch of synthetic Confluence-style pages (headings, tables, lists,
+macros, entities, inline scripts) three ways:
+
+- ``html.parser``: the old path, BeautifulSoup per text on one core,
+- ``lxml``: ``preprocess_many`` with the lxml backend, inline,
+- ``lxml_pool``: ``preprocess_many`` with the lxml backend on worker processes.
+
+Also reports how many outputs match the ``html.parser`` output exactly.
+
+Usage:
+    python -m benchmarks.bench_preprocess --pages 2000 --page-kb 20 --workers 4
+"""
+import argparse
+import json
+import random
+import time
+from unittest import mock
+
+from settings import config
+from src.data_preprocessors.preprocess_data import preprocess_many
+
+WORDS = ("payment settlement merchant refund ledger payout currency invoice dispute "
+         "reconciliation webhook latency onboarding compliance").split()
+
+
+def _sentence(rng: random.Random) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 18))).capitalize() + "."
+
+
+def _page(rng: random.Random, target_bytes: int) -> str:
+    parts = ['<div class="confluence-page"><style>.x{color:red}</style>']
+    while sum(len(part) for part in parts) < target_bytes:
+        kind = rng.random()
+        if kind < 0.15:
+            parts.append(f"<h2 id=\"s{rng.randint(0, 999)}\">{_sentence(rng)}</h2>")
+        elif kind < 0.3:
+            cells = "".join(f"<td><p>{rng.choice(WORDS)} &amp; {rng.randint(1, 99)}</p></td>" for _ in range(4))
+            parts.append(f"<table><tbody>{''.join(f'<tr>{cells}</tr>' for _ in range(3))}</tbody></table>")
+        elif kind < 0.45:
+            parts.append("<ul>" + "".join(f"<li>{_sentence(rng)}</li>" for _ in range(3)) + "</ul>")
+        elif kind < 0.5:
+            parts.append('<ac:structured-macro ac:name="info"><ac:rich-text-body>'
+                         f"<p>{_sentence(rng)}</p></ac:rich-text-body></ac:structured-macro>")
+        elif kind < 0.53:
+            parts.append("<script>window.analytics && analytics.track('view');</script>")
+        else:
+            parts.append(f"<p>{_sentence(rng)} <strong>{rng.choice(WORDS)}</strong>&nbsp;{_sentence(rng)}<br/></p>\n")
+    parts.append("</div>")
+    return "".join(parts)
+
+
+def run(pages: int, page_kb: float, workers: int, seed: int = 0) -> dict:
+    rng = random.Random(seed)
+    texts = [_page(rng, int(page_kb * 1024)) for _ in range(pages)]
+    megabytes = sum(len(text.encode("utf-8")) for text in texts) / 1e6
+
+    modes = {
+        "html.parser": lambda: preprocess_many(texts, backend="html.parser", workers=1),
+        "lxml": lambda: preprocess_many(texts, backend="lxml", workers=1),
+        "lxml_pool": lambda: preprocess_many(texts, backend="lxml", workers=workers),
+    }
+    results, outputs = [], {}
+    # Force the pool for lxml_pool whatever the batch size
+    with mock.patch.object(config, "PREPROCESS_POOL_MIN_CHARS", 0):
+        for mode, clean in modes.items():
+            start = time.perf_counter()
+            outputs[mode] = clean()
+            elapsed = time.perf_counter() - start
+            results.append({
+                "mode": mode,
+                "seconds": round(elapsed, 3),
+                "mb_per_second": round(megabytes / elapsed, 2),
+                "matches_html_parser": sum(a == b for a, b in zip(outputs[mode], outputs["html.parser"])),
+            })
+    return {"pages": pages, "megabytes": round(megabytes, 2), "workers": workers, "results": results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=2000)
+    parser.add_argument("--page-kb", type=float, default=20)
+    parser.add_argument("--workers", type=int, default=config.PREPROCESS_WORKERS)
+    args = parser.parse_args()
+    print(json.dumps(run(args.pages, args.page_kb, args.workers), indent=2))
+
+
+if __name__ == "__main__":
+    main()
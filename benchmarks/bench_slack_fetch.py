@@ -0,0 +1,78 @@
+"""
+Show that incremental Slack fetching scales with new messages, not the window.
+
+Runs ``fetch_slack_messages_multi`` against an in-memory Slack workspace: a
+first run over the full window, then runs after a handful of new messages,
+recording how many ``conversations.history`` requests each one makes.
+
+Usage:
+    python -m benchmarks.bench_slack_fetch --window-messages 5000 --new-messages 10
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from unittest import mock
+
+from benchmarks.fakes import FakeSlackWebClient, FakeSocketModeClient
+
+CHANNEL = "CBENCH"
+GENERAL_TOKEN = "xoxb-general"
+SUPPORT_TOKEN = "xoxb-support"
+
+
+def _message(ts: float, bot_user: str) -> dict:
+    return {"ts": f"{ts:.6f}", "text": f"<@{bot_user}> update about payments at {ts:.0f}"}
+
+
+def run(window_messages: int, new_messages: int, rounds: int) -> dict:
+    FakeSlackWebClient.reset()
+    with mock.patch("slack_sdk.WebClient", FakeSlackWebClient), \
+            mock.patch("slack_sdk.socket_mode.SocketModeClient", FakeSocketModeClient):
+        from src.data_loaders import slack_fetcher
+
+    general_bot = FakeSlackWebClient(GENERAL_TOKEN).auth_test()["user_id"]
+    support_bot = FakeSlackWebClient(SUPPORT_TOKEN).auth_test()["user_id"]
+    now = time.time()
+    span = 6 * 24 * 3600
+    FakeSlackWebClient.channels[CHANNEL] = [
+        _message(now - span + i * span / window_messages, general_bot if i % 2 else support_bot)
+        for i in range(window_messages)
+    ]
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        watermarks_path = os.path.join(tmp, "watermarks.json")
+        for round_number in range(rounds + 1):
+            if round_number:
+                base = max(float(m["ts"]) for m in FakeSlackWebClient.channels[CHANNEL]) + 1
+                FakeSlackWebClient.channels[CHANNEL].extend(
+                    _message(base + i * 0.001, general_bot) for i in range(new_messages)
+                )
+            FakeSlackWebClient.requests = {}
+            start = time.perf_counter()
+            fetched = slack_fetcher.fetch_slack_messages_multi(
+                CHANNEL, [GENERAL_TOKEN, SUPPORT_TOKEN], watermarks_path=watermarks_path
+            )
+            results.append({
+                "run": "initial" if round_number == 0 else f"incremental_{round_number}",
+                "history_requests": FakeSlackWebClient.requests.get("conversations.history", 0),
+                "messages_general": len(fetched[GENERAL_TOKEN]),
+                "messages_support": len(fetched[SUPPORT_TOKEN]),
+                "seconds": round(time.perf_counter() - start, 4),
+            })
+    return {"window_messages": window_messages, "new_messages_per_run": new_messages, "runs": results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--window-messages", type=int, default=5000)
+    parser.add_argument("--new-messages", type=int, default=10)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+    print(json.dumps(run(args.window_messages, args.new_messages, args.rounds), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Load test /support/chat against a local fake LLM server.
+
+Fires concurrent requests at the FastAPI route in-process and reports wall
+time alongside the fake server's peak number of in-flight completions. With a
+non-blocking endpoint, N concurrent requests finish in about one model latency
+and peak concurrency reaches N; a blocking endpoint queues them one by one.
+
+Usage:
+    python -m benchmarks.bench_support_async --concurrency 1 8 32 --latency 0.5
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.fakes import FakeOpenAIServer
+
+
+async def _fire(app, requests: int) -> float:
+    import httpx
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=300) as client:
+        start = time.perf_counter()
+        responses = await asyncio.gather(*[
+            client.post("/support/chat", json={"message": f"what is remido? #{i}", "session_id": f"bench-{i}"})
+            for i in range(requests)
+        ])
+        elapsed = time.perf_counter() - start
+    failed = [r for r in responses if r.status_code != 200]
+    if failed:
+        raise RuntimeError(f"{len(failed)} requests failed, first: {failed[0].status_code} {failed[0].text}")
+    return elapsed
+
+
+def run(concurrency_levels, latency: float) -> dict:
+    repo_root = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp, FakeOpenAIServer(latency=latency) as server:
+        os.environ["OPENAI_BASE_URL"] = server.base_url
+        os.environ.setdefault("OPEN_API_KEY", "sk-bench")
+        # The answer cache embeds questions; keep that offline
+        os.environ.setdefault("EMBEDDING_PROVIDER", "hashing")
+        os.environ["CHROMA_DB_PATH"] = os.path.join(tmp, "chroma")
+        os.environ["ANONYMIZED_TELEMETRY"] = "False"
+        # Measure endpoint concurrency, not the gateway's default token budget
+        os.environ.setdefault("LLM_RPM_LIMIT", "0")
+        os.environ.setdefault("LLM_TPM_LIMIT", "0")
+        # Relative state paths (Chroma, caches, sessions) land in the temporary directory
+        sys.path.insert(0, repo_root)
+        os.chdir(tmp)
+        try:
+            return _run_levels(concurrency_levels, latency, server)
+        finally:
+            os.chdir(repo_root)
+
+
+def _run_levels(concurrency_levels, latency: float, server: FakeOpenAIServer) -> dict:
+    from fastapi import FastAPI
+    from src.routes.support_routes import router
+
+    app = FastAPI()
+    app.include_router(router)
+
+    async def run_levels():
+        # One event loop for every level: the bot's pooled async client is bound to it
+        results = []
+        for concurrency in concurrency_levels:
+            server.peak_in_flight = 0
+            elapsed = await _fire(app, concurrency)
+            results.append({
+                "concurrent_requests": concurrency,
+                "wall_seconds": round(elapsed, 3),
+                "serial_estimate_seconds": round(concurrency * latency, 3),
+                "peak_in_flight_llm_calls": server.peak_in_flight,
+            })
+        return results
+
+    results = asyncio.run(run_levels())
+    return {"llm_latency_seconds": latency, "results": results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--latency", type=float, default=0.5)
+    args = parser.parse_args()
+    print(json.dumps(run(args.concurrency, args.latency), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,416 @@
+"""
+Local stand-ins for the external services the bot talks to.
+
+The fakes mirror the response shapes of the real clients closely enough for the
+code under ``src/`` to run unmodified, and count the requests they receive so
+benchmarks can report how much remote work a code path performs.
+"""
+import hashlib
+import itertools
+import json
+import re
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+
+class FakeSlackWebClient:
+    """
+    In-memory replacement for ``slack_sdk.WebClient``.
+
+    Channel history and bot identities are class-level so every client created
+    by the code under test sees the same workspace, like the real API would.
+    """
+
+    channels: Dict[str, List[dict]] = {}
+    bot_users: Dict[Optional[str], str] = {}
+    requests: Dict[str, int] = {}
+    latency: float = 0.0
+
+    def __init__(self, token: Optional[str] = None, **kwargs):
+        self.token = token
+
+    @classmethod
+    def reset(cls, latency: float = 0.0) -> None:
+        cls.channels = {}
+        cls.bot_users = {}
+        cls.requests = {}
+        cls.latency = latency
+
+    @classmethod
+    def _record(cls, method: str) -> None:
+        cls.requests[method] = cls.requests.get(method, 0) + 1
+        if cls.latency:
+            time.sleep(cls.latency)
+
+    def auth_test(self) -> dict:
+        self._record("auth.test")
+        user_id = self.bot_users.setdefault(self.token, f"UBOT{len(self.bot_users)}")
+        return {"ok": True, "user_id": user_id}
+
+    def conversations_history(self, channel: str, cursor: Optional[str] = None, limit: int = 100,
+                              oldest: Optional[str] = None, **kwargs) -> dict:
+        self._record("conversations.history")
+        # Slack returns newest first and treats ``oldest`` as exclusive
+        history = sorted(self.channels.get(channel, []), key=lambda m: float(m["ts"]), reverse=True)
+        if oldest is not None:
+            history = [m for m in history if float(m["ts"]) > float(oldest)]
+        start = int(cursor) if cursor else 0
+        page = history[start:start + limit]
+        next_cursor = str(start + limit) if start + limit < len(history) else ""
+        return {"ok": True, "messages": page, "response_metadata": {"next_cursor": next_cursor}}
+
+    def chat_postMessage(self, channel: str, text: str, **kwargs) -> dict:
+        self._record("chat.postMessage")
+        return {"ok": True, "channel": channel, "ts": f"{time.time():.6f}"}
+
+    def chat_update(self, channel: str, ts: str, text: str, **kwargs) -> dict:
+        self._record("chat.update")
+        return {"ok": True, "channel": channel, "ts": ts}
+
+
+class FakeSocketModeClient:
+    def __init__(self, *args, **kwargs):
+        pass
+
+
+class FakeConfluence:
+    """
+    In-memory replacement for ``atlassian.Confluence``.
+
+    Pages live in class-level storage, keyed by ID with a space, title, body and
+    version number, so the sync, loader and publisher share one site. CQL
+    queries list the pages of the quoted space; every call sleeps ``latency``.
+    """
+
+    pages: Dict[str, dict] = {}
+    requests: Dict[str, int] = {}
+    latency: float = 0.0
+    _ids = itertools.count(1)
+    _lock = threading.Lock()
+
+    def __init__(self, url: Optional[str] = None, username: Optional[str] = None,
+                 password: Optional[str] = None, **kwargs):
+        self.url = url
+
+    @classmethod
+    def reset(cls, latency: float = 0.0) -> None:
+        cls.pages = {}
+        cls.requests = {}
+        cls.latency = latency
+
+    @classmethod
+    def _record(cls, method: str) -> None:
+        with cls._lock:
+            cls.requests[method] = cls.requests.get(method, 0) + 1
+        if cls.latency:
+            time.sleep(cls.latency)
+
+    @classmethod
+    def put_page(cls, space: str, title: str, body: str, page_id: Optional[str] = None,
+                 parent_id: Optional[str] = None) -> str:
+        """Create a page, or bump the version of an existing one."""
+        with cls._lock:
+            page_id = page_id or f"9{next(cls._ids):06d}"
+            page = cls.pages.get(page_id)
+            version = page["version"] + 1 if page else 1
+            cls.pages[page_id] = {"id": page_id, "space": space, "title": title, "body": body,
+                                  "version": version, "parent_id": parent_id}
+        return page_id
+
+    @classmethod
+    def _shape(cls, page: dict) -> dict:
+        return {
+            "id": page["id"],
+            "title": page["title"],
+            "body": {"storage": {"value": page["body"]}},
+            "version": {"number": page["version"]},
+            "space": {"key": page["space"]},
+        }
+
+    def cql(self, cql: str, start: int = 0, limit: int = 25, expand: Optional[str] = None, **kwargs) -> dict:
+        self._record("cql")
+        match = re.search(r'space = "([^"]*)"', cql)
+        pages = sorted((p for p in self.pages.values() if not match or p["space"] == match.group(1)),
+                       key=lambda p: p["id"])
+        results = [{"content": {"id": p["id"], "version": {"number": p["version"]}}}
+                   for p in pages[start:start + limit]]
+        return {"results": results, "start": start, "limit": limit, "size": len(results)}
+
+    def get_page_by_id(self, page_id: str, expand: Optional[str] = None, **kwargs) -> dict:
+        self._record("get_page_by_id")
+        return self._shape(self.pages[page_id])
+
+    def get_page_by_title(self, space: str, title: str, expand: Optional[str] = None, **kwargs) -> Optional[dict]:
+        self._record("get_page_by_title")
+        for page in self.pages.values():
+            if page["space"] == space and page["title"] == title:
+                return self._shape(page)
+        return None
+
+    def update_page(self, page_id: str, title: str, body: str, parent_id: Optional[str] = None, **kwargs) -> dict:
+        self._record("update_page")
+        page = self.pages[page_id]
+        self.put_page(page["space"], title, body, page_id=page_id, parent_id=page["parent_id"])
+        return self._shape(self.pages[page_id])
+
+    def create_page(self, space: str, title: str, body: str, parent_id: Optional[str] = None, **kwargs) -> dict:
+        self._record("create_page")
+        return self._shape(self.pages[self.put_page(space, title, body, parent_id=parent_id)])
+
+
+class FakeConfluenceLoader:
+    """
+    Replacement for LangChain's ``ConfluenceLoader`` reading ``FakeConfluence`` pages.
+
+    Returns one Document per page with the plain text of its body and the
+    metadata keys the real loader sets. Each ``load`` counts as one request.
+    """
+
+    def __init__(self, url: Optional[str] = None, page_ids: Optional[List[str]] = None,
+                 space_key: Optional[str] = None, **kwargs):
+        self.url = url
+        self.page_ids = page_ids
+        self.space_key = space_key
+
+    def load(self) -> list:
+        from langchain_core.documents import Document
+
+        FakeConfluence._record("loader.load")
+        if self.page_ids is not None:
+            pages = [FakeConfluence.pages[page_id] for page_id in self.page_ids if page_id in FakeConfluence.pages]
+        else:
+            pages = [page for page in FakeConfluence.pages.values() if page["space"] == self.space_key]
+        return [
+            Document(
+                page_content=" ".join(re.sub(r"<[^>]+>", " ", page["body"]).split()),
+                metadata={"title": page["title"], "id": page["id"],
+                          "source": f"{self.url}/pages/viewpage.action?pageId={page['id']}"},
+            )
+            for page in pages
+        ]
+
+
+class FakeOpenAIServer:
+    """
+    Minimal OpenAI-compatible HTTP server for chat completions and embeddings.
+
+    Each request sleeps for ``latency`` seconds to stand in for model time.
+    Streaming requests emit server-sent events. With ``rpm_limit`` set, requests
+    over the limit in a rolling minute get a 429 with a Retry-After header, like
+    the real API. The server records request counts and peak concurrency so a
+    benchmark can tell whether calls overlapped or queued.
+
+    Point clients at ``base_url`` (e.g. via OPENAI_BASE_URL).
+    """
+
+    def __init__(self, latency: float = 0.5, rpm_limit: Optional[int] = None, embedding_dim: int = 64,
+                 reply: str = "Title: A Benchmark Blog\n\nThis is a generated answer from the fake model."):
+        self.latency = latency
+        self.rpm_limit = rpm_limit
+        self.embedding_dim = embedding_dim
+        self.reply = reply
+        self.requests: Dict[str, int] = {}
+        self.rate_limited = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self._recent = deque()
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}/v1"
+
+    def __enter__(self) -> "FakeOpenAIServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _admit(self, path: str) -> Optional[float]:
+        """Record a request; return a retry-after delay if it is rate limited."""
+        with self._lock:
+            now = time.monotonic()
+            while self._recent and now - self._recent[0] > 60:
+                self._recent.popleft()
+            if self.rpm_limit and len(self._recent) >= self.rpm_limit:
+                self.rate_limited += 1
+                return max(0.05, 60 - (now - self._recent[0]))
+            self._recent.append(now)
+            self.requests[path] = self.requests.get(path, 0) + 1
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            return None
+
+    def _release(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+
+    def _embedding(self, text: str) -> List[float]:
+        vector = [0.0] * self.embedding_dim
+        for word in text.lower().split():
+            vector[int(hashlib.md5(word.encode()).hexdigest(), 16) % self.embedding_dim] += 1.0
+        norm = sum(v * v for v in vector) ** 0.5 or 1.0
+        return [v / norm for v in vector]
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _json(self, status: int, body: dict, headers: Optional[Dict[str, str]] = None) -> None:
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length) or b"{}")
+                path = self.path.split("?")[0]
+                retry_after = fake._admit(path)
+                if retry_after is not None:
+                    self._json(429, {"error": {"message": "Rate limit reached", "type": "requests",
+                                               "code": "rate_limit_exceeded"}},
+                               {"Retry-After": f"{retry_after:.2f}"})
+                    return
+                try:
+                    if path.endswith("/embeddings"):
+                        inputs = body.get("input", [])
+                        inputs = [inputs] if isinstance(inputs, str) else inputs
+                        # Token-id inputs (tiktoken) are embedded by their string form
+                        data = [{"object": "embedding", "index": i, "embedding": fake._embedding(str(text))}
+                                for i, text in enumerate(inputs)]
+                        self._json(200, {"object": "list", "data": data, "model": body.get("model"),
+                                         "usage": {"prompt_tokens": 0, "total_tokens": 0}})
+                    elif path.endswith("/chat/completions"):
+                        time.sleep(fake.latency)
+                        if body.get("stream"):
+                            self._stream(body)
+                        else:
+                            self._json(200, {
+                                "id": "chatcmpl-fake", "object": "chat.completion", "created": int(time.time()),
+                                "model": body.get("model"),
+                                "choices": [{"index": 0, "finish_reason": "stop",
+                                             "message": {"role": "assistant", "content": fake.reply}}],
+                                "usage": {"prompt_tokens": 100, "completion_tokens": 50, "total_tokens": 150},
+                            })
+                    else:
+                        self._json(404, {"error": {"message": f"Unknown path {path}"}})
+                finally:
+                    fake._release()
+
+            def _stream(self, body: dict) -> None:
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                for word in fake.reply.split(" "):
+                    chunk = {"id": "chatcmpl-fake", "object": "chat.completion.chunk", "created": int(time.time()),
+                             "model": body.get("model"),
+                             "choices": [{"index": 0, "delta": {"content": word + " "}, "finish_reason": None}]}
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.close_connection = True
+
+        return Handler
+
+
+class FakeGoogleHttp:
+    """
+    Stand-in for an ``httplib2.Http`` talking to the Google Docs and Drive APIs.
+
+    Handles documents.create, documents.batchUpdate, permissions.create and
+    multipart batch requests for both APIs. Every round trip sleeps
+    ``latency`` seconds; the first request on an instance also pays
+    ``connect_latency`` to stand in for a new TLS connection. Counters are
+    class-level so a benchmark sees the traffic of every instance.
+    """
+
+    requests: Dict[str, int] = {}
+    round_trips = 0
+    connections = 0
+    _ids = itertools.count()
+    _lock = threading.Lock()
+
+    def __init__(self, latency: float = 0.05, connect_latency: float = 0.1):
+        self.latency = latency
+        self.connect_latency = connect_latency
+        self._connected = False
+
+    @classmethod
+    def reset(cls) -> None:
+        cls.requests = {}
+        cls.round_trips = 0
+        cls.connections = 0
+
+    @classmethod
+    def _record(cls, kind: str) -> None:
+        with cls._lock:
+            cls.requests[kind] = cls.requests.get(kind, 0) + 1
+
+    def _answer(self, method: str, path: str) -> dict:
+        path = path.split("?")[0]
+        if path.endswith("/v1/documents"):
+            self._record("documents.create")
+            return {"documentId": f"doc-{next(self._ids)}"}
+        match = re.search(r"/v1/documents/([^/:]+):batchUpdate$", path)
+        if match:
+            self._record("documents.batchUpdate")
+            return {"documentId": match.group(1), "replies": [{}]}
+        if re.search(r"/drive/v3/files/[^/]+/permissions$", path):
+            self._record("permissions.create")
+            return {"kind": "drive#permission", "id": "anyoneWithLink"}
+        raise ValueError(f"Unexpected Google API call {method} {path}")
+
+    def _batch(self, body: str, content_type: str):
+        boundary = re.search(r'boundary="?([^";]+)"?', content_type).group(1)
+        parts = [part for part in body.split(f"--{boundary}") if part.strip() and part.strip() != "--"]
+        out_boundary = "batch_fake_boundary"
+        chunks = []
+        for part in parts:
+            content_id = re.search(r"Content-ID: <(.+?)>", part).group(1)
+            method, path = re.search(r"\n(GET|POST|PATCH|PUT|DELETE) (\S+) HTTP/1.1", part).groups()
+            data = json.dumps(self._answer(method, path))
+            chunks.append(
+                f"--{out_boundary}\r\nContent-Type: application/http\r\nContent-ID: <response-{content_id}>\r\n\r\n"
+                f"HTTP/1.1 200 OK\r\nContent-Type: application/json; charset=UTF-8\r\n\r\n{data}\r\n"
+            )
+        content = "".join(chunks) + f"--{out_boundary}--\r\n"
+        return f"multipart/mixed; boundary={out_boundary}", content
+
+    def request(self, uri, method="GET", body=None, headers=None, redirections=5, connection_type=None):
+        import httplib2
+
+        with FakeGoogleHttp._lock:
+            FakeGoogleHttp.round_trips += 1
+        if not self._connected:
+            with FakeGoogleHttp._lock:
+                FakeGoogleHttp.connections += 1
+            time.sleep(self.connect_latency)
+            self._connected = True
+        time.sleep(self.latency)
+        headers = {key.lower(): value for key, value in (headers or {}).items()}
+        if "/batch" in uri:
+            self._record("batch")
+            content_type, content = self._batch(body if isinstance(body, str) else body.decode(), headers["content-type"])
+        else:
+            content_type, content = "application/json; charset=UTF-8", json.dumps(self._answer(method, uri))
+        response = httplib2.Response({"status": "200", "content-type": content_type})
+        return response, content.encode("utf-8")
@@ -1,13 +1,28 @@
 from langchain_chroma import Chroma
-from langchain_openai import OpenAIEmbeddings
 from settings import config
 from slack_bolt import App
+from src.crud.embedding_cache import CachedEmbeddings
+from src.crud.embedding_providers import create_embeddings, namespaced
+from src.crud.store import add_ingestion_listener
+from src.chatbot.answer_cache import SemanticAnswerCache
 import chromadb
 
 persistent_client = chromadb.PersistentClient()
 collection = persistent_client.get_or_create_collection("collection_name")
 
 # Create and store global instances here
-embeddings = OpenAIEmbeddings(api_key=config.OPEN_API_KEY)
-vector_db = Chroma(collection_name="blog_data", embedding_function=embeddings, client=persistent_client, persist_directory=config.CHROMA_DB_PATH)
-keyword_storage = {"keyword": None}
\ No newline at end of file
+embeddings = CachedEmbeddings(
+    create_embeddings(),
+    path=config.EMBEDDING_CACHE_PATH,
+    max_entries=config.EMBEDDING_CACHE_MAX_ENTRIES,
+)
+vector_db = Chroma(collection_name=namespaced("blog_data"), embedding_function=embeddings, client=persistent_client, persist_directory=config.CHROMA_DB_PATH)
+
+# Answers are reused for similar questions until the stored chunks change
+answer_cache = SemanticAnswerCache(
+    embeddings,
+    threshold=config.ANSWER_CACHE_THRESHOLD,
+    ttl_seconds=config.ANSWER_CACHE_TTL,
+    max_entries=config.ANSWER_CACHE_MAX_ENTRIES,
+)
+add_ingestion_listener(answer_cache.invalidate)
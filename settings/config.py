@@ -23,3 +23,140 @@ CHROMA_DB_PATH = os.getenv("CHROMA_DB_PATH")
 
 #OpenAI
 OPEN_API_KEY = os.getenv("OPEN_API_KEY")
+
+
+# Blog context retrieval
+BLOG_CONTEXT_K = int(os.getenv("BLOG_CONTEXT_K", "5"))
+BLOG_CONTEXT_USE_MMR = os.getenv("BLOG_CONTEXT_USE_MMR", "false").lower() == "true"
+BLOG_CONTEXT_FETCH_K = int(os.getenv("BLOG_CONTEXT_FETCH_K", "20"))
+
+# Hybrid BM25 + vector retrieval for /get and support answers
+HYBRID_SEARCH_ENABLED = os.getenv("HYBRID_SEARCH_ENABLED", "true").lower() == "true"
+BM25_INDEX_PATH = os.getenv("BM25_INDEX_PATH", "bm25_index.sqlite3")
+HYBRID_FETCH_K = int(os.getenv("HYBRID_FETCH_K", "10"))
+RRF_K = int(os.getenv("RRF_K", "60"))
+LEXICAL_FAST_PATH = os.getenv("LEXICAL_FAST_PATH", "true").lower() == "true"
+
+# Embeddings: openai, local (sentence-transformers model on disk) or hashing (offline,
+# for tests and benchmarks). Collections and indexes are kept apart per model.
+EMBEDDING_PROVIDER = os.getenv("EMBEDDING_PROVIDER", "openai")
+OPENAI_EMBEDDING_MODEL = os.getenv("OPENAI_EMBEDDING_MODEL", "text-embedding-ada-002")
+LOCAL_EMBEDDING_MODEL_PATH = os.getenv("LOCAL_EMBEDDING_MODEL_PATH", "")
+LOCAL_EMBEDDING_BACKEND = os.getenv("LOCAL_EMBEDDING_BACKEND", "torch")
+HASHING_EMBEDDING_DIM = int(os.getenv("HASHING_EMBEDDING_DIM", "512"))
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+
+# Embedding cache
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "embedding_cache.sqlite3")
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "200000"))
+
+# Ingestion
+INGEST_MANIFEST_PATH = os.getenv("INGEST_MANIFEST_PATH", "ingest_manifest.json")
+DEDUP_INDEX_PATH = os.getenv("DEDUP_INDEX_PATH", "dedup_index.sqlite3")
+
+# Slack incremental fetching
+SLACK_WATERMARK_PATH = os.getenv("SLACK_WATERMARK_PATH", "slack_watermarks.json")
+SLACK_FETCH_WINDOW_DAYS = int(os.getenv("SLACK_FETCH_WINDOW_DAYS", "7"))
+# Rescan the whole window this often to pick up edited and deleted messages
+SLACK_RECONCILE_HOURS = float(os.getenv("SLACK_RECONCILE_HOURS", "24"))
+
+# Confluence incremental sync
+CONFLUENCE_INCREMENTAL_SYNC = os.getenv("CONFLUENCE_INCREMENTAL_SYNC", "true").lower() == "true"
+CONFLUENCE_INCLUDE_ATTACHMENTS = os.getenv("CONFLUENCE_INCLUDE_ATTACHMENTS", "true").lower() == "true"
+CONFLUENCE_FETCH_CONCURRENCY = int(os.getenv("CONFLUENCE_FETCH_CONCURRENCY", "4"))
+CONFLUENCE_SYNC_STATE_PATH = os.getenv("CONFLUENCE_SYNC_STATE_PATH", "confluence_sync_state.json")
+CONFLUENCE_PRUNE_DELETED = os.getenv("CONFLUENCE_PRUNE_DELETED", "true").lower() == "true"
+CONFLUENCE_PUBLISH_STATE_PATH = os.getenv("CONFLUENCE_PUBLISH_STATE_PATH", "confluence_publish.sqlite3")
+CONFLUENCE_MAX_SECTIONS = int(os.getenv("CONFLUENCE_MAX_SECTIONS", "10"))
+CONFLUENCE_SUMMARY_PAGE_ID = os.getenv("CONFLUENCE_SUMMARY_PAGE_ID", "4423704")
+CONFLUENCE_SUPPORT_SUMMARY_PAGE_ID = os.getenv("CONFLUENCE_SUPPORT_SUMMARY_PAGE_ID", "5013506")
+
+# Background refresh of the knowledge base and summaries
+REFRESH_INTERVAL_MINUTES = float(os.getenv("REFRESH_INTERVAL_MINUTES", "60"))
+REFRESH_BATCH_SIZE = int(os.getenv("REFRESH_BATCH_SIZE", "500"))
+
+# Slack link and attachment enrichment
+SLACK_ENRICH_CONCURRENCY = int(os.getenv("SLACK_ENRICH_CONCURRENCY", "8"))
+SLACK_ENRICH_PER_HOST = int(os.getenv("SLACK_ENRICH_PER_HOST", "2"))
+SLACK_ENRICH_TIMEOUT = float(os.getenv("SLACK_ENRICH_TIMEOUT", "15"))
+URL_CACHE_PATH = os.getenv("URL_CACHE_PATH", "url_cache.sqlite3")
+URL_CACHE_TTL = float(os.getenv("URL_CACHE_TTL", str(7 * 86400)))
+URL_CACHE_MAX_ENTRIES = int(os.getenv("URL_CACHE_MAX_ENTRIES", "20000"))
+
+# Worker processes start from a clean server process, never forked from this threaded one
+PROCESS_START_METHOD = os.getenv("PROCESS_START_METHOD", "forkserver")
+
+# Slack attachment parsing
+ATTACHMENT_PARSE_WORKERS = int(os.getenv("ATTACHMENT_PARSE_WORKERS", "2"))
+ATTACHMENT_PARSE_TIMEOUT = float(os.getenv("ATTACHMENT_PARSE_TIMEOUT", "120"))
+ATTACHMENT_MAX_BYTES = int(os.getenv("ATTACHMENT_MAX_BYTES", str(25 * 1024 * 1024)))
+ATTACHMENT_CACHE_PATH = os.getenv("ATTACHMENT_CACHE_PATH", "attachment_cache.sqlite3")
+ATTACHMENT_CACHE_TTL = float(os.getenv("ATTACHMENT_CACHE_TTL", str(30 * 86400)))
+ATTACHMENT_CACHE_MAX_ENTRIES = int(os.getenv("ATTACHMENT_CACHE_MAX_ENTRIES", "5000"))
+# Failed or empty parses are remembered this long before the file is tried again
+ATTACHMENT_FAILURE_TTL = float(os.getenv("ATTACHMENT_FAILURE_TTL", "86400"))
+
+# Blog generation
+BLOG_MAX_CONCURRENCY = int(os.getenv("BLOG_MAX_CONCURRENCY", "3"))
+
+# Streaming responses into Slack
+SLACK_STREAM_RESPONSES = os.getenv("SLACK_STREAM_RESPONSES", "false").lower() == "true"
+SLACK_STREAM_UPDATE_INTERVAL = float(os.getenv("SLACK_STREAM_UPDATE_INTERVAL", "1.5"))
+
+# Slack command job queue
+JOB_LIMIT_BLOG = int(os.getenv("JOB_LIMIT_BLOG", "2"))
+JOB_LIMIT_GET = int(os.getenv("JOB_LIMIT_GET", "4"))
+JOB_LIMIT_UPDATE = int(os.getenv("JOB_LIMIT_UPDATE", "2"))
+JOB_LIMIT_SUPPORT = int(os.getenv("JOB_LIMIT_SUPPORT", "4"))
+JOB_MAX_QUEUED = int(os.getenv("JOB_MAX_QUEUED", "50"))
+
+# OpenAI HTTP client
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL")
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "20"))
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "120"))
+
+# Shared LLM gateway: limits apply across every caller in the process (0 disables a limit)
+LLM_RPM_LIMIT = int(os.getenv("LLM_RPM_LIMIT", "500"))
+LLM_TPM_LIMIT = int(os.getenv("LLM_TPM_LIMIT", "40000"))
+# Embeddings are rate limited separately from chat completions
+EMBEDDING_RPM_LIMIT = int(os.getenv("EMBEDDING_RPM_LIMIT", "3000"))
+EMBEDDING_TPM_LIMIT = int(os.getenv("EMBEDDING_TPM_LIMIT", "1000000"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "5"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "1"))
+LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", "60"))
+
+# API
+DISCONNECT_POLL_INTERVAL = float(os.getenv("DISCONNECT_POLL_INTERVAL", "0.5"))
+
+# Support bot conversation memory
+SUPPORT_MAX_SESSIONS = int(os.getenv("SUPPORT_MAX_SESSIONS", "1000"))
+SUPPORT_SESSION_TTL = float(os.getenv("SUPPORT_SESSION_TTL", str(24 * 3600)))
+SUPPORT_HISTORY_TOKEN_BUDGET = int(os.getenv("SUPPORT_HISTORY_TOKEN_BUDGET", "1500"))
+SUPPORT_SESSION_DB_PATH = os.getenv("SUPPORT_SESSION_DB_PATH")
+
+# Semantic answer cache for support questions
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.92"))
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", "3600"))
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "1000"))
+
+# Google Docs publishing
+GOOGLE_DOCS_BATCH = os.getenv("GOOGLE_DOCS_BATCH", "false").lower() == "true"
+GOOGLE_API_TIMEOUT = float(os.getenv("GOOGLE_API_TIMEOUT", "30"))
+
+# Near-duplicate removal before embedding
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.85"))
+DEDUP_NUM_PERM = int(os.getenv("DEDUP_NUM_PERM", "128"))
+
+# HTML cleaning of fetched links and attachments
+HTML_PARSER_BACKEND = os.getenv("HTML_PARSER_BACKEND", "lxml")
+PREPROCESS_WORKERS = int(os.getenv("PREPROCESS_WORKERS", str(os.cpu_count() or 1)))
+PREPROCESS_POOL_MIN_CHARS = int(os.getenv("PREPROCESS_POOL_MIN_CHARS", "2000000"))
+
+# Summaries
+SUMMARY_MAX_CONCURRENCY = int(os.getenv("SUMMARY_MAX_CONCURRENCY", "4"))
+SUMMARY_MODEL = os.getenv("SUMMARY_MODEL", "gpt-4")
+# Prompt tokens per summary request; the rest of the 8k context is left for the answer
+SUMMARY_MAX_TOKENS = int(os.getenv("SUMMARY_MAX_TOKENS", "6000"))
+SUMMARY_CACHE_PATH = os.getenv("SUMMARY_CACHE_PATH", "summary_cache.sqlite3")
+SUMMARY_WINDOW_DAYS = float(os.getenv("SUMMARY_WINDOW_DAYS", str(SLACK_FETCH_WINDOW_DAYS)))
@@ -0,0 +1,126 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class SemanticAnswerCache:
+    """
+    Cache answers by the meaning of the question rather than its exact text.
+
+    A question is embedded and compared with previously answered questions in the
+    same namespace; if one is within the cosine ``threshold`` and still fresh, its
+    answer is returned without calling the LLM. Entries expire after
+    ``ttl_seconds``, the cache holds at most ``max_entries`` (LRU), and
+    ``invalidate`` drops everything when the underlying knowledge changes.
+
+    The cache looks at the question only, not at earlier turns of a conversation.
+    """
+
+    def __init__(self, embeddings, threshold: float = 0.92, ttl_seconds: float = 3600, max_entries: int = 1000):
+        self.embeddings = embeddings
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.latency_saved = 0.0
+
+    def _embed(self, question: str) -> np.ndarray:
+        vector = np.asarray(self.embeddings.embed_query(question), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(self, namespace: str, question: str) -> Tuple[Optional[str], np.ndarray]:
+        """
+        Find a fresh cached answer for a semantically similar question.
+
+        Returns:
+            (answer or None, normalized question vector for a later store)
+        """
+        vector = self._embed(question)
+        now = time.time()
+        with self._lock:
+            expired = [key for key, entry in self._entries.items() if now - entry["created"] > self.ttl_seconds]
+            for key in expired:
+                del self._entries[key]
+            candidates = [(key, entry) for key, entry in self._entries.items() if entry["namespace"] == namespace]
+            if candidates:
+                matrix = np.stack([entry["vector"] for _, entry in candidates])
+                scores = matrix @ vector
+                best = int(np.argmax(scores))
+                if scores[best] >= self.threshold:
+                    key, entry = candidates[best]
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    self.latency_saved += entry["latency"]
+                    return entry["answer"], vector
+            self.misses += 1
+        return None, vector
+
+    def store(self, namespace: str, question: str, vector: np.ndarray, answer: str, latency: float) -> None:
+        """Remember an answer together with how long it took to produce."""
+        with self._lock:
+            self._entries[self._next_id] = {
+                "namespace": namespace,
+                "question": question,
+                "vector": vector,
+                "answer": answer,
+                "latency": latency,
+                "created": time.time(),
+            }
+            self._next_id += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_or_compute(self, namespace: str, question: str, compute: Callable[[], str]) -> str:
+        """Return a cached answer or compute, cache and return a new one."""
+        answer, vector = self.lookup(namespace, question)
+        if answer is not None:
+            return answer
+        start = time.perf_counter()
+        answer = compute()
+        self.store(namespace, question, vector, answer, time.perf_counter() - start)
+        return answer
+
+    async def aget_or_compute(self, namespace: str, question: str, compute: Callable[[], Awaitable[str]]) -> str:
+        """Async variant of get_or_compute; embedding runs off the event loop."""
+        answer, vector = await asyncio.to_thread(self.lookup, namespace, question)
+        if answer is not None:
+            return answer
+        start = time.perf_counter()
+        answer = await compute()
+        self.store(namespace, question, vector, answer, time.perf_counter() - start)
+        return answer
+
+    def invalidate(self, *args, **kwargs) -> None:
+        """Drop every cached answer, e.g. after ingestion changed the stored chunks."""
+        with self._lock:
+            dropped = len(self._entries)
+            self._entries.clear()
+            self.invalidations += 1
+        if dropped:
+            logger.info(f"Invalidated {dropped} cached support answers")
+
+    def stats(self) -> Dict[str, float]:
+        """Return hit rate and the LLM latency saved by cache hits."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0,
+                "latency_saved_seconds": round(self.latency_saved, 3),
+                "invalidations": self.invalidations,
+            }
@@ -0,0 +1,155 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from src.generators.token_packer import count_tokens
+
+logger = logging.getLogger(__name__)
+
+Turn = Tuple[str, str]
+
+
+def estimate_tokens(text: str) -> int:
+    """Tokens the chat model sees for a history message."""
+    return count_tokens(text)
+
+
+class SessionStore:
+    """
+    Per-session conversation history with a token budget.
+
+    Each session keeps only its most recent turns that fit in ``token_budget``,
+    so the history sent with every prompt stays bounded. Sessions are evicted
+    least-recently-used beyond ``max_sessions`` and after ``ttl_seconds`` of
+    inactivity. With ``persist_path`` set, sessions are written through to
+    SQLite and survive restarts.
+    """
+
+    def __init__(
+        self,
+        max_sessions: int = 1000,
+        ttl_seconds: float = 24 * 3600,
+        token_budget: int = 1500,
+        persist_path: Optional[str] = None,
+    ):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.token_budget = token_budget
+        self._sessions: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._evictions = {"lru": 0, "ttl": 0}
+        self._trimmed_turns = 0
+        self._conn = None
+        if persist_path:
+            self._conn = sqlite3.connect(persist_path, check_same_thread=False)
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS sessions (
+                    session_id TEXT PRIMARY KEY,
+                    turns TEXT NOT NULL,
+                    last_access REAL NOT NULL
+                )"""
+            )
+            self._conn.commit()
+
+    def _trim(self, turns: List[Turn]) -> List[Turn]:
+        """Keep the newest turns whose combined size fits the token budget."""
+        kept = []
+        used = 0
+        for human, ai in reversed(turns):
+            cost = estimate_tokens(human) + estimate_tokens(ai)
+            if kept and used + cost > self.token_budget:
+                break
+            kept.append((human, ai))
+            used += cost
+        self._trimmed_turns += len(turns) - len(kept)
+        return list(reversed(kept))
+
+    def _load(self, session_id: str) -> Optional[Dict]:
+        session = self._sessions.get(session_id)
+        if session is None and self._conn is not None:
+            row = self._conn.execute(
+                "SELECT turns, last_access FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            if row:
+                session = {"turns": [tuple(turn) for turn in json.loads(row[0])], "last_access": row[1]}
+                self._sessions[session_id] = session
+        if session is None:
+            return None
+        if time.time() - session["last_access"] > self.ttl_seconds:
+            self._drop(session_id)
+            self._evictions["ttl"] += 1
+            return None
+        self._sessions.move_to_end(session_id)
+        return session
+
+    def _drop(self, session_id: str) -> None:
+        self._sessions.pop(session_id, None)
+        if self._conn is not None:
+            self._conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        now = time.time()
+        expired = [sid for sid, session in self._sessions.items() if now - session["last_access"] > self.ttl_seconds]
+        for session_id in expired:
+            self._drop(session_id)
+        self._evictions["ttl"] += len(expired)
+        while len(self._sessions) > self.max_sessions:
+            # Only the in-memory copy is evicted; a persisted session reloads on its next turn
+            self._sessions.popitem(last=False)
+            self._evictions["lru"] += 1
+        if self._conn is not None:
+            cursor = self._conn.execute("DELETE FROM sessions WHERE last_access < ?", (now - self.ttl_seconds,))
+            self._conn.commit()
+            self._evictions["ttl"] += cursor.rowcount
+
+    def get_history(self, session_id: str) -> str:
+        """Return the session's recent turns formatted for the prompt."""
+        with self._lock:
+            session = self._load(session_id)
+            turns = list(session["turns"]) if session else []
+        return "\n".join(f"Human: {human}\nAI: {ai}" for human, ai in turns)
+
+    def add_turn(self, session_id: str, human: str, ai: str) -> None:
+        """Append a turn to a session and trim it to the token budget."""
+        with self._lock:
+            session = self._load(session_id) or {"turns": []}
+            session["turns"] = self._trim(session["turns"] + [(human, ai)])
+            session["last_access"] = time.time()
+            self._sessions[session_id] = session
+            self._sessions.move_to_end(session_id)
+            if self._conn is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO sessions (session_id, turns, last_access) VALUES (?, ?, ?)",
+                    (session_id, json.dumps(session["turns"]), session["last_access"]),
+                )
+                self._conn.commit()
+            self._evict()
+
+    def clear(self, session_id: Optional[str] = None) -> None:
+        """Clear one session, or every session when no ID is given."""
+        with self._lock:
+            if session_id is not None:
+                self._drop(session_id)
+                return
+            self._sessions.clear()
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM sessions")
+                self._conn.commit()
+
+    def stats(self) -> Dict[str, int]:
+        """Return memory metrics for the in-memory sessions."""
+        with self._lock:
+            turns = [turn for session in self._sessions.values() for turn in session["turns"]]
+            return {
+                "sessions": len(self._sessions),
+                "turns": len(turns),
+                "history_tokens": sum(estimate_tokens(h) + estimate_tokens(a) for h, a in turns),
+                "trimmed_turns": self._trimmed_turns,
+                "lru_evictions": self._evictions["lru"],
+                "ttl_evictions": self._evictions["ttl"],
+            }
@@ -1,22 +1,45 @@
-from typing import List, Dict
-from langchain_openai import ChatOpenAI
-from langchain.memory import ConversationBufferMemory
-from langchain.chains import ConversationChain
+from typing import Callable, List, Dict, Optional
+from langchain_core.callbacks import BaseCallbackHandler
 from langchain.prompts import PromptTemplate
 import os
 from settings import config
+from src.chatbot.answer_cache import SemanticAnswerCache
+from src.chatbot.session_store import SessionStore, estimate_tokens
+from src.llm.gateway import Priority, get_gateway
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Expected answer size, charged to the tokens-per-minute budget with the prompt
+RESPONSE_TOKENS = 800
+
+class _TokenStreamHandler(BaseCallbackHandler):
+    """Forward the text generated so far to a callback as tokens arrive."""
+
+    def __init__(self, on_token: Callable[[str], None]):
+        self.on_token = on_token
+        self.parts: List[str] = []
+
+    def on_llm_new_token(self, token: str, **kwargs) -> None:
+        if token:
+            self.parts.append(token)
+            self.on_token("".join(self.parts))
+
 class SupportBot:
-    def __init__(self):
-        self.llm = ChatOpenAI(
+    def __init__(self, sessions: Optional[SessionStore] = None, answer_cache: Optional[SemanticAnswerCache] = None):
+        self.gateway = get_gateway()
+        self.llm = self.gateway.chat_model(
             temperature=0.7,
             model="gpt-4-turbo-preview",
-            openai_api_key=config.OPEN_API_KEY
+            streaming=config.SLACK_STREAM_RESPONSES,
+        )
+        self.sessions = sessions or SessionStore(
+            max_sessions=config.SUPPORT_MAX_SESSIONS,
+            ttl_seconds=config.SUPPORT_SESSION_TTL,
+            token_budget=config.SUPPORT_HISTORY_TOKEN_BUDGET,
+            persist_path=config.SUPPORT_SESSION_DB_PATH,
         )
-        self.memory = ConversationBufferMemory()
+        self.answer_cache = answer_cache if config.ANSWER_CACHE_ENABLED else None
         
         # Enhanced prompt template with more context about Remido
         template = """You are a knowledgeable support assistant for Remido, a financial technology company specializing in remittance and payment solutions. 
@@ -67,21 +90,81 @@ class SupportBot:
             template=template
         )
         
-        self.conversation = ConversationChain(
-            llm=self.llm,
-            memory=self.memory,
-            prompt=prompt,
-            verbose=True
-        )
+        self.conversation = prompt | self.llm
+        self.prompt_tokens = estimate_tokens(template)
     
-    def get_response(self, user_input: str) -> str:
-        """Get a response from the bot while maintaining conversation history."""
+    def get_response(
+        self,
+        user_input: str,
+        session_id: str = "default",
+        on_token: Optional[Callable[[str], None]] = None,
+    ) -> str:
+        """
+        Get a response from the bot while maintaining the session's conversation history.
+
+        The first question of a session is served from the semantic answer cache
+        when one is configured and a similar question was answered recently.
+        Follow-up questions depend on the session's history, so they are always
+        answered by the model.
+
+        If on_token is given and streaming is enabled, it is called with the text
+        generated so far as tokens arrive.
+        """
+        history = self.sessions.get_history(session_id)
+
+        def generate() -> str:
+            inputs = {"history": history, "input": user_input}
+
+            def invoke() -> str:
+                # A fresh handler per attempt, so a retry does not resume the failed attempt's text
+                callbacks = [_TokenStreamHandler(on_token)] if on_token else None
+                return self.conversation.invoke(inputs, config={"callbacks": callbacks}).content
+
+            return self.gateway.call(
+                "support_bot", invoke, priority=Priority.INTERACTIVE, tokens=self._estimate_tokens(inputs)
+            )
+
         try:
-            response = self.conversation.predict(input=user_input)
+            if self.answer_cache and not history:
+                response = self.answer_cache.get_or_compute("support_bot", user_input, generate)
+            else:
+                response = generate()
+            self.sessions.add_turn(session_id, user_input, response)
             return response
         except Exception as e:
             return f"I apologize, but I encountered an error: {str(e)}"
     
-    def clear_history(self):
-        """Clear the conversation history."""
-        self.memory.clear() 
\ No newline at end of file
+    async def aget_response(self, user_input: str, session_id: str = "default") -> str:
+        """
+        Async variant of get_response that never blocks the event loop.
+
+        Cancelling the awaiting task cancels the in-flight LLM request.
+        """
+        history = self.sessions.get_history(session_id)
+
+        async def generate() -> str:
+            inputs = {"history": history, "input": user_input}
+
+            async def invoke() -> str:
+                return (await self.conversation.ainvoke(inputs)).content
+
+            return await self.gateway.acall(
+                "support_bot", invoke, priority=Priority.INTERACTIVE, tokens=self._estimate_tokens(inputs)
+            )
+
+        try:
+            if self.answer_cache and not history:
+                response = await self.answer_cache.aget_or_compute("support_bot", user_input, generate)
+            else:
+                response = await generate()
+            self.sessions.add_turn(session_id, user_input, response)
+            return response
+        except Exception as e:
+            return f"I apologize, but I encountered an error: {str(e)}"
+    
+    def _estimate_tokens(self, inputs: Dict[str, str]) -> int:
+        return self.prompt_tokens + estimate_tokens(inputs["history"]) + estimate_tokens(inputs["input"]) + RESPONSE_TOKENS
+
+    def clear_history(self, session_id: Optional[str] = None):
+        """Clear one session's conversation history, or all of them."""
+        self.sessions.clear(session_id) 
\ No newline at end of file
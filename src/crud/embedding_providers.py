@@ -0,0 +1,212 @@
+import logging
+import os
+import re
+import zlib
+from typing import List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from settings import config
+
+logger = logging.getLogger(__name__)
+
+# Model the store was built with before providers were pluggable; it keeps the original names
+LEGACY_MODEL_ID = "openai-text-embedding-ada-002"
+WORD_PATTERN = re.compile(r"\w+")
+
+
+class HashingEmbeddings(Embeddings):
+    """
+    Offline embedding by signed feature hashing of words and word pairs.
+
+    Needs no model or network, is deterministic across processes and embeds a
+    whole batch with NumPy. Similarity reflects shared vocabulary only, so it
+    suits tests, benchmarks and keyword-heavy lookups rather than semantics.
+    """
+
+    def __init__(self, dim: int = 512):
+        self.dim = dim
+        self.model = f"hashing-{dim}"
+
+    def _features(self, text: str) -> List[int]:
+        words = WORD_PATTERN.findall(text.lower())
+        features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+        return [zlib.crc32(feature.encode("utf-8")) for feature in features]
+
+    def _embed(self, texts: List[str]) -> np.ndarray:
+        hashes = [self._features(text) for text in texts]
+        rows = np.repeat(np.arange(len(texts)), [len(features) for features in hashes])
+        flat = np.fromiter((h for features in hashes for h in features), dtype=np.uint32, count=len(rows))
+        # The low bits pick the column, one higher bit the sign, so collisions tend to cancel
+        columns = (flat % self.dim).astype(np.int64)
+        signs = np.where(flat & (1 << 31), -1.0, 1.0).astype(np.float32)
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        np.add.at(matrix, (rows, columns), signs)
+        # Sublinear term frequency, then unit length for cosine similarity
+        matrix = np.sign(matrix) * np.log1p(np.abs(matrix))
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix / np.where(norms == 0, 1.0, norms)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        return self._embed(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed([text])[0].tolist()
+
+
+class LocalModelEmbeddings(Embeddings):
+    """
+    sentence-transformers model loaded from a local directory, run on the CPU.
+
+    Texts are encoded in batches into a NumPy array of unit vectors. With
+    ``backend="onnx"`` the model's ONNX export is used instead of PyTorch.
+    """
+
+    def __init__(self, path: str, batch_size: int = 64, backend: str = "torch"):
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError as e:
+            raise ImportError(
+                "EMBEDDING_PROVIDER=local needs the sentence-transformers package"
+            ) from e
+        if not path or not os.path.isdir(path):
+            raise ValueError(f"LOCAL_EMBEDDING_MODEL_PATH is not a model directory: {path!r}")
+        kwargs = {"backend": backend} if backend != "torch" else {}
+        self._model = SentenceTransformer(path, device="cpu", **kwargs)
+        self.batch_size = batch_size
+        self.model = f"local-{os.path.basename(os.path.normpath(path))}"
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        vectors = self._model.encode(
+            texts, batch_size=self.batch_size, convert_to_numpy=True, normalize_embeddings=True
+        )
+        return vectors.tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+class GatewayEmbeddings(Embeddings):
+    """
+    OpenAI embeddings run through the LLM gateway.
+
+    Embedding requests get the gateway's retry policy and priority queue, with
+    RPM/TPM budgets of their own (EMBEDDING_RPM_LIMIT/EMBEDDING_TPM_LIMIT):
+    support questions at interactive priority, ingestion batches at batch
+    priority, and a large refresh never spends the chat token budget.
+    """
+
+    # OpenAI accepts up to 2048 inputs per request; one request per gateway call
+    REQUEST_SIZE = 1000
+
+    def __init__(self, underlying: Embeddings, gateway):
+        self.underlying = underlying
+        self.gateway = gateway
+        self.model = underlying.model
+
+    @staticmethod
+    def _estimate_tokens(texts: List[str]) -> int:
+        # About four characters per token; the response reports the real usage
+        return sum(len(text) for text in texts) // 4 + len(texts)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        from src.llm.gateway import Priority
+
+        vectors = []
+        for i in range(0, len(texts), self.REQUEST_SIZE):
+            batch = texts[i:i + self.REQUEST_SIZE]
+            vectors.extend(self.gateway.call(
+                "embeddings",
+                lambda: self.underlying.embed_documents(batch),
+                priority=Priority.BATCH,
+                tokens=self._estimate_tokens(batch),
+                limit="embeddings",
+            ))
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        from src.llm.gateway import Priority
+
+        return self.gateway.call(
+            "embeddings",
+            lambda: self.underlying.embed_query(text),
+            priority=Priority.INTERACTIVE,
+            tokens=self._estimate_tokens([text]),
+            limit="embeddings",
+        )
+
+
+def create_embeddings(provider: Optional[str] = None) -> Embeddings:
+    """
+    Build the embedding backend selected by EMBEDDING_PROVIDER.
+
+    Args:
+        provider: "openai", "local" or "hashing", defaults to config
+
+    Returns:
+        An Embeddings instance whose ``model`` attribute names the model
+    """
+    provider = (provider or config.EMBEDDING_PROVIDER).lower()
+    if provider == "openai":
+        from langchain_openai import OpenAIEmbeddings
+        from src.llm.gateway import get_gateway
+
+        gateway = get_gateway()
+        openai_embeddings = OpenAIEmbeddings(
+            api_key=config.OPEN_API_KEY,
+            model=config.OPENAI_EMBEDDING_MODEL,
+            base_url=config.OPENAI_BASE_URL,
+            http_client=gateway.http_client,
+            http_async_client=gateway.http_async_client,
+            chunk_size=GatewayEmbeddings.REQUEST_SIZE,
+            max_retries=0,
+        )
+        return GatewayEmbeddings(openai_embeddings, gateway)
+    if provider == "local":
+        return LocalModelEmbeddings(
+            config.LOCAL_EMBEDDING_MODEL_PATH,
+            batch_size=config.EMBEDDING_BATCH_SIZE,
+            backend=config.LOCAL_EMBEDDING_BACKEND,
+        )
+    if provider == "hashing":
+        return HashingEmbeddings(dim=config.HASHING_EMBEDDING_DIM)
+    raise ValueError(f"Unknown EMBEDDING_PROVIDER: {provider!r} (expected openai, local or hashing)")
+
+
+def embedding_model_id(provider: Optional[str] = None) -> str:
+    """Identifier of the configured embedding model, safe for collection names and paths."""
+    provider = (provider or config.EMBEDDING_PROVIDER).lower()
+    if provider == "openai":
+        name = f"openai-{config.OPENAI_EMBEDDING_MODEL}"
+    elif provider == "local":
+        name = f"local-{os.path.basename(os.path.normpath(config.LOCAL_EMBEDDING_MODEL_PATH or 'model'))}"
+    else:
+        name = f"{provider}-{config.HASHING_EMBEDDING_DIM}"
+    return re.sub(r"[^a-z0-9.-]+", "-", name.lower()).strip("-.")
+
+
+def namespaced(name: str, model_id: Optional[str] = None) -> str:
+    """
+    Collection name for the given embedding model.
+
+    Vectors from different models must never share a collection; the legacy
+    OpenAI model keeps the bare name so existing stores carry on unchanged.
+    """
+    model_id = model_id or embedding_model_id()
+    if model_id == LEGACY_MODEL_ID:
+        return name
+    # Chroma collection names are limited to 63 characters
+    return f"{name}_{model_id}"[:63].rstrip("-._")
+
+
+def namespaced_path(path: str, model_id: Optional[str] = None) -> str:
+    """File path for the given embedding model, e.g. ingest_manifest.hashing-512.json."""
+    model_id = model_id or embedding_model_id()
+    if model_id == LEGACY_MODEL_ID:
+        return path
+    root, extension = os.path.splitext(path)
+    return f"{root}.{model_id}{extension}"
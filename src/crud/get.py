@@ -1,4 +1,6 @@
+from src.crud.hybrid_search import hybrid_search
+
 
 def get_data(word, vector_db):
-    results = vector_db.similarity_search(word, k=3)
-    return [result.page_content for result in results]
\ No newline at end of file
+    results = hybrid_search(word, vector_db, k=3)
+    return [result.page_content for result in results]
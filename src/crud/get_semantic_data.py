@@ -1,12 +1,37 @@
-from langchain.prompts.example_selector import SemanticSimilarityExampleSelector
-from langchain_chroma import Chroma
-
-
-def get_relevant_docs(examples, embeddings, keyword):
-    example_selector = SemanticSimilarityExampleSelector.from_examples(
-        examples=examples, 
-        embeddings=embeddings,
-        vectorstore_cls=Chroma,
-        k=5 
-    )
-    return [example["content"] for example in example_selector.select_examples({"query": keyword})]
\ No newline at end of file
+from typing import Any, Dict, List, Optional
+
+
+def get_relevant_docs(
+    vector_db,
+    keyword: str,
+    k: int = 5,
+    use_mmr: bool = False,
+    fetch_k: int = 20,
+    lambda_mult: float = 0.5,
+    metadata_filter: Optional[Dict[str, Any]] = None,
+) -> List[str]:
+    """
+    Retrieve the chunks most relevant to a keyword from the persistent collection.
+
+    The query runs against the vectors already stored in the collection, so only
+    the keyword itself is embedded and latency does not grow with corpus size.
+
+    Args:
+        vector_db: Vector database instance holding the stored chunks
+        keyword: Topic keyword to search for
+        k: Number of chunks to return
+        use_mmr: Use maximal marginal relevance to diversify the results
+        fetch_k: Number of candidates MMR re-ranks before picking k
+        lambda_mult: MMR trade-off between relevance (1) and diversity (0)
+        metadata_filter: Optional Chroma metadata filter, e.g. {"source": "slack"}
+
+    Returns:
+        List of chunk contents ordered by relevance
+    """
+    if use_mmr:
+        results = vector_db.max_marginal_relevance_search(
+            keyword, k=k, fetch_k=max(fetch_k, k), lambda_mult=lambda_mult, filter=metadata_filter
+        )
+    else:
+        results = vector_db.similarity_search(keyword, k=k, filter=metadata_filter)
+    return [result.page_content for result in results]
@@ -0,0 +1,83 @@
+import re
+from typing import Dict, List, Optional, Sequence
+
+from langchain.schema import Document
+from settings import config
+from src.crud.lexical_index import BM25Index, get_lexical_index
+
+# Terms that look like identifiers: digits, separators, inner capitals or acronyms
+IDENTIFIER = re.compile(r"\d|[-_./:]\w|[a-z][A-Z]|^[A-Z]{2,}$")
+QUOTES = "\"'`"
+
+
+def _is_quoted(query: str) -> bool:
+    return len(query) > 2 and query[0] == query[-1] and query[0] in QUOTES
+
+
+def is_exact_query(query: str) -> bool:
+    """
+    True for lookups of exact terms rather than questions.
+
+    That is a quoted phrase, a single word, or a few words that all look like
+    identifiers (product names, error codes, IDs).
+    """
+    query = query.strip()
+    if _is_quoted(query):
+        return True
+    words = query.split()
+    return len(words) == 1 or (len(words) <= 3 and all(IDENTIFIER.search(word) for word in words))
+
+
+def reciprocal_rank_fusion(result_lists: Sequence[Sequence[Document]], k: int = 60,
+                           limit: Optional[int] = None) -> List[Document]:
+    """
+    Merge ranked lists by summing 1 / (k + rank) per document.
+
+    Documents are matched across lists by content, so the same chunk coming
+    back from both retrievers is counted once with both ranks.
+    """
+    scores: Dict[str, float] = {}
+    documents: Dict[str, Document] = {}
+    for results in result_lists:
+        for rank, doc in enumerate(results, start=1):
+            key = doc.page_content
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+            documents.setdefault(key, doc)
+    ranked = sorted(scores, key=scores.get, reverse=True)
+    return [documents[key] for key in ranked[:limit]]
+
+
+def hybrid_search(query: str, vector_db, k: int = 4, lexical_index: Optional[BM25Index] = None,
+                  fetch_k: Optional[int] = None) -> List[Document]:
+    """
+    Retrieve chunks with BM25 and vector search fused by reciprocal rank.
+
+    Exact-term queries whose terms all occur together in some chunk, or for
+    a quoted phrase occur as that phrase, are answered from the lexical index
+    alone, without an embedding call.
+
+    Args:
+        query: Search text
+        vector_db: Vector database instance holding the stored chunks
+        k: Number of chunks to return
+        lexical_index: BM25 index, defaults to the process-wide one
+        fetch_k: Candidates taken from each retriever before fusion
+
+    Returns:
+        Documents ordered by fused relevance
+    """
+    if not config.HYBRID_SEARCH_ENABLED:
+        return vector_db.similarity_search(query, k=k)
+    index = lexical_index if lexical_index is not None else get_lexical_index(vector_db)
+    fetch_k = max(fetch_k or config.HYBRID_FETCH_K, k)
+
+    if config.LEXICAL_FAST_PATH and is_exact_query(query):
+        query = query.strip()
+        # A quoted phrase must match as written, not as a bag of words
+        exact = index.search(query.strip(QUOTES), k=k, require_all=True, phrase=_is_quoted(query))
+        if exact:
+            return [doc for doc, _ in exact]
+
+    lexical = [doc for doc, _ in index.search(query, k=fetch_k)]
+    vector = vector_db.similarity_search(query, k=fetch_k)
+    return reciprocal_rank_fusion([vector, lexical], k=config.RRF_K, limit=k)
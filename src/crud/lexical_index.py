@@ -0,0 +1,210 @@
+import heapq
+import logging
+import math
+import re
+import threading
+from collections import defaultdict
+from operator import itemgetter
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from langchain.schema import Document
+from settings import config
+from src.crud.embedding_providers import namespaced_path
+from src.crud.sqlite_cache import SQLiteCache
+
+logger = logging.getLogger(__name__)
+
+# Runs of letters and digits, joined by the separators used in IDs, codes and URLs
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[-_./:][a-z0-9]+)*")
+SEPARATORS = re.compile(r"[-_./:]")
+REBUILD_PAGE_SIZE = 5000
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercase terms of a text.
+
+    Compound identifiers such as ``ERR-1042`` or ``pay_v2.refund`` are kept
+    whole and also split into their parts, so both spellings match.
+    """
+    tokens = []
+    for match in TOKEN_PATTERN.finditer(text.lower()):
+        token = match.group()
+        tokens.append(token)
+        if not token.isalnum():
+            tokens.extend(SEPARATORS.split(token))
+    return tokens
+
+
+def _words(text: str) -> List[str]:
+    """Whole lowercase terms of a text in order, for phrase matching."""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def _contains(words: List[str], phrase: List[str]) -> bool:
+    width = len(phrase)
+    return any(words[i:i + width] == phrase for i in range(len(words) - width + 1))
+
+
+class BM25Index:
+    """
+    In-memory BM25 inverted index over the stored chunks, persisted in SQLite
+    next to the collection of the current embedding model.
+
+    Chunks are keyed by the same deterministic IDs as in the vector store, so
+    the two stay in step as ingestion adds and removes chunks. Searching needs
+    no embedding call; exact product names, error codes and IDs that embeddings
+    blur together are matched term for term.
+    """
+
+    def __init__(self, path: Optional[str] = None, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.store = SQLiteCache(path or namespaced_path(config.BM25_INDEX_PATH), "bm25_chunks")
+        self._lock = threading.RLock()
+        self._postings: Dict[str, Dict[str, int]] = defaultdict(dict)
+        self._lengths: Dict[str, int] = {}
+        self._chunks: Dict[str, Tuple[str, Dict[str, Any]]] = {}
+        self._total_length = 0
+        for chunk_id, value in self.store.items():
+            self._index(chunk_id, value["text"], value.get("metadata") or {})
+
+    def __len__(self) -> int:
+        return len(self._chunks)
+
+    def _index(self, chunk_id: str, text: str, metadata: Dict[str, Any]) -> None:
+        terms = tokenize(text)
+        frequencies: Dict[str, int] = defaultdict(int)
+        for term in terms:
+            frequencies[term] += 1
+        for term, frequency in frequencies.items():
+            self._postings[term][chunk_id] = frequency
+        self._lengths[chunk_id] = len(terms)
+        self._total_length += len(terms)
+        self._chunks[chunk_id] = (text, metadata)
+
+    def _unindex(self, chunk_id: str) -> None:
+        text, _ = self._chunks.pop(chunk_id)
+        for term in set(tokenize(text)):
+            postings = self._postings[term]
+            postings.pop(chunk_id, None)
+            if not postings:
+                del self._postings[term]
+        self._total_length -= self._lengths.pop(chunk_id)
+
+    def add(self, ids: Sequence[str], documents: Sequence[Document]) -> None:
+        """Index chunks under their vector store IDs, replacing existing ones."""
+        with self._lock:
+            for chunk_id, doc in zip(ids, documents):
+                if chunk_id in self._chunks:
+                    self._unindex(chunk_id)
+                self._index(chunk_id, doc.page_content, dict(doc.metadata or {}))
+            self.store.set_many([
+                (chunk_id, {"text": doc.page_content, "metadata": dict(doc.metadata or {})})
+                for chunk_id, doc in zip(ids, documents)
+            ])
+
+    def remove(self, ids: Sequence[str]) -> None:
+        with self._lock:
+            for chunk_id in ids:
+                if chunk_id in self._chunks:
+                    self._unindex(chunk_id)
+            self.store.delete_many(list(ids))
+
+    def rebuild_from(self, vector_db) -> int:
+        """
+        Index every chunk already in a Chroma vector store.
+
+        Used once when the index is empty but the collection is not, e.g. on
+        the first start after upgrading. Returns the number of chunks indexed.
+        """
+        indexed = 0
+        while True:
+            page = vector_db.get(include=["documents", "metadatas"], limit=REBUILD_PAGE_SIZE, offset=indexed)
+            ids = page.get("ids") or []
+            if not ids:
+                break
+            documents = [
+                Document(page_content=text or "", metadata=metadata or {})
+                for text, metadata in zip(page["documents"], page["metadatas"])
+            ]
+            self.add(ids, documents)
+            indexed += len(ids)
+            if len(ids) < REBUILD_PAGE_SIZE:
+                break
+        logger.info(f"Lexical index rebuilt from the vector store: {indexed} chunks")
+        return indexed
+
+    def search(self, query: str, k: int = 4, require_all: bool = False,
+               phrase: bool = False) -> List[Tuple[Document, float]]:
+        """
+        Rank chunks against a query with BM25.
+
+        Args:
+            query: Free text; identifiers are matched whole and by part
+            k: Number of results
+            require_all: Only return chunks containing every query term
+            phrase: Only return chunks containing the query's terms contiguously and in order
+
+        Returns:
+            (Document, score) pairs, best first
+        """
+        terms = set(tokenize(query))
+        if not terms:
+            return []
+        with self._lock:
+            count = len(self._chunks)
+            if not count:
+                return []
+            average_length = self._total_length / count
+            postings = {term: self._postings.get(term) or {} for term in terms}
+            if require_all or phrase:
+                # Intersect from the rarest term, so a common part of an ID costs nothing
+                ordered = sorted(terms, key=lambda term: len(postings[term]))
+                candidates = set(postings[ordered[0]])
+                for term in ordered[1:]:
+                    if not candidates:
+                        break
+                    candidates.intersection_update(postings[term])
+                if phrase:
+                    # Postings have no positions, so the few chunks left are checked against their text
+                    words = _words(query)
+                    candidates = {
+                        chunk_id for chunk_id in candidates if _contains(_words(self._chunks[chunk_id][0]), words)
+                    }
+                postings = {term: {chunk_id: postings[term][chunk_id] for chunk_id in candidates} for term in terms}
+
+            scores: Dict[str, float] = defaultdict(float)
+            for term in terms:
+                document_frequency = len(self._postings.get(term) or ())
+                if not document_frequency:
+                    continue
+                idf = math.log(1 + (count - document_frequency + 0.5) / (document_frequency + 0.5))
+                for chunk_id, frequency in postings[term].items():
+                    norm = self.k1 * (1 - self.b + self.b * self._lengths[chunk_id] / average_length)
+                    scores[chunk_id] += idf * frequency * (self.k1 + 1) / (frequency + norm)
+            top = heapq.nlargest(k, scores.items(), key=itemgetter(1))
+            return [
+                (Document(id=chunk_id, page_content=self._chunks[chunk_id][0], metadata=self._chunks[chunk_id][1]), score)
+                for chunk_id, score in top
+            ]
+
+
+_default_index: Optional[BM25Index] = None
+_default_index_lock = threading.Lock()
+
+
+def get_lexical_index(vector_db=None) -> BM25Index:
+    """
+    Return the process-wide lexical index.
+
+    When it is first loaded empty and a vector store is given, it is rebuilt
+    from the chunks already stored there.
+    """
+    global _default_index
+    with _default_index_lock:
+        if _default_index is None:
+            _default_index = BM25Index()
+            if not len(_default_index) and vector_db is not None:
+                _default_index.rebuild_from(vector_db)
+        return _default_index
@@ -0,0 +1,122 @@
+import json
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class SQLiteCache:
+    """
+    Small thread-safe key/value cache persisted in a SQLite table.
+
+    Values are JSON-serialisable dicts. Each row remembers when it was created
+    and last read so callers can expire stale content.
+    """
+
+    def __init__(self, path: str, table: str):
+        if not table.isidentifier():
+            raise ValueError(f"Invalid cache table name: {table}")
+        self.table = table
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            f"""CREATE TABLE IF NOT EXISTS {table} (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                created REAL NOT NULL,
+                last_access REAL NOT NULL
+            )"""
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(f"SELECT value FROM {self.table} WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(f"UPDATE {self.table} SET last_access = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                f"""INSERT INTO {self.table} (key, value, created, last_access) VALUES (?, ?, ?, ?)
+                    ON CONFLICT(key) DO UPDATE SET value = excluded.value, last_access = excluded.last_access""",
+                (key, json.dumps(value), now, now),
+            )
+            self._conn.commit()
+
+    def set_many(self, items: List[Tuple[str, Dict[str, Any]]]) -> None:
+        """Write several (key, value) pairs in one transaction."""
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                f"""INSERT INTO {self.table} (key, value, created, last_access) VALUES (?, ?, ?, ?)
+                    ON CONFLICT(key) DO UPDATE SET value = excluded.value, last_access = excluded.last_access""",
+                [(key, json.dumps(value), now, now) for key, value in items],
+            )
+            self._conn.commit()
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def delete_many(self, keys: List[str]) -> None:
+        with self._lock:
+            self._conn.executemany(f"DELETE FROM {self.table} WHERE key = ?", [(key,) for key in keys])
+            self._conn.commit()
+
+    def evict_older_than(self, seconds: float) -> int:
+        """Delete rows not read or written within the last ``seconds``."""
+        with self._lock:
+            cursor = self._conn.execute(
+                f"DELETE FROM {self.table} WHERE last_access < ?", (time.time() - seconds,)
+            )
+            self._conn.commit()
+        return cursor.rowcount
+
+    def evict_created_before(self, seconds: float) -> int:
+        """Delete rows first written more than ``seconds`` ago, however recently read."""
+        with self._lock:
+            cursor = self._conn.execute(
+                f"DELETE FROM {self.table} WHERE created < ?", (time.time() - seconds,)
+            )
+            self._conn.commit()
+        return cursor.rowcount
+
+    def evict_lru(self, max_entries: int) -> int:
+        """Delete the least recently read rows beyond the first ``max_entries``."""
+        with self._lock:
+            cursor = self._conn.execute(
+                f"""DELETE FROM {self.table} WHERE key IN (
+                    SELECT key FROM {self.table} ORDER BY last_access DESC LIMIT -1 OFFSET ?
+                )""",
+                (max_entries,),
+            )
+            self._conn.commit()
+        return cursor.rowcount
+
+    def items(self, prefix: str = "") -> List[Tuple[str, Dict[str, Any]]]:
+        """Return (key, value) pairs whose key starts with ``prefix``, oldest first."""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT key, value FROM {self.table} WHERE substr(key, 1, ?) = ? ORDER BY created, rowid",
+                (len(prefix), prefix),
+            ).fetchall()
+        return [(key, json.loads(value)) for key, value in rows]
+
+    def keys(self, prefix: str) -> List[str]:
+        """Return the keys starting with ``prefix``; a range scan on the primary key, values are not read."""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT key FROM {self.table} WHERE key >= ? AND key < ?", (prefix, prefix + "\U0010ffff")
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
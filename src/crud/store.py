@@ -1,15 +1,260 @@
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Any, Callable, Dict, List
+
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain.schema import Document
+from settings import config
+from src.crud.embedding_providers import namespaced_path
+from src.crud.lexical_index import BM25Index, get_lexical_index
+from src.data_preprocessors.near_duplicates import NearDuplicateIndex, get_near_duplicate_index
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 166
+CHUNK_SIZE = 300
+CHUNK_OVERLAP = 70
+
+_ingestion_listeners: List[Callable[[Dict[str, Any]], None]] = []
+
+
+def add_ingestion_listener(listener: Callable[[Dict[str, Any]], None]) -> None:
+    """Register a callback invoked with the summary whenever stored chunks change."""
+    _ingestion_listeners.append(listener)
+
+
+def notify_ingestion_listeners(summary: Dict[str, Any]) -> None:
+    for listener in _ingestion_listeners:
+        try:
+            listener(summary)
+        except Exception as e:
+            logger.error(f"Ingestion listener failed: {e}")
+
+
+def _content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _source_id(doc: Document) -> str:
+    """Stable identifier for the source a document came from."""
+    metadata = doc.metadata or {}
+    for key in ("source_id", "id", "source"):
+        if metadata.get(key):
+            return str(metadata[key])
+    # Plain text has no upstream identity, so its content is its identity
+    return f"text:{_content_hash(doc.page_content)}"
+
+
+def _chunk_ids(source_id: str, chunks: List[Document]) -> List[str]:
+    """Deterministic chunk IDs derived from the source and chunk content."""
+    ids = []
+    occurrences: Dict[str, int] = {}
+    for chunk in chunks:
+        digest = _content_hash(chunk.page_content)
+        occurrence = occurrences.get(digest, 0)
+        occurrences[digest] = occurrence + 1
+        ids.append(_content_hash(f"{source_id}\x00{digest}\x00{occurrence}")[:40])
+    return ids
+
+
+def _load_manifest(path: str) -> Dict[str, Dict[str, Any]]:
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _save_manifest(path: str, manifest: Dict[str, Dict[str, Any]]) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, path)
+
+
+def promote_duplicates(chunk_ids: List[str], vector_db, lexical_index: BM25Index,
+                       dedup_index: NearDuplicateIndex) -> int:
+    """
+    Store the skipped near duplicates of chunks about to be deleted or changed.
+
+    Returns the number of chunks promoted.
+    """
+    promoted = dedup_index.promote(chunk_ids)
+    for i in range(0, len(promoted), BATCH_SIZE):
+        batch = promoted[i:i + BATCH_SIZE]
+        ids = [chunk_id for chunk_id, _, _ in batch]
+        docs = [Document(page_content=text, metadata=metadata) for _, text, metadata in batch]
+        vector_db.add_documents(docs, ids=ids)
+        lexical_index.add(ids, docs)
+        dedup_index.add(ids, [dedup_index.signature(text) for _, text, _ in batch])
+    if promoted:
+        logger.info(f"Promoted {len(promoted)} near-duplicate chunks whose originals are being removed")
+    return len(promoted)
+
+
+def _delete_chunks(chunk_ids: List[str], vector_db, lexical_index: BM25Index,
+                   dedup_index: NearDuplicateIndex) -> int:
+    # Duplicates go in before their originals go out, like any other rewrite
+    promoted = promote_duplicates(chunk_ids, vector_db, lexical_index, dedup_index)
+    for i in range(0, len(chunk_ids), BATCH_SIZE):
+        vector_db.delete(ids=chunk_ids[i:i + BATCH_SIZE])
+        lexical_index.remove(chunk_ids[i:i + BATCH_SIZE])
+        dedup_index.remove(chunk_ids[i:i + BATCH_SIZE])
+    return promoted
+
+
+def store_data_vectordb(combined_docs, vector_db, manifest_path: str = None,
+                        lexical_index: BM25Index = None, dedup_index: NearDuplicateIndex = None) -> Dict[str, Any]:
+    """
+    Incrementally upsert documents into the vector database.
+
+    Each source is tracked in an on-disk manifest by its ID and content hash, so
+    unchanged sources are skipped without any embedding calls. Changed sources
+    are re-split and only chunks with new deterministic IDs are embedded; chunks
+    that no longer exist are deleted after the new ones are written. The BM25
+    lexical index receives the same additions and deletions.
+
+    New chunks that are near duplicates of a chunk already stored, by this or
+    any earlier run, or of another new chunk are not embedded. They stay in
+    their source's manifest entry and are recorded against the original in
+    the near-duplicate index, which promotes one of them into the store when
+    the original is deleted.
+
+    Args:
+        combined_docs: Documents or plain strings to ingest
+        vector_db: Vector database instance
+        manifest_path: Path of the ingestion manifest, defaults to config (per embedding model)
+        lexical_index: BM25 index kept in step with the vector store, defaults to the shared one
+        dedup_index: Near-duplicate index of the stored chunks, defaults to the shared one
+
+    Returns:
+        Summary with added, updated, skipped, deduplicated and promoted counts and elapsed seconds
+    """
+    start = time.perf_counter()
+    manifest_path = manifest_path or namespaced_path(config.INGEST_MANIFEST_PATH)
+    manifest = _load_manifest(manifest_path)
 
-def store_data_vectordb(combined_docs, vector_db):
     combined_docs_final = [
         Document(page_content=doc) if isinstance(doc, str) else doc
         for doc in (combined_docs)
     ]
-    text_splitter = RecursiveCharacterTextSplitter(chunk_size=300, chunk_overlap=70)
-    split_docs = text_splitter.split_documents(combined_docs_final)
-    # Store in ChromaDB
-    for i in range(0, len(split_docs), 166):
-        batch = split_docs[i:i + 166]
-        # Store each batch in the vector database
-        vector_db.add_documents(batch)
\ No newline at end of file
+    text_splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+
+    summary = {"added": 0, "updated": 0, "skipped": 0,
+               "chunks_added": 0, "chunks_removed": 0, "chunks_deduplicated": 0, "chunks_promoted": 0}
+    seen_sources = set()
+    new_chunks: List[Document] = []
+    new_chunk_ids: List[str] = []
+    stale_ids: List[str] = []
+    manifest_updates: Dict[str, Dict[str, Any]] = {}
+
+    for doc in combined_docs_final:
+        source_id = _source_id(doc)
+        if source_id in seen_sources:
+            continue
+        seen_sources.add(source_id)
+
+        content_hash = _content_hash(doc.page_content)
+        entry = manifest.get(source_id)
+        if entry and entry["hash"] == content_hash:
+            summary["skipped"] += 1
+            continue
+
+        chunks = text_splitter.split_documents([doc])
+        chunk_ids = _chunk_ids(source_id, chunks)
+        old_ids = set(entry["chunk_ids"]) if entry else set()
+        for chunk, chunk_id in zip(chunks, chunk_ids):
+            if chunk_id not in old_ids:
+                chunk.metadata["source_id"] = source_id
+                new_chunks.append(chunk)
+                new_chunk_ids.append(chunk_id)
+        stale_ids.extend(old_ids.difference(chunk_ids))
+        manifest_updates[source_id] = {"hash": content_hash, "chunk_ids": chunk_ids}
+        summary["updated" if entry else "added"] += 1
+
+    # Chunks about to be deleted cannot stand in for the new ones; an empty index is falsy, so compare to None
+    dedup_index = dedup_index if dedup_index is not None else get_near_duplicate_index(vector_db)
+    duplicates, signatures = dedup_index.find_duplicates(
+        new_chunk_ids, [chunk.page_content for chunk in new_chunks], exclude=stale_ids
+    )
+    dependents = [
+        (new_chunk_ids[i], original, new_chunks[i].page_content, new_chunks[i].metadata)
+        for i, original in duplicates.items()
+    ]
+    if duplicates:
+        kept = [i for i in range(len(new_chunks)) if i not in duplicates]
+        new_chunks = [new_chunks[i] for i in kept]
+        new_chunk_ids = [new_chunk_ids[i] for i in kept]
+        signatures = [signatures[i] for i in kept]
+        summary["chunks_deduplicated"] = len(duplicates)
+
+    # Write new chunks before deleting old ones so readers never see a gap
+    lexical_index = lexical_index if lexical_index is not None else get_lexical_index(vector_db)
+    for i in range(0, len(new_chunks), BATCH_SIZE):
+        vector_db.add_documents(new_chunks[i:i + BATCH_SIZE], ids=new_chunk_ids[i:i + BATCH_SIZE])
+        lexical_index.add(new_chunk_ids[i:i + BATCH_SIZE], new_chunks[i:i + BATCH_SIZE])
+        dedup_index.add(new_chunk_ids[i:i + BATCH_SIZE], signatures[i:i + BATCH_SIZE])
+    dedup_index.add_dependents(dependents)
+    summary["chunks_promoted"] = _delete_chunks(stale_ids, vector_db, lexical_index, dedup_index)
+    summary["chunks_added"] = len(new_chunks)
+    summary["chunks_removed"] = len(stale_ids)
+
+    manifest.update(manifest_updates)
+    if manifest_updates:
+        _save_manifest(manifest_path, manifest)
+
+    summary["seconds"] = round(time.perf_counter() - start, 3)
+    if summary["chunks_added"] or summary["chunks_removed"]:
+        notify_ingestion_listeners(summary)
+    logger.info(
+        f"Ingestion finished in {summary['seconds']}s: {summary['added']} added, "
+        f"{summary['updated']} updated, {summary['skipped']} skipped sources "
+        f"({summary['chunks_added']} chunks embedded, {summary['chunks_removed']} chunks deleted, "
+        f"{summary['chunks_deduplicated']} near-duplicate chunks skipped, "
+        f"{summary['chunks_promoted']} promoted)"
+    )
+    return summary
+
+
+def prune_sources(vector_db, is_removed: Callable[[str], bool], manifest_path: str = None,
+                  lexical_index: BM25Index = None, dedup_index: NearDuplicateIndex = None) -> Dict[str, Any]:
+    """
+    Delete every stored source the caller knows to be gone upstream.
+
+    Incremental fetches are not full snapshots, so each source type decides
+    for itself which of its sources no longer exist (a Confluence page
+    missing from the space, a Slack message deleted within the scanned window)
+    and their chunks are removed from the vector store and the BM25 index.
+
+    Args:
+        vector_db: Vector database instance
+        is_removed: Called with each source ID in the manifest; True deletes it
+        manifest_path: Path of the ingestion manifest, defaults to config (per embedding model)
+        lexical_index: BM25 index kept in step with the vector store, defaults to the shared one
+        dedup_index: Near-duplicate index of the stored chunks, defaults to the shared one
+
+    Returns:
+        Summary with removed source, removed chunk and promoted duplicate counts and elapsed seconds
+    """
+    start = time.perf_counter()
+    manifest_path = manifest_path or namespaced_path(config.INGEST_MANIFEST_PATH)
+    manifest = _load_manifest(manifest_path)
+    removed_sources = [source_id for source_id in manifest if is_removed(source_id)]
+    stale_ids = [chunk_id for source_id in removed_sources for chunk_id in manifest[source_id]["chunk_ids"]]
+
+    summary = {"removed": len(removed_sources), "chunks_removed": len(stale_ids), "chunks_promoted": 0}
+    if removed_sources:
+        summary["chunks_promoted"] = _delete_chunks(
+            stale_ids, vector_db,
+            lexical_index if lexical_index is not None else get_lexical_index(vector_db),
+            dedup_index if dedup_index is not None else get_near_duplicate_index(vector_db),
+        )
+        for source_id in removed_sources:
+            del manifest[source_id]
+        _save_manifest(manifest_path, manifest)
+        notify_ingestion_listeners(summary)
+        logger.info(f"Pruned {len(removed_sources)} deleted sources ({len(stale_ids)} chunks deleted)")
+    summary["seconds"] = round(time.perf_counter() - start, 3)
+    return summary
@@ -1,4 +1,7 @@
 from langchain.schema import Document
+from src.crud.lexical_index import get_lexical_index
+from src.crud.store import notify_ingestion_listeners, promote_duplicates
+from src.data_preprocessors.near_duplicates import get_near_duplicate_index
 
 def update_data(from_text,to_text, vector_db, embeddings):
     
@@ -10,7 +13,15 @@ def update_data(from_text,to_text, vector_db, embeddings):
             page_content=to_text
         )
 
+        lexical_index = get_lexical_index(vector_db)
+        dedup_index = get_near_duplicate_index(vector_db)
+        # Chunks skipped as duplicates of the old text no longer have a copy in the store
+        promote_duplicates([results[0].id], vector_db, lexical_index, dedup_index)
         vector_db.update_document(document_id = results[0].id, document = updated_document)
+        lexical_index.add([results[0].id], [updated_document])
+        dedup_index.remove([results[0].id])
+        dedup_index.add([results[0].id], [dedup_index.signature(to_text)])
+        notify_ingestion_listeners({"updated_chunks": [results[0].id]})
 
         print("Vector updated successfully.")
     else:
@@ -0,0 +1,196 @@
+import io
+import logging
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Optional
+
+import settings.config as config
+from src.crud.sqlite_cache import SQLiteCache
+from src.data_loaders.enrichment import get_enricher
+from src.data_preprocessors.preprocess_data import preprocess_data
+from src.pipeline.process_pool import new_process_pool
+
+logger = logging.getLogger(__name__)
+
+# Expired and excess cache entries are deleted at most this often
+CACHE_EVICTION_INTERVAL = 3600
+
+
+def _parse_file(data: bytes, filename: str) -> str:
+    """Parse a downloaded file in a worker process and return its cleaned text."""
+    from langchain_community.document_loaders import UnstructuredFileLoader
+
+    # Unstructured needs a real path; keep the extension so it picks the right parser
+    suffix = os.path.splitext(filename or "")[1]
+    fd, path = tempfile.mkstemp(prefix="slack_file_", suffix=suffix)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        docs = UnstructuredFileLoader(path).load()
+        # Clean here too, so the main process never spends GIL time on it
+        return preprocess_data("\n".join(doc.page_content for doc in docs))
+    finally:
+        os.remove(path)
+
+
+class AttachmentParser:
+    """
+    Download Slack attachments into memory and parse them on a process pool.
+
+    Downloads are streamed into a buffer and abandoned once they exceed the size
+    cap. Parsing runs in worker processes with a per-file timeout so slow or huge
+    documents cannot block the fetch threads. Parsed text is cached by Slack file
+    ID and revision, so an attachment is parsed at most once across runs. Files
+    that fail, time out or yield no text are remembered for ATTACHMENT_FAILURE_TTL
+    so they are not parsed again on every refresh. Entries unread for
+    ATTACHMENT_CACHE_TTL, and the least recently read beyond
+    ATTACHMENT_CACHE_MAX_ENTRIES, are evicted.
+
+    A running parse cannot be cancelled, so when one times out its pool is
+    terminated and replaced; parses that were running next to it are retried
+    once on the new pool. No more files are submitted than there are workers,
+    so the timeout only covers parsing, not waiting in the queue.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = None,
+        timeout: float = None,
+        max_bytes: int = None,
+        cache: Optional[SQLiteCache] = None,
+    ):
+        self.timeout = timeout or config.ATTACHMENT_PARSE_TIMEOUT
+        self.max_bytes = max_bytes or config.ATTACHMENT_MAX_BYTES
+        self.cache = cache if cache is not None else SQLiteCache(config.ATTACHMENT_CACHE_PATH, "attachment_text")
+        self._next_eviction = 0.0
+        self.max_workers = max_workers or config.ATTACHMENT_PARSE_WORKERS
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.max_workers)
+        self._executor = new_process_pool(self.max_workers)
+
+    @staticmethod
+    def cache_key(file: Dict[str, Any]) -> str:
+        revision = file.get("updated") or file.get("timestamp") or file.get("created") or 0
+        return f"{file['id']}:{revision}"
+
+    def _evict(self) -> None:
+        with self._lock:
+            if time.monotonic() < self._next_eviction:
+                return
+            self._next_eviction = time.monotonic() + CACHE_EVICTION_INTERVAL
+        evicted = 0
+        if config.ATTACHMENT_CACHE_TTL:
+            evicted += self.cache.evict_older_than(config.ATTACHMENT_CACHE_TTL)
+        if config.ATTACHMENT_CACHE_MAX_ENTRIES:
+            evicted += self.cache.evict_lru(config.ATTACHMENT_CACHE_MAX_ENTRIES)
+        if evicted:
+            logger.info(f"Evicted {evicted} parsed attachments from cache")
+
+    def _remember_failure(self, key: str, reason: str) -> None:
+        self.cache.set(key, {"content": None, "failed_at": time.time(), "reason": reason})
+
+    def _download(self, file_url: str, token: str) -> Optional[bytes]:
+        enricher = get_enricher()
+        headers = {"Authorization": f"Bearer {token}"}
+        with enricher.session.get(file_url, headers=headers, stream=True, timeout=(5, enricher.timeout)) as response:
+            if response.status_code != 200:
+                logger.warning(f"Failed to download file from Slack: {response.status_code}")
+                return None
+            buffer = io.BytesIO()
+            for chunk in response.iter_content(chunk_size=64 * 1024):
+                buffer.write(chunk)
+                if buffer.tell() > self.max_bytes:
+                    logger.warning(f"Skipping {file_url}: larger than {self.max_bytes} bytes")
+                    return None
+            return buffer.getvalue()
+
+    def _restart(self, executor: ProcessPoolExecutor) -> None:
+        """Kill the workers of a pool with a hung parse and start a fresh pool."""
+        with self._lock:
+            if self._executor is not executor:
+                return
+            # ProcessPoolExecutor has no public way to stop a running task
+            for process in list((executor._processes or {}).values()):
+                process.terminate()
+            executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = new_process_pool(self.max_workers)
+
+    def _run(self, data: bytes, filename: str, retry: bool = True) -> Optional[str]:
+        with self._slots:
+            with self._lock:
+                executor = self._executor
+            future = executor.submit(_parse_file, data, filename)
+            try:
+                return future.result(timeout=self.timeout)
+            except TimeoutError:
+                self._restart(executor)
+                raise
+            except BrokenProcessPool:
+                # Killed along with another file's hung parse, or a worker crashed
+                self._restart(executor)
+                if not retry:
+                    raise
+        return self._run(data, filename, retry=False)
+
+    def parse(self, file: Dict[str, Any], token: str) -> Optional[str]:
+        """
+        Return the cleaned text of a Slack file, parsing it only if not cached.
+
+        Args:
+            file: Slack file object from a message
+            token: Bot token used to download the private file URL
+
+        Returns:
+            Preprocessed text, or None if the file could not be parsed
+        """
+        self._evict()
+        key = self.cache_key(file)
+        cached = self.cache.get(key)
+        if cached is not None:
+            if cached["content"] is not None:
+                return cached["content"]
+            if time.time() - cached["failed_at"] < config.ATTACHMENT_FAILURE_TTL:
+                return None
+
+        if file.get("size", 0) > self.max_bytes:
+            logger.warning(f"Skipping file {file['id']}: {file['size']} bytes exceeds the size cap")
+            return None
+
+        data = self._download(file["url_private"], token)
+        if data is None:
+            return None
+
+        try:
+            content = self._run(data, file.get("name", ""))
+        except TimeoutError:
+            logger.error(f"Parsing file {file['id']} timed out after {self.timeout}s; restarted the parser pool")
+            self._remember_failure(key, "timeout")
+            return None
+        except Exception as e:
+            logger.error(f"Parsing file {file['id']} failed: {e}")
+            self._remember_failure(key, "error")
+            return None
+
+        if not content:
+            logger.warning(f"No content found in file {file['id']}")
+            self._remember_failure(key, "empty")
+            return None
+        self.cache.set(key, {"content": content})
+        return content
+
+
+_default_parser = None
+_default_parser_lock = threading.Lock()
+
+
+def get_attachment_parser() -> AttachmentParser:
+    """Return the process-wide parser so the worker pool and cache are shared."""
+    global _default_parser
+    with _default_parser_lock:
+        if _default_parser is None:
+            _default_parser = AttachmentParser()
+        return _default_parser
@@ -0,0 +1,180 @@
+import logging
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Tuple
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import settings.config as config
+from src.crud.sqlite_cache import SQLiteCache
+from src.data_preprocessors.preprocess_data import preprocess_many
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = "Mozilla/5.0 (compatible; ai-blog-generator/1.0)"
+# Expired and excess cache entries are deleted at most this often
+CACHE_EVICTION_INTERVAL = 3600
+
+
+class LinkEnricher:
+    """
+    Fetch the content behind Slack links and files on a bounded thread pool.
+
+    All requests share one pooled ``requests.Session``. Each host gets its own
+    concurrency limit so a page full of links to the same site does not hammer it,
+    and link bodies are cached by URL and revalidated with ETag/Last-Modified.
+    A cached link is dropped URL_CACHE_TTL after it was first stored, so a
+    copy kept alive by a server that always answers 304, or served when the
+    server is down, is never older than that. Beyond URL_CACHE_MAX_ENTRIES
+    the least recently read links are dropped.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = None,
+        per_host_limit: int = None,
+        timeout: float = None,
+        cache: Optional[SQLiteCache] = None,
+    ):
+        self.max_workers = max_workers or config.SLACK_ENRICH_CONCURRENCY
+        self.per_host_limit = per_host_limit or config.SLACK_ENRICH_PER_HOST
+        self.timeout = timeout or config.SLACK_ENRICH_TIMEOUT
+        self.cache = cache if cache is not None else SQLiteCache(config.URL_CACHE_PATH, "url_content")
+        self._next_eviction = 0.0
+        self._eviction_lock = threading.Lock()
+
+        self.session = requests.Session()
+        self.session.headers["User-Agent"] = USER_AGENT
+        adapter = HTTPAdapter(pool_connections=self.max_workers, pool_maxsize=self.max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._host_lock = threading.Lock()
+        self._host_semaphores = defaultdict(lambda: threading.BoundedSemaphore(self.per_host_limit))
+
+    def _host_semaphore(self, url: str) -> threading.BoundedSemaphore:
+        with self._host_lock:
+            return self._host_semaphores[urlparse(url).netloc]
+
+    def _evict(self) -> None:
+        with self._eviction_lock:
+            if time.monotonic() < self._next_eviction:
+                return
+            self._next_eviction = time.monotonic() + CACHE_EVICTION_INTERVAL
+        evicted = 0
+        if config.URL_CACHE_TTL:
+            evicted += self.cache.evict_created_before(config.URL_CACHE_TTL)
+        if config.URL_CACHE_MAX_ENTRIES:
+            evicted += self.cache.evict_lru(config.URL_CACHE_MAX_ENTRIES)
+        if evicted:
+            logger.info(f"Evicted {evicted} cached links")
+
+    def _download(self, link: str) -> Optional[Tuple[Optional[str], Optional[requests.Response]]]:
+        """
+        Fetch a link, revalidating the cached copy.
+
+        Returns:
+            (cached content, None) when the cache is still valid, (None, response)
+            for a fresh 200 response, or None if nothing could be fetched
+        """
+        cached = self.cache.get(link)
+        headers = {}
+        if cached:
+            if cached.get("etag"):
+                headers["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                headers["If-Modified-Since"] = cached["last_modified"]
+
+        try:
+            with self._host_semaphore(link):
+                response = self.session.get(link, headers=headers, timeout=(5, self.timeout))
+        except Exception as e:
+            logger.warning(f"Failed to fetch content from {link}: {e}")
+            return (cached["content"], None) if cached else None
+
+        if response.status_code == 304 and cached:
+            return cached["content"], None
+        if response.status_code != 200:
+            logger.warning(f"Failed to fetch content from {link}: HTTP {response.status_code}")
+            return None
+        return None, response
+
+    def fetch_link(self, link: str) -> Optional[str]:
+        """Return the cleaned text behind a link, reusing the cached copy when unchanged."""
+        return self.fetch_links([link])[0]
+
+    def fetch_links(self, links: List[str]) -> List[Optional[str]]:
+        """
+        Fetch links concurrently and clean the new pages in one batch.
+
+        Downloads run on the thread pool; the HTML of every fresh response is
+        then cleaned with ``preprocess_many``, which moves large batches off
+        the GIL onto worker processes.
+
+        Returns:
+            Cleaned text per link, in order; None where nothing was found
+        """
+        if not links:
+            return []
+        self._evict()
+        if len(links) == 1:
+            downloads = [self._download(links[0])]
+        else:
+            downloads = self.enrich([(self._download, (link,)) for link in links])
+
+        results = [download[0] if download else None for download in downloads]
+        fresh = [i for i, download in enumerate(downloads) if download and download[1] is not None]
+        cleaned = preprocess_many([downloads[i][1].text for i in fresh])
+        for i, content in zip(fresh, cleaned):
+            link, response = links[i], downloads[i][1]
+            if not content:
+                logger.warning(f"No content found in {link}")
+                continue
+            self.cache.set(link, {
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "content": content,
+            })
+            results[i] = content
+        return results
+
+    def enrich(self, tasks: List[Tuple[Callable[..., Optional[str]], tuple]]) -> List[Optional[str]]:
+        """
+        Run enrichment tasks concurrently.
+
+        Args:
+            tasks: (function, args) pairs, e.g. (enricher.fetch_link, (url,))
+
+        Returns:
+            Results in the same order as the tasks
+        """
+        if not tasks:
+            return []
+
+        def run(task):
+            func, args = task
+            try:
+                return func(*args)
+            except Exception as e:
+                logger.error(f"Enrichment task failed: {e}")
+                return None
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            return list(executor.map(run, tasks))
+
+
+_default_enricher = None
+_default_enricher_lock = threading.Lock()
+
+
+def get_enricher() -> LinkEnricher:
+    """Return the process-wide enricher so the HTTP pool and cache are shared."""
+    global _default_enricher
+    with _default_enricher_lock:
+        if _default_enricher is None:
+            _default_enricher = LinkEnricher()
+        return _default_enricher
@@ -1,83 +1,234 @@
+import hashlib
+import json
+import logging
+import os
 import re
-from langchain_community.document_loaders import UnstructuredFileLoader, WebBaseLoader
-import requests
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Set
 import settings.config as config
+from langchain.schema import Document
 from slack_sdk import WebClient
 from slack_sdk.socket_mode import SocketModeClient
-from src.data_preprocessors.preprocess_data import preprocess_data
+from src.data_loaders.attachment_parser import get_attachment_parser
+from src.data_loaders.enrichment import get_enricher
 from datetime import datetime, timedelta
 
 slack_client = WebClient(token=config.SLACK_BOT_TOKEN)
 socket_client = SocketModeClient(app_token=config.SLACK_APP_TOKEN)
 BOT_ID = slack_client.auth_test()["user_id"]
 
+logger = logging.getLogger(__name__)
+
 def fetch_content_from_link(link):
-    try:
-        loader = WebBaseLoader(link)
-        docs = loader.load()
-        if docs:
-            return preprocess_data(docs[0].page_content[:])
-        else:
-            print(f"Warning: No content found in {link}")
-    except Exception as e:
-        print(f"Failed to fetch content from {link}: {e}")
-        return None
+    return get_enricher().fetch_link(link)
 
-def fetch_content_from_document(file_url, header):
-    headers = {"Authorization": f"Bearer {header}"}
-    
+def fetch_content_from_document(file, header):
     try:
-        response = requests.get(file_url, headers=headers)
-        if response.status_code == 200:
-            temp_filename = "/tmp/slack_file"
-            with open(temp_filename, "wb") as f:
-                f.write(response.content)
-
-            loader = UnstructuredFileLoader(temp_filename)
-            docs = loader.load()
-            if docs:
-                return preprocess_data(docs[0].page_content[:])
-            else:
-                print(f"Warning: No content found in {file_url}")
-        else:
-            print(f"Failed to download file from Slack: {response.status_code}")
-            return None
+        return get_attachment_parser().parse(file, header)
     except Exception as e:
         print(f"Error processing document: {e}")
         return None
     
+def _watermark_key(channel_id: str, bot_token: str) -> str:
+    # Never persist raw tokens; a short fingerprint is enough to tell them apart
+    token_fingerprint = hashlib.sha256(bot_token.encode("utf-8")).hexdigest()[:12]
+    return f"{channel_id}:{token_fingerprint}"
+
+def _load_watermarks(path: str) -> Dict[str, str]:
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def _save_watermarks(path: str, watermarks: Dict[str, str]) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(watermarks, f)
+    os.replace(tmp_path, path)
+
 def fetch_slack_messages(channel_id, botToken):
-    slack_client = WebClient(token=botToken)
-    BOT_ID = slack_client.auth_test()["user_id"]
-    
+    return fetch_slack_messages_multi(channel_id, [botToken])[botToken]
+
+def fetch_slack_messages_multi(channel_id: str, bot_tokens: List[str], watermarks_path: str = None) -> Dict[str, List[str]]:
+    """
+    Fetch new messages mentioning each bot and advance the watermarks right away.
+
+    Only for callers that do not store the messages; ingestion uses
+    fetch_slack_delta and commits once the messages are stored.
+    """
+    delta = fetch_slack_delta(channel_id, bot_tokens, watermarks_path)
+    delta.commit()
+    return {token: [doc.page_content for doc in docs] for token, docs in delta.messages.items()}
+
+def message_source_id(channel_id: str, ts: str) -> str:
+    """Stable source ID of a Slack message, so an edit replaces the stored text."""
+    return f"slack:{channel_id}:{ts}"
+
+class SlackDelta:
+    """
+    New or edited Slack messages per bot token, with the watermarks that cover them.
+
+    The watermarks are written only by ``commit()``. A caller that fails to
+    store the messages therefore gets them again on the next fetch instead of
+    losing them.
+
+    After a reconciling fetch, which rescans the whole window, ``live_sources``
+    holds the source IDs of every message in the window per token, and
+    ``is_deleted`` tells which stored messages are gone.
+    """
+
+    def __init__(self, channel_id: str, messages: Dict[str, List[Document]], watermarks_path: str,
+                 watermarks: Dict[str, str], scanned_from: float, live_sources: Optional[Dict[str, Set[str]]] = None):
+        self.channel_id = channel_id
+        self.messages = messages
+        self.watermarks_path = watermarks_path
+        self.watermarks = watermarks
+        self.scanned_from = scanned_from
+        self.live_sources = live_sources
+
+    @property
+    def reconciled(self) -> bool:
+        return self.live_sources is not None
+
+    def is_deleted(self, source_id: str, bot_token: str) -> bool:
+        """
+        True for a stored message of this channel that the reconciling scan
+        covered but no longer found for the bot: deleted, or edited so it no
+        longer mentions the bot. Older messages are left alone.
+        """
+        if not self.reconciled:
+            return False
+        prefix = message_source_id(self.channel_id, "")
+        if not source_id.startswith(prefix):
+            return False
+        try:
+            ts = float(source_id[len(prefix):])
+        except ValueError:
+            return False
+        return ts > self.scanned_from and source_id not in self.live_sources.get(bot_token, ())
+
+    def commit(self) -> None:
+        """Persist the advanced watermarks, marking these messages as processed."""
+        _save_watermarks(self.watermarks_path, self.watermarks)
+
+def _activity_ts(msg: Dict) -> str:
+    """Latest of a message's post and edit times, as a Slack ts string."""
+    ts = msg.get("ts") or "0"
+    edited = (msg.get("edited") or {}).get("ts")
+    return edited if edited and float(edited) > float(ts) else ts
+
+def fetch_slack_delta(channel_id: str, bot_tokens: List[str], watermarks_path: str = None) -> SlackDelta:
+    """
+    Fetch new messages mentioning each bot from a channel in a single history pass.
+
+    Each (channel, token) pair keeps a high-water mark of the newest post or
+    edit time already processed, so only newer messages are requested. Tokens
+    that read the same channel share one ``conversations_history`` scan
+    starting from the oldest of their watermarks, bounded by the configured
+    fetch window.
+
+    Edits and deletions of older messages are invisible to that scan, so every
+    SLACK_RECONCILE_HOURS the whole window is scanned instead: messages edited
+    since the watermark are fetched again, and the IDs of every message still
+    present are returned for pruning.
+
+    Args:
+        channel_id: Slack channel to read
+        bot_tokens: Bot tokens whose mentions should be collected
+        watermarks_path: Path of the watermark file, defaults to config
+
+    Returns:
+        SlackDelta mapping each bot token to one Document per new or edited
+        message (text plus enriched links and files); call its commit() once
+        they are stored
+    """
+    watermarks_path = watermarks_path or config.SLACK_WATERMARK_PATH
+    watermarks = _load_watermarks(watermarks_path)
+    bot_tokens = list(dict.fromkeys(bot_tokens))
+
+    window_start = (datetime.utcnow() - timedelta(days=config.SLACK_FETCH_WINDOW_DAYS)).timestamp()
+    bot_ids = {}
+    token_oldest = {}
+    for token in bot_tokens:
+        bot_ids[token] = WebClient(token=token).auth_test()["user_id"]
+        watermark = watermarks.get(_watermark_key(channel_id, token))
+        token_oldest[token] = max(float(watermark), window_start) if watermark else window_start
+
+    reconcile_key = f"{channel_id}:reconciled"
+    scan_started = time.time()
+    reconcile = scan_started - float(watermarks.get(reconcile_key, 0)) >= config.SLACK_RECONCILE_HOURS * 3600
+    oldest = window_start if reconcile else min(token_oldest.values())
+
+    # The first token reads history on behalf of every bot in the pass
+    history_token = bot_tokens[0]
+    slack_client = WebClient(token=history_token)
     url_pattern = r"https?://[^\s]+"  
     cursor = None
-    messages = []
-    seven_days_ago = int((datetime.utcnow() - timedelta(days=7)).timestamp())
+    messages = {token: [] for token in bot_tokens}
+    live_sources = {token: set() for token in bot_tokens}
+    pending = []
+    newest_ts = None
 
     while True:
-        response = slack_client.conversations_history(channel=channel_id, cursor=cursor, limit=200, oldest=seven_days_ago)
+        response = slack_client.conversations_history(channel=channel_id, cursor=cursor, limit=200, oldest=f"{oldest:.6f}")
 
         for msg in response.get('messages', []):
-            if 'text' in msg and f"<@{BOT_ID}>" in msg['text']:  
-                message_text = msg['text']
-                found_links = re.findall(url_pattern, message_text)
-                messages.append(message_text)
-                
-                # Process links and store their content
-                for link in found_links:
-                    link_content = fetch_content_from_link(link)
-                    if link_content:
-                        messages.append(link_content)
-            if "files" in msg  and f"<@{BOT_ID}>" in msg["text"]:
-                for file in msg["files"]:
-                    if file["mimetype"].startswith("application"):  
-                        file_content = fetch_content_from_document(file["url_private"], config.SLACK_BOT_TOKEN)
-                        if file_content:
-                            messages.append(file_content)
+            ts = msg.get("ts")
+            activity = _activity_ts(msg)
+            if newest_ts is None or float(activity) > float(newest_ts):
+                newest_ts = activity
+            addressed = [token for token in bot_tokens if f"<@{bot_ids[token]}>" in msg.get("text", "")]
+            for token in addressed:
+                live_sources[token].add(message_source_id(channel_id, ts))
+            mentioned = [token for token in addressed if float(activity) > token_oldest[token]]
+            if not ts or not mentioned:
+                continue
+
+            # Queue enrichment once even when several bots are mentioned in the same message
+            message_text = msg['text']
+            links = re.findall(url_pattern, message_text)
+            file_tasks = [
+                (fetch_content_from_document, (file, history_token))
+                for file in msg.get("files", [])
+                if file["mimetype"].startswith("application")
+            ]
+            pending.append((mentioned, ts, message_text, links, file_tasks))
 
         cursor = response.get("response_metadata", {}).get("next_cursor")
         if not cursor:
             break
-    return messages
 
+    # Fetch links and attachments concurrently, then rebuild the output in message order.
+    # Links go through fetch_links so their HTML is cleaned in one batch.
+    enricher = get_enricher()
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        files_future = executor.submit(enricher.enrich, [task for *_, file_tasks in pending for task in file_tasks])
+        link_contents = iter(enricher.fetch_links([link for _, _, _, links, _ in pending for link in links]))
+        file_contents = iter(files_future.result())
+    for mentioned, ts, message_text, links, file_tasks in pending:
+        entries = [message_text]
+        entries += [content for content in (next(link_contents) for _ in links) if content]
+        entries += [content for content in (next(file_contents) for _ in file_tasks) if content]
+        # One document per message keeps its links and files under the message's ID
+        doc = Document(
+            page_content="\n\n".join(entries),
+            metadata={"source_id": message_source_id(channel_id, ts), "channel": channel_id, "ts": ts},
+        )
+        for token in mentioned:
+            messages[token].append(doc)
+
+    if newest_ts:
+        for token in bot_tokens:
+            key = _watermark_key(channel_id, token)
+            if key not in watermarks or float(newest_ts) > float(watermarks[key]):
+                watermarks[key] = newest_ts
+    if reconcile:
+        watermarks[reconcile_key] = f"{scan_started:.6f}"
+
+    logger.info(
+        f"Fetched new Slack messages from {channel_id} since {datetime.utcfromtimestamp(oldest).isoformat()}"
+        f"{' (reconciling the window)' if reconcile else ''}: "
+        + ", ".join(f"{len(msgs)} for bot {bot_ids[token]}" for token, msgs in messages.items())
+    )
+    return SlackDelta(channel_id, messages, watermarks_path, watermarks, oldest, live_sources if reconcile else None)
@@ -0,0 +1,314 @@
+import base64
+import logging
+import threading
+import zlib
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+from settings import config
+from src.crud.embedding_providers import namespaced_path
+from src.crud.sqlite_cache import SQLiteCache
+
+logger = logging.getLogger(__name__)
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+REBUILD_PAGE_SIZE = 5000
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+def _optimal_bands(threshold: float, num_perm: int) -> Tuple[int, int]:
+    """
+    Pick (bands, rows) whose LSH S-curve is steepest around the threshold.
+
+    Minimizes the summed false-positive and false-negative probability mass,
+    the same criterion datasketch uses.
+    """
+    def probability(s: float, bands: int, rows: int) -> float:
+        return 1 - (1 - s ** rows) ** bands
+
+    def integrate(f, a: float, b: float, steps: int = 100) -> float:
+        width = (b - a) / steps
+        return sum(f(a + (i + 0.5) * width) for i in range(steps)) * width
+
+    best, best_error = (1, num_perm), float("inf")
+    for bands in range(1, num_perm + 1):
+        if num_perm % bands:
+            continue
+        rows = num_perm // bands
+        false_positive = integrate(lambda s: probability(s, bands, rows), 0.0, threshold)
+        false_negative = integrate(lambda s: 1 - probability(s, bands, rows), threshold, 1.0)
+        if false_positive + false_negative < best_error:
+            best, best_error = (bands, rows), false_positive + false_negative
+    return best
+
+
+class NearDuplicateDetector:
+    """
+    MinHash signatures and LSH banding parameters for near-duplicate detection.
+
+    Each text is reduced to word shingles and summarized by a ``num_perm``
+    MinHash signature. Signatures are bucketed by ``bands`` bands of ``rows``
+    values, so only texts sharing a bucket are compared, and two texts count
+    as near duplicates when their estimated Jaccard similarity reaches
+    ``threshold``.
+    """
+
+    def __init__(self, threshold: float = 0.85, num_perm: int = 128, shingle_size: int = 3, seed: int = 1):
+        if not 0 < threshold <= 1:
+            raise ValueError(f"Similarity threshold must be in (0, 1], got {threshold}")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.bands, self.rows = _optimal_bands(threshold, num_perm)
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, 1 << 32, size=num_perm, dtype=np.uint64)
+        self._b = rng.randint(0, 1 << 32, size=num_perm, dtype=np.uint64)
+
+    def _shingles(self, normalized: str) -> np.ndarray:
+        """32-bit hashes of the text's distinct word n-grams."""
+        words = normalized.split(" ")
+        hashes = np.fromiter((zlib.crc32(word.encode("utf-8")) for word in words), dtype=np.uint64, count=len(words))
+        count = len(words) - self.shingle_size + 1
+        if count <= 1:
+            # Too short for n-grams: the whole text is its only shingle
+            return np.array([zlib.crc32(normalized.encode("utf-8"))], dtype=np.uint64)
+        # Roll the word hashes into n-gram hashes without building n-gram strings
+        shingles = hashes[:count].copy()
+        for offset in range(1, self.shingle_size):
+            shingles = (shingles * np.uint64(1000003) + hashes[offset:offset + count]) & _MAX_HASH
+        return np.unique(shingles)
+
+    def signature(self, normalized: str) -> np.ndarray:
+        """MinHash signature of a normalized text."""
+        shingles = self._shingles(normalized)
+        hashes = (np.outer(self._a, shingles) + self._b[:, None]) % _MERSENNE_PRIME & _MAX_HASH
+        return hashes.min(axis=1)
+
+class NearDuplicateIndex:
+    """
+    Persistent MinHash LSH index over the stored chunks.
+
+    One signature per chunk ID is kept in SQLite next to the ingest manifest
+    of the current embedding model, and the LSH band buckets are kept in
+    memory. New chunks are checked against every chunk stored by earlier
+    runs, not just the current batch, so a Slack repost of content ingested
+    last week is not embedded again. Signatures are added only once their
+    chunks are written, and removed with them.
+
+    A skipped duplicate is recorded with its text and metadata under the
+    chunk it duplicates, so that when the original is deleted one of its
+    duplicates can be promoted into the vector store in its place.
+    """
+
+    def __init__(self, path: Optional[str] = None, threshold: float = 0.85, num_perm: int = 128):
+        path = path or namespaced_path(config.DEDUP_INDEX_PATH)
+        self.detector = NearDuplicateDetector(threshold=threshold, num_perm=num_perm)
+        self.store = SQLiteCache(path, "chunk_signatures")
+        self.duplicates = SQLiteCache(path, "chunk_duplicates")
+        self._lock = threading.RLock()
+        self._signatures: Dict[str, np.ndarray] = {}
+        self._buckets: Dict[int, Set[str]] = defaultdict(set)
+        self._originals: Dict[str, str] = {}
+        self._dependents: Dict[str, List[str]] = defaultdict(list)
+        for chunk_id, value in self.store.items():
+            self._index(chunk_id, np.frombuffer(base64.b64decode(value["signature"]), dtype="<u4"))
+        for chunk_id, value in self.duplicates.items():
+            self._originals[chunk_id] = value["original"]
+            self._dependents[value["original"]].append(chunk_id)
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def _keys(self, signature: np.ndarray) -> List[int]:
+        # A small int per band instead of its bytes; a collision only adds a candidate to verify
+        rows = self.detector.rows
+        return [
+            band << 32 | zlib.crc32(signature[band * rows:(band + 1) * rows].tobytes())
+            for band in range(self.detector.bands)
+        ]
+
+    def _index(self, chunk_id: str, signature: np.ndarray) -> None:
+        self._signatures[chunk_id] = signature
+        for key in self._keys(signature):
+            self._buckets[key].add(chunk_id)
+
+    def _unindex(self, chunk_id: str) -> None:
+        for key in self._keys(self._signatures.pop(chunk_id)):
+            bucket = self._buckets[key]
+            bucket.discard(chunk_id)
+            if not bucket:
+                del self._buckets[key]
+
+    def signature(self, text: str) -> Optional[np.ndarray]:
+        """MinHash signature of a text, or None if it has no words."""
+        normalized = _normalize(text)
+        if not normalized:
+            return None
+        return self.detector.signature(normalized).astype("<u4")
+
+    def find_duplicates(self, ids: Sequence[str], texts: Sequence[str],
+                        exclude: Iterable[str] = ()) -> Tuple[Dict[int, str], List[Optional[np.ndarray]]]:
+        """
+        Check new chunks against the stored ones and against each other.
+
+        Args:
+            ids: Chunk IDs of the new chunks
+            texts: Their texts
+            exclude: Stored chunks about to be deleted, which must not count as originals
+
+        Returns:
+            (position of each near duplicate -> ID of the chunk it duplicates,
+            signature of every chunk to pass to add once stored)
+        """
+        exclude = set(exclude)
+        duplicates: Dict[int, str] = {}
+        signatures: List[Optional[np.ndarray]] = []
+        batch: Dict[str, np.ndarray] = {}
+        batch_buckets: Dict[int, List[str]] = defaultdict(list)
+        with self._lock:
+            for position, (chunk_id, text) in enumerate(zip(ids, texts)):
+                signature = self.signature(text)
+                signatures.append(signature)
+                if signature is None:
+                    continue
+                keys = self._keys(signature)
+                candidates = {other for key in keys for other in self._buckets.get(key, ())}
+                candidates.update(other for key in keys for other in batch_buckets.get(key, ()))
+                # A chunk already indexed under its own ID is being re-written, not repeated
+                candidates.discard(chunk_id)
+                candidates.difference_update(exclude)
+                original = next((
+                    other for other in sorted(candidates)
+                    if np.mean(batch.get(other, self._signatures.get(other)) == signature) >= self.detector.threshold
+                ), None)
+                if original is not None:
+                    duplicates[position] = original
+                    continue
+                batch[chunk_id] = signature
+                for key in keys:
+                    batch_buckets[key].append(chunk_id)
+        return duplicates, signatures
+
+    def add(self, ids: Sequence[str], signatures: Sequence[Optional[np.ndarray]]) -> None:
+        """Index stored chunks under their vector store IDs."""
+        items = [(chunk_id, signature) for chunk_id, signature in zip(ids, signatures) if signature is not None]
+        with self._lock:
+            for chunk_id, signature in items:
+                if chunk_id in self._signatures:
+                    self._unindex(chunk_id)
+                self._index(chunk_id, signature)
+            self.store.set_many([
+                (chunk_id, {"signature": base64.b64encode(signature.tobytes()).decode("ascii")})
+                for chunk_id, signature in items
+            ])
+
+    def add_dependents(self, items: Sequence[Tuple[str, str, str, Dict[str, Any]]]) -> None:
+        """
+        Record skipped duplicates once their originals are stored.
+
+        Args:
+            items: (duplicate chunk ID, original chunk ID, text, metadata) per skipped chunk
+        """
+        with self._lock:
+            for chunk_id, original, _, _ in items:
+                self._detach(chunk_id)
+                self._originals[chunk_id] = original
+                self._dependents[original].append(chunk_id)
+            self.duplicates.set_many([
+                (chunk_id, {"original": original, "text": text, "metadata": metadata})
+                for chunk_id, original, text, metadata in items
+            ])
+
+    def _detach(self, chunk_id: str) -> None:
+        original = self._originals.pop(chunk_id, None)
+        if original is None:
+            return
+        dependents = self._dependents.get(original)
+        if dependents and chunk_id in dependents:
+            dependents.remove(chunk_id)
+            if not dependents:
+                del self._dependents[original]
+
+    def promote(self, deleted_ids: Sequence[str]) -> List[Tuple[str, str, Dict[str, Any]]]:
+        """
+        Pick a stand-in for every chunk about to be deleted that others duplicate.
+
+        The first surviving duplicate of each deleted original stops being a
+        duplicate and the rest are re-pointed at it. The caller stores the
+        promoted chunks (and adds their signatures) before deleting the originals.
+
+        Returns:
+            (chunk ID, text, metadata) of each promoted chunk
+        """
+        deleted = set(deleted_ids)
+        promoted = []
+        with self._lock:
+            for original in deleted_ids:
+                survivors = [chunk_id for chunk_id in self._dependents.get(original, ()) if chunk_id not in deleted]
+                if not survivors:
+                    continue
+                head, rest = survivors[0], survivors[1:]
+                value = self.duplicates.get(head)
+                for chunk_id in survivors:
+                    self._detach(chunk_id)
+                for chunk_id in rest:
+                    self._originals[chunk_id] = head
+                    self._dependents[head].append(chunk_id)
+                self.duplicates.set_many([
+                    (chunk_id, {**self.duplicates.get(chunk_id), "original": head}) for chunk_id in rest
+                ])
+                self.duplicates.delete(head)
+                if value is not None:
+                    promoted.append((head, value["text"], value["metadata"]))
+        return promoted
+
+    def remove(self, ids: Sequence[str]) -> None:
+        """Forget deleted chunks, whether stored or recorded as duplicates."""
+        with self._lock:
+            for chunk_id in ids:
+                if chunk_id in self._signatures:
+                    self._unindex(chunk_id)
+                self._detach(chunk_id)
+            self.store.delete_many(list(ids))
+            self.duplicates.delete_many(list(ids))
+
+    def rebuild_from(self, vector_db) -> int:
+        """Index every chunk already in a Chroma vector store; returns the number indexed."""
+        indexed = 0
+        while True:
+            page = vector_db.get(include=["documents"], limit=REBUILD_PAGE_SIZE, offset=indexed)
+            ids = page.get("ids") or []
+            if not ids:
+                break
+            self.add(ids, [self.signature(text or "") for text in page["documents"]])
+            indexed += len(ids)
+            if len(ids) < REBUILD_PAGE_SIZE:
+                break
+        logger.info(f"Near-duplicate index rebuilt from the vector store: {indexed} chunks")
+        return indexed
+
+
+_default_index: Optional[NearDuplicateIndex] = None
+_default_index_lock = threading.Lock()
+
+
+def get_near_duplicate_index(vector_db=None) -> NearDuplicateIndex:
+    """
+    Return the process-wide near-duplicate index.
+
+    When it is first loaded empty and a vector store is given, it is rebuilt
+    from the chunks already stored there.
+    """
+    global _default_index
+    with _default_index_lock:
+        if _default_index is None:
+            _default_index = NearDuplicateIndex(threshold=config.DEDUP_THRESHOLD, num_perm=config.DEDUP_NUM_PERM)
+            if not len(_default_index) and vector_db is not None:
+                _default_index.rebuild_from(vector_db)
+        return _default_index
+
@@ -1,10 +1,26 @@
+import logging
 import re
+import threading
 from bs4 import BeautifulSoup
+from langchain.schema import Document
+from settings import config
+from src.pipeline.process_pool import new_process_pool
+
+try:
+    from lxml import etree
+except ImportError:  # lxml is optional; BeautifulSoup's html.parser is the fallback
+    etree = None
+
+logger = logging.getLogger(__name__)
 
 def remove_bot_mentions(text):
     """Remove bot mentions while preserving the original document format."""
     if not text:
         return ""
+
+    # Documents keep their type and metadata; only the content is cleaned
+    if isinstance(text, Document):
+        return Document(page_content=remove_bot_mentions(text.page_content), metadata=dict(text.metadata or {}))
     
     # Convert to string if not already
     text = str(text)
@@ -14,38 +30,78 @@ def remove_bot_mentions(text):
     
     return text
 
-def preprocess_data(text):
+def _extract_text_lxml(text):
+    root = etree.HTML(text)
+    if root is None:
+        return ""
+    # html.parser's get_text() leaves out scripts, styles and templates; match it
+    etree.strip_elements(root, "script", "style", "template", with_tail=False)
+    return "".join(root.itertext())
+
+def _extract_text(text, backend):
+    if backend == "lxml" and etree is not None:
+        try:
+            return _extract_text_lxml(text)
+        except (ValueError, etree.LxmlError) as e:
+            # e.g. str input carrying an XML encoding declaration
+            logger.debug(f"lxml could not parse text, falling back to html.parser: {e}")
+    return BeautifulSoup(text, "html.parser").get_text()
+
+def preprocess_data(text, backend=None):
+    """
+    Strip HTML tags and collapse whitespace.
+
+    Uses lxml when it is installed (HTML_PARSER_BACKEND=lxml), and the
+    pure-Python BeautifulSoup parser otherwise or when lxml rejects the input.
+    """
     if not text:
         return ""
-    
+
     # Remove HTML tags
-    text = BeautifulSoup(text, "html.parser").get_text()
+    text = _extract_text(text, backend or config.HTML_PARSER_BACKEND)
 
-    # Remove multiple spaces, tabs, and newlines
-    text = re.sub(r'\s+', ' ', text)
+    # Collapse runs of spaces, tabs and newlines and trim the ends
+    return " ".join(text.split())
 
-    # Remove leading and trailing spaces
-    text = text.strip()
+_pool = None
+_pool_lock = threading.Lock()
 
-    return text
+def _get_pool():
+    """Return the shared worker pool for large preprocessing batches."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = new_process_pool(config.PREPROCESS_WORKERS)
+        return _pool
 
-def remove_duplicate_documents(documents):
-    """Remove duplicate documents based on their content."""
-    if not documents:
-        return []
-    
-    # Convert all documents to strings if they aren't already
-    doc_strings = [str(doc) if not isinstance(doc, str) else doc for doc in documents]
-    
-    # Use a set to track unique documents
-    unique_docs = []
-    seen = set()
-    
-    for doc in doc_strings:
-        # Normalize the document content by removing extra whitespace
-        normalized_doc = ' '.join(doc.split())
-        if normalized_doc not in seen:
-            seen.add(normalized_doc)
-            unique_docs.append(doc)
-    
-    return unique_docs
+def preprocess_many(texts, backend=None, workers=None):
+    """
+    Clean a batch of HTML texts, in order.
+
+    Batches of at least PREPROCESS_POOL_MIN_CHARS characters are spread over a
+    process pool, since parsing is CPU bound and holds the GIL; smaller ones
+    are cleaned inline, where pickling would cost more than it saves.
+
+    Args:
+        texts: HTML or plain texts; empty entries come back as ""
+        backend: "lxml" or "html.parser", defaults to HTML_PARSER_BACKEND
+        workers: Worker processes to use, 1 to force inline cleaning
+
+    Returns:
+        Cleaned texts, one per input
+    """
+    texts = list(texts)
+    backend = backend or config.HTML_PARSER_BACKEND
+    workers = workers or config.PREPROCESS_WORKERS
+    total_chars = sum(len(text) for text in texts if text)
+    if workers <= 1 or len(texts) < 2 or total_chars < config.PREPROCESS_POOL_MIN_CHARS:
+        return [preprocess_data(text, backend) for text in texts]
+
+    pool = _get_pool() if workers == config.PREPROCESS_WORKERS else new_process_pool(workers)
+    # A few chunks per worker keeps them busy without one IPC round trip per text
+    chunksize = max(1, len(texts) // (workers * 4))
+    try:
+        return list(pool.map(preprocess_data, texts, [backend] * len(texts), chunksize=chunksize))
+    finally:
+        if pool is not _pool:
+            pool.shutdown()
@@ -0,0 +1,133 @@
+import logging
+import threading
+import time
+import uuid
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class JobQueueFull(Exception):
+    """Raised when a command already has too many queued jobs."""
+    pass
+
+
+class Job:
+    """A unit of work submitted by a Slack command, carrying its own context."""
+
+    def __init__(self, command: str, func: Callable[["Job"], Any], context: Dict[str, Any]):
+        self.id = uuid.uuid4().hex[:8]
+        self.command = command
+        self.func = func
+        self.context = context
+        self.status = "queued"
+        self.error: Optional[str] = None
+        self.submitted_at = time.monotonic()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    @property
+    def wait_seconds(self) -> float:
+        return (self.started_at or time.monotonic()) - self.submitted_at
+
+
+class JobQueue:
+    """
+    Bounded worker pool with per-command concurrency limits.
+
+    Each command may run at most its configured number of jobs at once and
+    queues the rest in its own FIFO. The pool has one worker per allowed slot,
+    so a burst of slow commands (e.g. /blog) can never occupy the workers that
+    other commands (e.g. /support) are entitled to.
+    """
+
+    def __init__(self, limits: Dict[str, int], max_queued: int = 50):
+        self.limits = dict(limits)
+        self.max_queued = max_queued
+        self._executor = ThreadPoolExecutor(max_workers=sum(self.limits.values()), thread_name_prefix="slack-job")
+        self._lock = threading.Lock()
+        self._pending: Dict[str, deque] = defaultdict(deque)
+        self._running: Dict[str, int] = defaultdict(int)
+        self._metrics: Dict[str, Dict[str, float]] = defaultdict(
+            lambda: {"submitted": 0, "completed": 0, "failed": 0, "total_wait": 0.0, "max_wait": 0.0}
+        )
+
+    def submit(self, command: str, func: Callable[[Job], Any], **context) -> Job:
+        """
+        Queue a job for a command.
+
+        Args:
+            command: Command name used for concurrency limits and metrics
+            func: Callable invoked with the Job; read inputs from job.context
+            **context: Inputs the job needs, e.g. keyword and respond
+
+        Returns:
+            The queued Job
+
+        Raises:
+            JobQueueFull: If the command's queue is already at capacity
+        """
+        if command not in self.limits:
+            raise ValueError(f"No concurrency limit configured for command: {command}")
+        job = Job(command, func, context)
+        with self._lock:
+            if self._running[command] < self.limits[command]:
+                self._running[command] += 1
+                self._start(job)
+            elif len(self._pending[command]) >= self.max_queued:
+                raise JobQueueFull(f"Too many queued {command} jobs, please try again later")
+            else:
+                self._pending[command].append(job)
+            self._metrics[command]["submitted"] += 1
+        return job
+
+    def _start(self, job: Job) -> None:
+        job.started_at = time.monotonic()
+        job.status = "running"
+        metrics = self._metrics[job.command]
+        metrics["total_wait"] += job.wait_seconds
+        metrics["max_wait"] = max(metrics["max_wait"], job.wait_seconds)
+        logger.info(
+            f"Job {job.id} ({job.command}) started after waiting {job.wait_seconds:.2f}s, "
+            f"{len(self._pending[job.command])} still queued"
+        )
+        self._executor.submit(self._run, job)
+
+    def _run(self, job: Job) -> None:
+        try:
+            job.func(job)
+            job.status = "completed"
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+            logger.error(f"Job {job.id} ({job.command}) failed: {e}")
+        finally:
+            job.finished_at = time.monotonic()
+            with self._lock:
+                self._metrics[job.command][job.status] += 1
+                if self._pending[job.command]:
+                    self._start(self._pending[job.command].popleft())
+                else:
+                    self._running[job.command] -= 1
+            logger.info(f"Job {job.id} ({job.command}) {job.status} in {job.finished_at - job.started_at:.2f}s")
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Return queue depth, running jobs and wait-time metrics per command."""
+        with self._lock:
+            result = {}
+            for command, limit in self.limits.items():
+                metrics = self._metrics[command]
+                started = metrics["submitted"] - len(self._pending[command])
+                result[command] = {
+                    "limit": limit,
+                    "running": self._running[command],
+                    "queued": len(self._pending[command]),
+                    "submitted": metrics["submitted"],
+                    "completed": metrics["completed"],
+                    "failed": metrics["failed"],
+                    "avg_wait_seconds": round(metrics["total_wait"] / started, 3) if started else 0.0,
+                    "max_wait_seconds": round(metrics["max_wait"], 3),
+                }
+            return result
@@ -3,9 +3,12 @@ from slack_bolt.adapter.socket_mode import SocketModeHandler
 from settings import config
 from src.crud.get import get_data
 from src.crud.update import update_data
-from globals import vector_db, embeddings, keyword_storage
+from globals import vector_db, embeddings, answer_cache
 from src.generators.blog_generator import BlogGenerationError, BlogGenerator
 from src.chatbot.support_bot import SupportBot
+from src.publishers.slack_stream import SlackStreamUpdater
+from src.event_listener.job_queue import Job, JobQueue, JobQueueFull
+from src.pipeline.refresh import get_refresh_pipeline
 import logging
 from typing import Optional, Dict, Any
 
@@ -14,6 +17,17 @@ logger = logging.getLogger(__name__)
 
 blog_generator = BlogGenerator()
 
+# Slow commands run here instead of on the Bolt listener thread
+job_queue = JobQueue(
+    limits={
+        "blog": config.JOB_LIMIT_BLOG,
+        "get": config.JOB_LIMIT_GET,
+        "update": config.JOB_LIMIT_UPDATE,
+        "support": config.JOB_LIMIT_SUPPORT,
+    },
+    max_queued=config.JOB_MAX_QUEUED,
+)
+
 class SlackListenerError(Exception):
     """Custom exception for Slack listener errors."""
     pass
@@ -32,7 +46,7 @@ except Exception as e:
 
 # Initialize support bot
 try:
-    support_bot = SupportBot()
+    support_bot = SupportBot(answer_cache=answer_cache)
 except Exception as e:
     logger.error(f"Failed to initialize support bot: {e}")
     raise SlackListenerError("Failed to initialize support bot")
@@ -54,6 +68,39 @@ def handle_error(error: Exception, respond: Optional[callable] = None) -> None:
         except Exception as e:
             logger.error(f"Failed to send error message to Slack: {e}")
 
+def submit_job(command: str, func, respond: Optional[callable] = None, **context) -> Optional[Job]:
+    """
+    Queue a command's work on the job queue and report the job ID.
+
+    Args:
+        command: Command name used for concurrency limits
+        func: Job function receiving the Job
+        respond: Optional Slack respond function, also passed to the job
+        **context: Inputs the job needs
+
+    Returns:
+        The queued Job, or None if the queue is full
+    """
+    try:
+        job = job_queue.submit(command, func, respond=respond, **context)
+    except JobQueueFull as e:
+        handle_error(e, respond)
+        return None
+    logger.info(f"Queued {command} job {job.id}; queue stats: {job_queue.stats()[command]}")
+    return job
+
+def _run_blog_job(job: Job) -> None:
+    keyword = job.context["keyword"]
+    respond = job.context["respond"]
+    logger.info(f"Blog generation started for {keyword}")
+    try:
+        stream_channel = config.SLACK_CHANNEL_ID if config.SLACK_STREAM_RESPONSES else None
+        blog_generator.generate_blogs(vector_db, keyword=keyword, stream_channel=stream_channel)
+    except BlogGenerationError as e:
+        handle_error(e, respond)
+    except Exception as e:
+        handle_error(e, respond)
+
 @app.command("/blog")
 def handle_blog_command(ack, respond, command):
     """Handle /blog command with error handling."""
@@ -65,20 +112,22 @@ def handle_blog_command(ack, respond, command):
             respond("Please provide a keyword. Example: `/blog remittance`")
             return
         
-        respond(f"Generating blog for keyword: *{keyword}*")
-        keyword_storage["keyword"] = keyword  
-        logger.info(f"Blog generation started for {keyword}")
-        
-        try:
-            blog_generator.generate_blogs(vector_db, embeddings, keyword=keyword)
-        except BlogGenerationError as e:
-            handle_error(e, respond)
-        except Exception as e:
-            handle_error(e, respond)
+        job = submit_job("blog", _run_blog_job, respond=respond, keyword=keyword, user_id=command.get("user_id"))
+        if job:
+            respond(f"Generating blog for keyword: *{keyword}* (job `{job.id}`)")
             
     except Exception as e:
         handle_error(e, respond)
 
+def _run_get_job(job: Job) -> None:
+    sentence = job.context["sentence"]
+    respond = job.context["respond"]
+    try:
+        results = get_data(sentence, vector_db)
+        respond(f"Results for *{sentence}: *{results}")
+    except Exception as e:
+        handle_error(e, respond)
+
 @app.command("/get")
 def handle_get_command(ack, respond, command):
     """Handle /get command with error handling."""
@@ -90,12 +139,9 @@ def handle_get_command(ack, respond, command):
             respond("Please provide input. Example: `/get Remido`")
             return
         
-        respond(f"Getting information for: *{sentence}*")
-        try:
-            results = get_data(sentence, vector_db)
-            respond(f"Results for *{sentence}: *{results}")
-        except Exception as e:
-            handle_error(e, respond)
+        job = submit_job("get", _run_get_job, respond=respond, sentence=sentence)
+        if job:
+            respond(f"Getting information for: *{sentence}* (job `{job.id}`)")
             
     except Exception as e:
         handle_error(e, respond)
@@ -133,31 +179,68 @@ def open_modal(ack, command, client):
         handle_error(e)
         logger.error(f"Error opening modal: {e}")
 
+def _run_update_job(job: Job) -> None:
+    from_text = job.context["from_text"]
+    to_text = job.context["to_text"]
+    client = job.context["client"]
+    try:
+        update_data(from_text, to_text, vector_db, embeddings)
+        updated_text = f"Replaced *{from_text}* with *{to_text}*"
+        client.chat_postMessage(channel=config.SLACK_CHANNEL_ID, text=updated_text)
+    except Exception as e:
+        handle_error(e)
+        client.chat_postMessage(
+            channel=config.SLACK_CHANNEL_ID,
+            text=f"Failed to update text: {str(e)}"
+        )
+
 @app.view("update_text")
 def handle_submission(ack, body, client):
     """Handle modal submission with error handling."""
     try:
-        ack()
         from_text = body["view"]["state"]["values"].get("from_text", {}).get("from", {}).get("value", "")
         to_text = body["view"]["state"]["values"].get("to_text", {}).get("to", {}).get("value", "")
 
         if not from_text or not to_text:
             raise ValueError("Both 'From' and 'To' fields are required")
 
+        ack()
+        job = submit_job("update", _run_update_job, from_text=from_text, to_text=to_text, client=client)
+        # A modal has no respond(), so tell only the submitting user
+        text = (
+            f"Updating *{from_text}* to *{to_text}* (job `{job.id}`)" if job
+            else "Too many updates are queued, please try again later."
+        )
         try:
-            update_data(from_text, to_text, vector_db, embeddings)
-            updated_text = f"Replaced *{from_text}* with *{to_text}*"
-            client.chat_postMessage(channel=config.SLACK_CHANNEL_ID, text=updated_text)
+            client.chat_postEphemeral(channel=config.SLACK_CHANNEL_ID, user=body["user"]["id"], text=text)
         except Exception as e:
-            handle_error(e)
-            client.chat_postMessage(
-                channel=config.SLACK_CHANNEL_ID,
-                text=f"Failed to update text: {str(e)}"
-            )
+            logger.error(f"Failed to confirm update job to the user: {e}")
     except Exception as e:
         handle_error(e)
         ack({"response_action": "errors", "errors": {"from_text": str(e)}})
 
+def _run_support_job(job: Job) -> None:
+    sentence = job.context["sentence"]
+    user_id = job.context["user_id"]
+    respond = job.context["respond"]
+    try:
+        header = f"User {user_id} asked: {sentence}\nResponse: "
+        if config.SLACK_STREAM_RESPONSES:
+            updater = SlackStreamUpdater(app.client, config.SLACK_CHANNEL_ID)
+            updater.start(header + "_thinking..._")
+            response = support_bot.get_response(
+                sentence, session_id=user_id, on_token=lambda text: updater.update(header + text)
+            )
+            updater.finish(header + response)
+        else:
+            response = support_bot.get_response(sentence, session_id=user_id)
+            app.client.chat_postMessage(
+                channel=config.SLACK_CHANNEL_ID,
+                text=header + response
+            )
+    except Exception as e:
+        handle_error(e, respond)
+
 @app.command("/support")
 def handle_support_command(ack, respond, command):
     """Handle /support command with error handling."""
@@ -171,16 +254,61 @@ def handle_support_command(ack, respond, command):
 
         user_id = command["user_id"]
         logger.info(f"Support request from user {user_id}: {sentence}")
+        job = submit_job("support", _run_support_job, respond=respond, sentence=sentence, user_id=user_id)
+        if job:
+            respond(f"Looking into your question: *{sentence}* (job `{job.id}`)")
+            
+    except Exception as e:
+        handle_error(e, respond)
 
-        try:
-            response = support_bot.get_response(sentence)
-            app.client.chat_postMessage(
-                channel=config.SLACK_CHANNEL_ID,
-                text=f"User {user_id} asked: {sentence}\nResponse: {response}"
+def _format_refresh_status(status: Dict[str, Any]) -> str:
+    if status["running"]:
+        lines = [f"Refresh running (stage: {status['current_stage'] or 'starting'})."]
+    else:
+        lines = ["No refresh running."]
+    last_run = status["last_run"]
+    if last_run:
+        stages = ", ".join(f"{name} {seconds}s" for name, seconds in last_run["stages"].items())
+        lines.append(f"Last run started {last_run['started']}: {last_run['status']} in {last_run['seconds']}s ({stages})")
+        if last_run.get("error"):
+            lines.append(f"Error: {last_run['error']}")
+        if last_run.get("ingestion"):
+            ingestion = last_run["ingestion"]
+            lines.append(
+                f"Ingested: {ingestion.get('added', 0)} added, {ingestion.get('updated', 0)} updated, "
+                f"{ingestion.get('skipped', 0)} unchanged"
             )
-        except Exception as e:
-            handle_error(e, respond)
-            
+        if last_run.get("embedding_cache"):
+            cache = last_run["embedding_cache"]
+            lines.append(
+                f"Embedding cache: {cache['hits']} hits, {cache['misses']} misses "
+                f"({cache['hit_rate']:.0%} hit rate), {cache['entries']} entries"
+            )
+    if status["next_run_in_seconds"] is not None:
+        lines.append(f"Next scheduled run in {int(status['next_run_in_seconds'] // 60)} min.")
+    return "\n".join(lines)
+
+def _format_job_stats(stats: Dict[str, Dict[str, float]]) -> str:
+    lines = ["Job queues:"]
+    for command, metrics in stats.items():
+        lines.append(
+            f"/{command}: {metrics['running']}/{metrics['limit']} running, {metrics['queued']} queued, "
+            f"{metrics['completed']} done, {metrics['failed']} failed, "
+            f"wait avg {metrics['avg_wait_seconds']}s max {metrics['max_wait_seconds']}s"
+        )
+    return "\n".join(lines)
+
+@app.command("/refresh")
+def handle_refresh_command(ack, respond, command):
+    """Show the background refresh and job queue status, or start a run with `/refresh now`."""
+    try:
+        ack()
+        pipeline = get_refresh_pipeline()
+        if command["text"].strip().lower() == "now":
+            started = pipeline.trigger()
+            respond("Refresh started." if started else "A refresh is already running.")
+            return
+        respond(f"{_format_refresh_status(pipeline.status())}\n{_format_job_stats(job_queue.stats())}")
     except Exception as e:
         handle_error(e, respond)
 
@@ -1,11 +1,16 @@
 from settings import config
-from openai import OpenAI
 from langchain.schema import Document
-from src.publishers.google_docs import upload_to_google_docs
+from src.publishers.google_docs import get_google_docs_publisher, upload_to_google_docs
 from src.crud.get_semantic_data import get_relevant_docs
 from src.data_loaders.slack_fetcher import slack_client
+from src.publishers.slack_stream import SlackStreamUpdater
+from src.generators.token_packer import count_tokens
+from src.llm.gateway import Priority, get_gateway
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import logging
-from typing import Optional, List, Dict, Any
+import threading
+import time
+from typing import Callable, Optional, List, Dict, Any, Tuple
 
 # Set up logging
 logger = logging.getLogger(__name__)
@@ -14,35 +19,65 @@ class BlogGenerationError(Exception):
     """Custom exception for blog generation errors."""
     pass
 
+_publish_pool = None
+_publish_pool_lock = threading.Lock()
+
+def _get_publish_pool() -> ThreadPoolExecutor:
+    """Return the shared pool that publishes variants while the others still generate."""
+    global _publish_pool
+    with _publish_pool_lock:
+        if _publish_pool is None:
+            _publish_pool = ThreadPoolExecutor(max_workers=config.BLOG_MAX_CONCURRENCY, thread_name_prefix="blog-publish")
+        return _publish_pool
+
 class BlogGenerator:
-    def __init__(self):
+    def __init__(self, max_concurrency: Optional[int] = None):
         try:
-            self.client = OpenAI(api_key=config.OPEN_API_KEY)
+            self.gateway = get_gateway()
         except Exception as e:
             logger.error(f"Failed to initialize OpenAI client: {e}")
             raise BlogGenerationError("Failed to initialize blog generator")
+        self.max_concurrency = max_concurrency or config.BLOG_MAX_CONCURRENCY
 
-    def generate_blogs(self, vector_db, embeddings, keyword: str) -> List[Dict[str, Any]]:
+    def generate_blogs(
+        self,
+        vector_db,
+        keyword: str,
+        metadata_filter: Optional[Dict[str, Any]] = None,
+        stream_channel: Optional[str] = None,
+    ) -> Tuple[List[Dict[str, Any]], Dict[str, float]]:
         """
         Generate blog posts with comprehensive error handling.
+
+        Variants are generated concurrently, and each one is published as soon
+        as it is ready while the others are still generating. A failing variant
+        does not affect the rest.
         
         Args:
             vector_db: Vector database instance
-            embeddings: Embeddings model
             keyword: Topic keyword for blog generation
+            metadata_filter: Optional metadata filter applied to context retrieval
+            stream_channel: If set, stream each variant into its own message in this Slack channel
             
         Returns:
-            List of generated blog posts with their metadata
+            (generated blog posts with their metadata, timings of this run);
+            the generator is shared by concurrent /blog jobs, so nothing is kept on it
             
         Raises:
             BlogGenerationError: If blog generation fails
         """
+        run_start = time.perf_counter()
         try:
-            # Get relevant documents
-            docs = vector_db.get(include=["documents"])["documents"]
-            examples = [{"content": doc} for doc in docs]
-
-            context = "\n".join(get_relevant_docs(examples, embeddings, keyword))
+            # Get relevant documents straight from the persistent collection
+            context = "\n".join(get_relevant_docs(
+                vector_db,
+                keyword,
+                k=config.BLOG_CONTEXT_K,
+                use_mmr=config.BLOG_CONTEXT_USE_MMR,
+                fetch_k=config.BLOG_CONTEXT_FETCH_K,
+                metadata_filter=metadata_filter,
+            ))
+            retrieval_seconds = time.perf_counter() - run_start
             if not context:
                 logger.warning(f"No relevant context found for keyword: {keyword}")
                 raise BlogGenerationError("No relevant context found for the given keyword")
@@ -73,26 +108,89 @@ class BlogGenerator:
                 - Focusing on practical applications and benefits"""
             ]
 
-            generated_blogs = []
-            for i, blog_prompt in enumerate(blog_types):
-                try:
-                    blog_content = self._generate_single_blog(blog_prompt, context, i)
+            results: List[Optional[Dict[str, Any]]] = [None] * len(blog_types)
+            # Opt-in: batching the Google Docs calls means waiting for every variant before publishing
+            batch_publish = config.GOOGLE_DOCS_BATCH and len(blog_types) > 1
+            publish_pool = _get_publish_pool()
+            workers = max(1, min(self.max_concurrency, len(blog_types)))
+            with ThreadPoolExecutor(max_workers=workers) as generate_pool:
+                generate = self._generate_streamed_blog if stream_channel else self._generate_single_blog
+                extra_args = (keyword, stream_channel) if stream_channel else ()
+                generate_futures = {
+                    generate_pool.submit(generate, blog_prompt, context, i, *extra_args): i
+                    for i, blog_prompt in enumerate(blog_types)
+                }
+                publish_futures = []
+                for future in as_completed(generate_futures):
+                    i = generate_futures[future]
+                    try:
+                        blog_content = future.result()
+                    except Exception as e:
+                        logger.error(f"Failed to generate blog {i+1}: {e}")
+                        continue
                     if blog_content:
-                        generated_blogs.append(blog_content)
-                except Exception as e:
-                    logger.error(f"Failed to generate blog {i+1}: {e}")
-                    continue
+                        results[i] = blog_content
+                        if not batch_publish:
+                            publish_futures.append(publish_pool.submit(self._publish_blog, blog_content))
+            for future in publish_futures:
+                future.result()
 
+            generated_blogs = [blog for blog in results if blog]
             if not generated_blogs:
                 raise BlogGenerationError("Failed to generate any blog posts")
+            if batch_publish:
+                self._publish_blogs(generated_blogs)
 
-            return generated_blogs
+            timings = {
+                "retrieval_seconds": round(retrieval_seconds, 3),
+                "generate_seconds_max": max(blog["timings"]["generate_seconds"] for blog in generated_blogs),
+                "publish_seconds_max": max(blog["timings"].get("publish_seconds", 0.0) for blog in generated_blogs),
+                "end_to_end_seconds": round(time.perf_counter() - run_start, 3),
+            }
+            logger.info(f"Generated {len(generated_blogs)}/{len(blog_types)} blogs for {keyword}: {timings}")
+            return generated_blogs, timings
 
         except Exception as e:
             logger.error(f"Blog generation failed: {e}")
             raise BlogGenerationError(f"Failed to generate blogs: {str(e)}")
 
-    def _generate_single_blog(self, blog_prompt: str, context: str, index: int) -> Optional[Dict[str, Any]]:
+    def _generate_streamed_blog(self, blog_prompt: str, context: str, index: int, keyword: str, channel: str) -> Optional[Dict[str, Any]]:
+        """
+        Generate a single blog post while streaming its text into a Slack message.
+        
+        Args:
+            blog_prompt: The prompt for blog generation
+            context: The context to use for generation
+            index: The index of the blog type
+            keyword: Topic keyword, shown in the placeholder message
+            channel: Slack channel to stream into
+            
+        Returns:
+            Dictionary containing the blog title and content, or None if generation fails
+        """
+        updater = SlackStreamUpdater(slack_client, channel)
+        try:
+            updater.start(f"_Writing blog {index+1} about {keyword}..._")
+        except Exception as e:
+            logger.error(f"Failed to start streamed Slack message: {e}")
+            return self._generate_single_blog(blog_prompt, context, index)
+
+        blog = self._generate_single_blog(blog_prompt, context, index, on_token=updater.update)
+        if blog:
+            updater.finish(f"*{blog['title']}*\n{blog['content']}")
+            # Publishing adds the doc link to this message instead of posting the blog again
+            blog["slack_message"] = {"channel": channel, "ts": updater.ts}
+        else:
+            updater.finish(f"_Failed to generate blog {index+1}_")
+        return blog
+
+    def _generate_single_blog(
+        self,
+        blog_prompt: str,
+        context: str,
+        index: int,
+        on_token: Optional[Callable[[str], None]] = None,
+    ) -> Optional[Dict[str, Any]]:
         """
         Generate a single blog post with error handling.
         
@@ -100,11 +198,13 @@ class BlogGenerator:
             blog_prompt: The prompt for blog generation
             context: The context to use for generation
             index: The index of the blog type
+            on_token: Optional callback streamed the text generated so far
             
         Returns:
             Dictionary containing the blog title and content, or None if generation fails
         """
         try:
+            start = time.perf_counter()
             prompt = f"""
             Based on the following data, write a compelling 1200-word blog post that engages readers from start to finish.
             The blog should be professional yet conversational, with a clear narrative arc and memorable insights.
@@ -127,19 +227,40 @@ class BlogGenerator:
             End with impact and action. Leave readers with clear takeaways and next steps.
             """
 
-            response = self.client.chat.completions.create(
-                model="gpt-4-turbo",
-                messages=[
-                    {
-                        "role": "system", 
-                        "content": "You are an expert content strategist and storyteller. Write engaging, memorable content that combines professional insights with compelling narrative. Focus on clarity, impact, and reader engagement."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=1500,
-                temperature=0.7
-            )
+            messages = [
+                {
+                    "role": "system", 
+                    "content": "You are an expert content strategist and storyteller. Write engaging, memorable content that combines professional insights with compelling narrative. Focus on clarity, impact, and reader engagement."},
+                {"role": "user", "content": prompt}
+            ]
+            timings = {}
 
-            blog_content = response.choices[0].message.content
+            def complete() -> str:
+                response = self.gateway.client.chat.completions.create(
+                    model="gpt-4-turbo",
+                    messages=messages,
+                    max_tokens=1500,
+                    temperature=0.7,
+                    stream=on_token is not None
+                )
+                if on_token is None:
+                    return response.choices[0].message.content
+                parts = []
+                for chunk in response:
+                    if not chunk.choices or not chunk.choices[0].delta.content:
+                        continue
+                    if not parts:
+                        timings["first_token_seconds"] = round(time.perf_counter() - start, 3)
+                    parts.append(chunk.choices[0].delta.content)
+                    on_token("".join(parts))
+                return "".join(parts)
+
+            blog_content = self.gateway.call(
+                "blog",
+                complete,
+                priority=Priority.NORMAL,
+                tokens=count_tokens(messages[0]["content"] + prompt) + 1500,
+            )
 
             title_line = blog_content.split("\n")[0]
             if title_line.lower().startswith("title:"):
@@ -149,40 +270,79 @@ class BlogGenerator:
                 title = f"Generated Blog {index+1}"
                 blog_body = blog_content.strip()
 
-            # Post to Slack with error handling
-            try:
-                self._post_to_slack(title, blog_body)
-            except Exception as e:
-                logger.error(f"Failed to post blog to Slack: {e}")
-                # Continue even if Slack posting fails
-
             return {
                 "title": title,
                 "content": blog_body,
-                "type": ["Company Update", "Thought Leadership", "Technical Deep-Dive"][index]
+                "type": ["Company Update", "Thought Leadership", "Technical Deep-Dive"][index],
+                "timings": {**timings, "generate_seconds": round(time.perf_counter() - start, 3)},
             }
 
         except Exception as e:
             logger.error(f"Failed to generate blog {index+1}: {e}")
             return None
 
-    def _post_to_slack(self, title: str, content: str) -> None:
+    def _publish_blog(self, blog: Dict[str, Any]) -> None:
+        """
+        Publish a generated blog, recording how long it took.
+
+        Args:
+            blog: Blog dictionary returned by _generate_single_blog
+        """
+        start = time.perf_counter()
+        try:
+            self._post_to_slack(blog["title"], blog["content"], message=blog.get("slack_message"))
+        except Exception as e:
+            logger.error(f"Failed to post blog to Slack: {e}")
+            # Continue even if Slack posting fails
+        blog["timings"]["publish_seconds"] = round(time.perf_counter() - start, 3)
+
+    def _publish_blogs(self, blogs: List[Dict[str, Any]]) -> None:
+        """
+        Publish several blogs, creating their Google Docs in one batch.
+
+        Args:
+            blogs: Blog dictionaries returned by _generate_single_blog
+        """
+        start = time.perf_counter()
+        try:
+            links = get_google_docs_publisher().upload_many([(blog["title"], blog["content"]) for blog in blogs])
+        except Exception as e:
+            logger.error(f"Batch Google Docs upload failed, falling back to one by one: {e}")
+            links = [None] * len(blogs)
+        for blog, doc_link in zip(blogs, links):
+            try:
+                self._post_to_slack(blog["title"], blog["content"], doc_link=doc_link, message=blog.get("slack_message"))
+            except Exception as e:
+                logger.error(f"Failed to post blog to Slack: {e}")
+            blog["timings"]["publish_seconds"] = round(time.perf_counter() - start, 3)
+
+    def _post_to_slack(self, title: str, content: str, doc_link: Optional[str] = None,
+                       message: Optional[Dict[str, str]] = None) -> None:
         """
         Post blog content to Slack with error handling.
         
         Args:
             title: Blog title
             content: Blog content
+            doc_link: Link of an already created Google Doc; one is created if omitted
+            message: Channel and ts of the message the blog was streamed into, which gets the link appended
             
         Raises:
             Exception: If posting to Slack fails
         """
         try:
-            doc_link = upload_to_google_docs(title, content)
-            response = slack_client.chat_postMessage(
-                channel=config.SLACK_CHANNEL_ID,
-                text=f"*{title}*\nRead the full blog here: {doc_link}"
-            )
+            doc_link = doc_link or upload_to_google_docs(title, content)
+            if message:
+                response = slack_client.chat_update(
+                    channel=message["channel"],
+                    ts=message["ts"],
+                    text=f"*{title}*\n{content}\n\nRead the full blog here: {doc_link}"
+                )
+            else:
+                response = slack_client.chat_postMessage(
+                    channel=config.SLACK_CHANNEL_ID,
+                    text=f"*{title}*\nRead the full blog here: {doc_link}"
+                )
             if not response["ok"]:
                 raise Exception(f"Slack API error: {response.get('error', 'Unknown error')}")
         except Exception as e:
@@ -1,68 +1,352 @@
-from langchain_openai import ChatOpenAI
 import settings.config as config
-import time
-from typing import List
-
-def chunk_text(text_list: List[str], max_chunk_size: int = 3000) -> List[str]:
-    """Split text into smaller chunks to avoid token limits."""
-    chunks = []
-    current_chunk = []
-    current_size = 0
-    
-    for text in text_list:
-        text_size = len(text.split())
-        if current_size + text_size > max_chunk_size:
-            if current_chunk:
-                chunks.append(" ".join(current_chunk))
-            current_chunk = [text]
-            current_size = text_size
-        else:
-            current_chunk.append(text)
-            current_size += text_size
-    
-    if current_chunk:
-        chunks.append(" ".join(current_chunk))
-    
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from src.crud.sqlite_cache import SQLiteCache
+from src.generators.token_packer import SEPARATOR, count_tokens, pack_texts
+from src.llm.gateway import Priority, get_gateway
+
+logger = logging.getLogger(__name__)
+
+_cache: Optional[SQLiteCache] = None
+_cache_lock = threading.Lock()
+
+SUMMARY_PROMPT = "Summarize the following {source_name} data:\n\n{chunk}"
+COMBINE_PROMPT = "Combine these summaries into a coherent whole:\n\n{chunk}"
+CONDENSE_PROMPT = "Condense this summary to its key points:\n\n{chunk}"
+# Bump when the prompts change so cached chunk summaries are regenerated
+SUMMARY_PROMPT_VERSION = "1"
+SUMMARY_UNAVAILABLE = "(Summary unavailable due to error)"
+# Expected completion size, charged to the tokens-per-minute budget with the prompt
+SUMMARY_COMPLETION_TOKENS = 500
+
+def chunk_text(text_list: List[str], max_chunk_size: Optional[int] = None, overhead_tokens: int = 0) -> List[str]:
+    """Pack text into chunks that fill, but never exceed, a token budget."""
+    chunks, stats = pack_texts(
+        text_list,
+        max_chunk_size or config.SUMMARY_MAX_TOKENS,
+        overhead_tokens=overhead_tokens,
+        model=config.SUMMARY_MODEL,
+    )
+    logger.info(
+        f"Packed {len(text_list)} texts into {stats['chunks']} chunks "
+        f"(fill ratio {stats['fill_ratio']}, {stats['split_texts']} oversized texts split)"
+    )
     return chunks
 
-def generate_summary(text_list: List[str], source_name: str, max_retries: int = 3) -> str:
-    """Generate a summary with rate limit handling and retries."""
-    llm = ChatOpenAI(model_name="gpt-4", temperature=0.7, openai_api_key=config.OPEN_API_KEY)
-    
-    # Split text into manageable chunks
-    chunks = chunk_text(text_list)
-    summaries = []
-    
-    for chunk in chunks:
-        retries = 0
-        while retries < max_retries:
-            try:
-                prompt = f"Summarize the following {source_name} data:\n\n{chunk}"
-                summary = llm.predict(prompt)
-                summaries.append(summary)
-                break
-            except Exception as e:
-                if "rate_limit_exceeded" in str(e):
-                    retries += 1
-                    if retries < max_retries:
-                        wait_time = 20 ** retries  # Exponential backoff
-                        print(f"Rate limit hit, waiting {wait_time} seconds before retry...")
-                        time.sleep(wait_time)
-                    else:
-                        print(f"Max retries reached for chunk. Skipping...")
-                        summaries.append("(Summary unavailable due to rate limits)")
-                else:
-                    print(f"Error generating summary: {e}")
-                    summaries.append("(Summary unavailable due to error)")
-                    break
-    
+def _overhead(template: str, **kwargs) -> int:
+    """Tokens a prompt template adds around its chunk."""
+    return count_tokens(template.format(chunk="", **kwargs), config.SUMMARY_MODEL)
+
+def _summarize(llm, prompt: str, fallback: str = SUMMARY_UNAVAILABLE) -> str:
+    """Run one summary call through the shared gateway at batch priority."""
+    try:
+        return get_gateway().call(
+            "summary",
+            lambda: llm.invoke(prompt).content,
+            priority=Priority.BATCH,
+            tokens=count_tokens(prompt, config.SUMMARY_MODEL) + SUMMARY_COMPLETION_TOKENS,
+        )
+    except Exception as e:
+        logger.error(f"Error generating summary: {e}")
+        return fallback
+
+def _tree_reduce(llm, summaries: List[str], executor: ThreadPoolExecutor, max_chunk_size: int) -> str:
+    """
+    Combine partial summaries level by level so no single call exceeds the context.
+
+    Each level packs the summaries into groups that fit max_chunk_size tokens and
+    combines the groups concurrently, until one group remains for the final call.
+    When no two summaries fit a group together, each is condensed on its own
+    first, so the next level can combine them without exceeding the budget.
+    """
+    overhead = _overhead(COMBINE_PROMPT)
+    groups = summaries
+    while len(summaries) > 1:
+        groups = chunk_text(summaries, max_chunk_size, overhead)
+        if len(groups) == 1:
+            break
+        if len(groups) >= len(summaries):
+            size = sum(count_tokens(summary, config.SUMMARY_MODEL) for summary in summaries)
+            prompts = [CONDENSE_PROMPT.format(chunk=group) for group in groups]
+            condensed = list(executor.map(lambda prompt: _summarize(llm, prompt), prompts))
+            if SUMMARY_UNAVAILABLE in condensed or sum(count_tokens(summary, config.SUMMARY_MODEL) for summary in condensed) >= size:
+                logger.warning("Partial summaries could not be condensed enough to combine them")
+                return " ".join(summaries)
+            summaries = condensed
+            continue
+        prompts = [COMBINE_PROMPT.format(chunk=group) for group in groups]
+        summaries = list(executor.map(lambda prompt: _summarize(llm, prompt), prompts))
+
+    if len(summaries) == 1:
+        return summaries[0]
+    # If combining fails, the partial summaries are still better than nothing
+    return _summarize(llm, COMBINE_PROMPT.format(chunk=groups[0]), fallback=" ".join(summaries))
+
+def _get_cache() -> SQLiteCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = SQLiteCache(config.SUMMARY_CACHE_PATH, "chunk_summaries")
+        return _cache
+
+def _chunk_key(rolling_key: str, source_name: str, chunk: str) -> str:
+    """Cache key for a chunk summary; changes with the model and prompt version."""
+    digest = hashlib.sha256(
+        f"{config.SUMMARY_MODEL}\x00{SUMMARY_PROMPT_VERSION}\x00{source_name}\x00{chunk}".encode("utf-8")
+    ).hexdigest()
+    return f"chunk:{rolling_key}:{digest}"
+
+def _text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+def _members(rolling_key: str, key: str, value: Dict[str, Any]) -> Dict[str, str]:
+    """Source ID -> content hash of every source a cached partial covers."""
+    if "sources" in value:
+        return value["sources"]
+    # Partials cached before sources could share a chunk carry their one source in the key
+    legacy_prefix = f"chunk:{rolling_key}:source:"
+    if key.startswith(legacy_prefix):
+        return {key[len(legacy_prefix):].rsplit(":", 1)[0]: ""}
+    return {}
+
+def _pack(text_list: List[str], sources: Optional[List[Optional[str]]], max_chunk_size: int,
+          overhead_tokens: int) -> List[Tuple[str, Dict[str, Optional[str]]]]:
+    """
+    (chunk, text of each source in it) pairs.
+
+    Sources are packed whole, several to a chunk, so many short Slack messages
+    still take few summary calls. A source too large for one chunk is split
+    into chunks of its own, where its text is given as None.
+    """
+    if sources is None:
+        return [(chunk, {}) for chunk in chunk_text(text_list, max_chunk_size, overhead_tokens)]
+    by_source: Dict[Optional[str], List[str]] = {}
+    for source, text in zip(sources, text_list):
+        by_source.setdefault(source, []).append(text)
+    untagged = by_source.pop(None, [])
+    chunks = [(chunk, {}) for chunk in chunk_text(untagged, max_chunk_size, overhead_tokens)] if untagged else []
+
+    budget = max_chunk_size - overhead_tokens
+    separator_tokens = count_tokens(SEPARATOR, config.SUMMARY_MODEL)
+    group: Dict[str, Optional[str]] = {}
+    group_tokens = 0
+    for source, texts in by_source.items():
+        text = SEPARATOR.join(texts)
+        tokens = count_tokens(text, config.SUMMARY_MODEL)
+        if tokens > budget:
+            packed, _ = pack_texts(texts, max_chunk_size, overhead_tokens=overhead_tokens, model=config.SUMMARY_MODEL)
+            chunks.extend((chunk, {source: None}) for chunk in packed)
+            continue
+        if group and group_tokens + separator_tokens + tokens > budget:
+            chunks.append((SEPARATOR.join(group.values()), group))
+            group, group_tokens = {}, 0
+        group_tokens += tokens + (separator_tokens if group else 0)
+        group[source] = text
+    if group:
+        chunks.append((SEPARATOR.join(group.values()), group))
+    logger.info(f"Packed {len(text_list)} texts from {len(by_source)} sources into {len(chunks)} chunks")
+    return chunks
+
+def summary_sources(rolling_key: str) -> List[str]:
+    """IDs of the sources covered by the cached partials of a rolling summary."""
+    sources: Dict[str, None] = {}
+    for key, value in _get_cache().items(f"chunk:{rolling_key}:"):
+        sources.update(dict.fromkeys(_members(rolling_key, key, value)))
+    return list(sources)
+
+def remove_from_summary(rolling_key: str, sources: Iterable[str]) -> int:
+    """
+    Drop the cached partials of sources that no longer exist, e.g. deleted pages or Slack messages.
+
+    The other sources packed into a dropped partial are summarized again
+    from the text stored with it, so they stay covered.
+
+    Returns:
+        Number of partials removed
+    """
+    removed = set(sources)
+    if not removed:
+        return 0
+    cache = _get_cache()
+    keys = []
+    survivors: Dict[str, Dict[str, str]] = {}
+    for key, value in cache.items(f"chunk:{rolling_key}:"):
+        if removed.isdisjoint(_members(rolling_key, key, value)):
+            continue
+        keys.append(key)
+        for source, text in value.get("texts", {}).items():
+            if source not in removed:
+                survivors.setdefault(value["source_name"], {})[source] = text
+    if keys:
+        cache.delete_many(keys)
+    for source_name, texts in survivors.items():
+        add_to_summary(list(texts.values()), source_name, rolling_key, sources=list(texts))
+    return len(keys)
+
+def add_to_summary(
+    text_list: List[str],
+    source_name: str,
+    rolling_key: Optional[str] = None,
+    max_concurrency: Optional[int] = None,
+    max_chunk_size: Optional[int] = None,
+    sources: Optional[List[Optional[str]]] = None,
+) -> int:
+    """
+    Summarize new texts into the cached partials of a rolling summary.
+
+    Lets a caller feed a large sync in batches and combine once at the end
+    with generate_summary, instead of holding every text in memory.
+
+    Texts from a source that changes over time, such as a Confluence page or
+    an editable Slack message, can be tagged with its ID. Each partial then
+    records the sources it covers. A source sent again unchanged is skipped;
+    a changed one replaces every partial it was in, and the other sources of
+    those partials are summarized again with it, so each source is covered
+    once, by its current content.
+
+    Args:
+        text_list: New texts to summarize
+        source_name: Name used in the prompt, e.g. "Slack"
+        rolling_key: Identifies the summary stream, defaults to source_name
+        max_concurrency: Parallel summary calls, defaults to SUMMARY_MAX_CONCURRENCY
+        max_chunk_size: Token budget per request, defaults to SUMMARY_MAX_TOKENS
+        sources: Source ID of each text, e.g. its Confluence page ID or Slack message source ID
+
+    Returns:
+        Number of chunk summaries generated
+    """
+    max_chunk_size = max_chunk_size or config.SUMMARY_MAX_TOKENS
+    rolling_key = rolling_key or source_name
+    cache = _get_cache()
+    evicted = cache.evict_created_before(config.SUMMARY_WINDOW_DAYS * 86400)
+    if evicted:
+        logger.info(f"Evicted {evicted} cached summaries older than {config.SUMMARY_WINDOW_DAYS} days")
+    if not text_list:
+        return 0
+
+    outdated = []
+    if sources is not None:
+        by_source: Dict[str, List[str]] = {}
+        for source, text in zip(sources, text_list):
+            if source:
+                by_source.setdefault(source, []).append(text)
+        hashes = {source: _text_hash(SEPARATOR.join(texts)) for source, texts in by_source.items()}
+        unchanged, carried = set(), {}
+        for key, value in cache.items(f"chunk:{rolling_key}:"):
+            members = _members(rolling_key, key, value)
+            changed = [source for source in members if source in hashes and members[source] != hashes[source]]
+            unchanged.update(source for source in members if hashes.get(source) == members[source])
+            if changed:
+                # Partials of a source's previous version no longer describe it
+                outdated.append(key)
+                carried.update({
+                    source: text for source, text in value.get("texts", {}).items() if source not in hashes
+                })
+        texts_and_sources = [(text, source) for text, source in zip(text_list, sources) if source not in unchanged]
+        texts_and_sources += [(text, source) for source, text in carried.items()]
+        text_list = [text for text, _ in texts_and_sources]
+        sources = [source for _, source in texts_and_sources]
+        if unchanged:
+            logger.info(f"{rolling_key}: {len(unchanged)} sources unchanged since they were summarized")
+
+    # Split text into manageable chunks and keep only those not summarized before
+    chunks = _pack(text_list, sources, max_chunk_size, _overhead(SUMMARY_PROMPT, source_name=source_name))
+    pending = {}
+    for chunk, members in chunks:
+        key = _chunk_key(rolling_key, source_name, chunk)
+        if key not in pending and cache.get(key) is None:
+            pending[key] = (chunk, members)
+    logger.info(f"{rolling_key}: {len(chunks) - len(pending)} of {len(chunks)} chunk summaries reused from cache")
+
+    generated = 0
+    if pending:
+        llm = get_gateway().chat_model(model_name=config.SUMMARY_MODEL, temperature=0.7)
+        max_workers = max(1, min(max_concurrency or config.SUMMARY_MAX_CONCURRENCY, len(pending)))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            prompts = [SUMMARY_PROMPT.format(source_name=source_name, chunk=chunk) for chunk, _ in pending.values()]
+            for (key, (_, members)), summary in zip(
+                pending.items(), executor.map(lambda prompt: _summarize(llm, prompt), prompts)
+            ):
+                if summary == SUMMARY_UNAVAILABLE:
+                    continue
+                value = {"summary": summary}
+                if members:
+                    value["source_name"] = source_name
+                    value["sources"] = {
+                        source: _text_hash(text) if text is not None else hashes[source]
+                        for source, text in members.items()
+                    }
+                    # A shared partial keeps its texts so the others can be re-summarized if one source goes
+                    if len(members) > 1:
+                        value["texts"] = members
+                cache.set(key, value)
+                generated += 1
+
+    current = {_chunk_key(rolling_key, source_name, chunk) for chunk, _ in chunks}
+    outdated = [key for key in outdated if key not in current]
+    if outdated:
+        cache.delete_many(outdated)
+        logger.info(f"{rolling_key}: dropped {len(outdated)} chunk summaries of earlier versions")
+    return generated
+
+def generate_summary(
+    text_list: List[str],
+    source_name: str,
+    max_concurrency: Optional[int] = None,
+    max_chunk_size: Optional[int] = None,
+    rolling_key: Optional[str] = None,
+    sources: Optional[List[str]] = None,
+) -> str:
+    """
+    Generate a rolling summary; rate limits and retries are handled by the LLM gateway.
+
+    Chunks are summarized concurrently (map), then the partial summaries are
+    combined with a tree reduce that keeps every call within max_chunk_size
+    tokens (SUMMARY_MAX_TOKENS by default), prompt included.
+
+    Chunk summaries are memoized on disk, so only chunks not seen before reach
+    the LLM. The final summary is built from every cached partial for
+    rolling_key (source_name by default) that is still inside the summary
+    window, so a run with only new messages still covers the whole window.
+    Partials older than the window are evicted.
+
+    Args:
+        text_list: New texts to summarize, possibly already added with add_to_summary
+        source_name: Name used in the prompt, e.g. "Slack"
+        max_concurrency: Parallel summary calls, defaults to SUMMARY_MAX_CONCURRENCY
+        max_chunk_size: Token budget per request, defaults to SUMMARY_MAX_TOKENS
+        rolling_key: Identifies the summary stream, e.g. "slack_support"
+        sources: Source ID of each text, see add_to_summary
+
+    Returns:
+        The combined summary
+    """
+    max_chunk_size = max_chunk_size or config.SUMMARY_MAX_TOKENS
+    rolling_key = rolling_key or source_name
+    add_to_summary(text_list, source_name, rolling_key, max_concurrency, max_chunk_size, sources=sources)
+
+    cache = _get_cache()
+    partials = [value["summary"] for _, value in cache.items(f"chunk:{rolling_key}:")]
+    if not partials:
+        return "No summaries generated."
+
+    # An unchanged set of partials gives the same final summary as last time
+    final_key = "final:{}:{}".format(
+        rolling_key, hashlib.sha256("\x00".join(partials).encode("utf-8")).hexdigest()
+    )
+    cached = cache.get(final_key)
+    if cached is not None:
+        return cached["summary"]
+
     # Combine all chunk summaries
-    if summaries:
-        final_prompt = f"Combine these summaries into a coherent whole:\n\n{' '.join(summaries)}"
-        try:
-            return llm.predict(final_prompt)
-        except Exception as e:
-            print(f"Error combining summaries: {e}")
-            return " ".join(summaries)
-    else:
-        return "No summaries generated."
\ No newline at end of file
+    llm = get_gateway().chat_model(model_name=config.SUMMARY_MODEL, temperature=0.7)
+    max_workers = max(1, max_concurrency or config.SUMMARY_MAX_CONCURRENCY)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        summary = _tree_reduce(llm, partials, executor, max_chunk_size)
+    if summary != SUMMARY_UNAVAILABLE:
+        cache.set(final_key, {"summary": summary})
+    return summary
@@ -1,16 +1,30 @@
 from langchain.chains.combine_documents import create_stuff_documents_chain
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langchain_openai import ChatOpenAI
 from langchain_core.messages import HumanMessage
-from settings import config
+from src.crud.hybrid_search import hybrid_search
+from src.generators.token_packer import count_tokens
+from src.llm.gateway import Priority, get_gateway
 
 
-def support_answer_generator(question, vector_db):
-    """Generates an answer based on retrieved documents from the vector database."""
-    
-    chat_model = ChatOpenAI(model_name="gpt-4", temperature=0.3, openai_api_key=config.OPEN_API_KEY)
+def support_answer_generator(question, vector_db, answer_cache=None):
+    """
+    Generates an answer based on retrieved documents from the vector database.
+
+    If an answer_cache is given, answers to similar questions are reused until
+    the stored documents change.
+    """
+    if answer_cache is not None:
+        return answer_cache.get_or_compute(
+            "support_answer", question, lambda: _generate_answer(question, vector_db)
+        )
+    return _generate_answer(question, vector_db)
+
+
+def _generate_answer(question, vector_db):
+    gateway = get_gateway()
+    chat_model = gateway.chat_model(model_name="gpt-4", temperature=0.3)
     
-    docs = vector_db.as_retriever(k=4).invoke(question)
+    docs = hybrid_search(question, vector_db, k=4)
 
     system_prompt = """
     Answer the user's question based on the provided context.
@@ -29,7 +43,13 @@ def support_answer_generator(question, vector_db):
 
     document_chain = create_stuff_documents_chain(chat_model, prompt_template)
 
-    return document_chain.invoke({
-        "context": docs,
-        "messages": [HumanMessage(content=question)],
-    })
+    context_tokens = sum(count_tokens(doc.page_content) for doc in docs)
+    return gateway.call(
+        "support_answer",
+        lambda: document_chain.invoke({
+            "context": docs,
+            "messages": [HumanMessage(content=question)],
+        }),
+        priority=Priority.INTERACTIVE,
+        tokens=count_tokens(system_prompt + question) + context_tokens + 500,
+    )
@@ -0,0 +1,114 @@
+import logging
+from functools import lru_cache
+from typing import Any, Dict, List, Tuple
+
+import tiktoken
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = "gpt-4"
+SEPARATOR = "\n"
+
+
+class _ApproximateEncoding:
+    """Stand-in when the tokenizer files cannot be loaded: ~4 characters per token."""
+
+    def encode(self, text: str, **kwargs) -> List[str]:
+        return [text[i:i + 4] for i in range(0, len(text), 4)]
+
+    def decode(self, tokens: List[str]) -> str:
+        return "".join(tokens)
+
+
+@lru_cache(maxsize=None)
+def get_encoding(model: str = DEFAULT_MODEL):
+    """Return the tiktoken encoding for a model, falling back to cl100k_base."""
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        # tiktoken downloads its BPE files on first use, which fails offline
+        logger.warning(f"Tokenizer for {model} unavailable, approximating token counts: {e}")
+        return _ApproximateEncoding()
+
+
+def count_tokens(text: str, model: str = DEFAULT_MODEL) -> int:
+    """Count the tokens a model sees for the given text."""
+    return len(get_encoding(model).encode(text, disallowed_special=()))
+
+
+def _split_tokens(tokens: List, size: int) -> List[List]:
+    return [tokens[i:i + size] for i in range(0, len(tokens), size)]
+
+
+def pack_texts(
+    texts: List[str],
+    max_tokens: int,
+    overhead_tokens: int = 0,
+    model: str = DEFAULT_MODEL,
+) -> Tuple[List[str], Dict[str, Any]]:
+    """
+    Pack texts into as few chunks as possible within a token budget.
+
+    Texts are kept whole and in order where they fit; a text larger than the
+    budget on its own is split on token boundaries. Each chunk leaves room for
+    ``overhead_tokens`` of prompt around it.
+
+    Args:
+        texts: Texts to pack, e.g. Slack messages or page contents
+        max_tokens: Token budget for a whole request (prompt overhead plus chunk)
+        overhead_tokens: Tokens used by the prompt template around each chunk
+        model: Model whose tokenizer is used for counting
+
+    Returns:
+        (chunks, stats) where stats has the chunk count, split texts and fill ratio
+
+    Raises:
+        ValueError: If the overhead leaves no room for content
+    """
+    budget = max_tokens - overhead_tokens
+    if budget <= 0:
+        raise ValueError(f"Prompt overhead of {overhead_tokens} tokens leaves no room in {max_tokens}")
+
+    encoding = get_encoding(model)
+    separator_tokens = len(encoding.encode(SEPARATOR))
+    chunks: List[str] = []
+    chunk_tokens: List[int] = []
+    current: List[str] = []
+    current_size = 0
+    split_texts = 0
+
+    def flush():
+        nonlocal current, current_size
+        if current:
+            chunks.append(SEPARATOR.join(current))
+            chunk_tokens.append(current_size)
+        current, current_size = [], 0
+
+    for text in texts:
+        if not text:
+            continue
+        tokens = encoding.encode(text, disallowed_special=())
+        pieces = [(text, len(tokens))]
+        if len(tokens) > budget:
+            split_texts += 1
+            pieces = [(encoding.decode(part), len(part)) for part in _split_tokens(tokens, budget)]
+        for piece, size in pieces:
+            cost = size + (separator_tokens if current else 0)
+            if current and current_size + cost > budget:
+                flush()
+                cost = size
+            current.append(piece)
+            current_size += cost
+    flush()
+
+    stats = {
+        "chunks": len(chunks),
+        "split_texts": split_texts,
+        "content_tokens": sum(chunk_tokens),
+        "budget_tokens": budget,
+        "fill_ratio": round(sum(chunk_tokens) / (budget * len(chunks)), 3) if chunks else 0.0,
+    }
+    return chunks, stats
@@ -0,0 +1,351 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import random
+import threading
+import time
+from enum import IntEnum
+from typing import Any, Awaitable, Callable, Dict, List, Optional, TypeVar
+
+import httpx
+import openai
+from langchain_openai import ChatOpenAI
+from settings import config
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# How often async callers re-check the queue; threads wake them by notifying a condition they cannot wait on
+ASYNC_POLL_SECONDS = 0.02
+
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APIConnectionError,
+    openai.APITimeoutError,
+    openai.InternalServerError,
+)
+
+
+class Priority(IntEnum):
+    """Scheduling classes; lower values are served first when capacity is short."""
+    INTERACTIVE = 0
+    NORMAL = 1
+    BATCH = 2
+
+
+class LLMGatewayError(Exception):
+    """Raised when an LLM call still fails after all retries."""
+    pass
+
+
+class TokenBucket:
+    """Per-minute budget that refills continuously; a rate of 0 means unlimited."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.tokens = per_minute
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.capacity / 60)
+        self.updated = now
+
+    def delay(self, amount: float) -> float:
+        """Seconds until ``amount`` can be taken, 0 if it is available now."""
+        if not self.capacity:
+            return 0.0
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) * 60 / self.capacity
+
+    def take(self, amount: float) -> None:
+        if self.capacity:
+            self.tokens -= min(amount, self.capacity)
+
+
+class RateLimit:
+    """
+    Request and token budgets of one OpenAI rate-limit group, with its own
+    priority queue of waiting callers and its own rate-limit pause.
+    """
+
+    def __init__(self, rpm_limit: float, tpm_limit: float):
+        self.requests = TokenBucket(rpm_limit)
+        self.tokens = TokenBucket(tpm_limit)
+        self.waiters: List[tuple] = []
+        self.paused_until = 0.0
+
+
+class LLMGateway:
+    """
+    Process-wide entry point for OpenAI calls.
+
+    Every module gets its clients from here, so they share one HTTP connection
+    pool, and runs its calls through ``call``/``acall``, which:
+
+    - waits for request and token budgets (RPM/TPM token buckets), serving
+      waiting callers by priority so interactive support beats batch summaries;
+      chat completions and embeddings have separate budgets, as OpenAI limits
+      each model separately, so a large embedding batch cannot drain the
+      tokens /support needs,
+    - retries rate limits and transient errors with jittered exponential
+      backoff, honouring Retry-After and pausing every caller meanwhile,
+    - records requests, tokens, retries and queue time per caller.
+
+    The underlying clients are built with ``max_retries=0`` so retries only
+    happen here.
+    """
+
+    def __init__(
+        self,
+        rpm_limit: Optional[int] = None,
+        tpm_limit: Optional[int] = None,
+        embedding_rpm_limit: Optional[int] = None,
+        embedding_tpm_limit: Optional[int] = None,
+        max_retries: Optional[int] = None,
+        backoff_base: Optional[float] = None,
+        backoff_max: Optional[float] = None,
+    ):
+        self.limits: Dict[str, RateLimit] = {
+            "chat": RateLimit(
+                config.LLM_RPM_LIMIT if rpm_limit is None else rpm_limit,
+                config.LLM_TPM_LIMIT if tpm_limit is None else tpm_limit,
+            ),
+            "embeddings": RateLimit(
+                config.EMBEDDING_RPM_LIMIT if embedding_rpm_limit is None else embedding_rpm_limit,
+                config.EMBEDDING_TPM_LIMIT if embedding_tpm_limit is None else embedding_tpm_limit,
+            ),
+        }
+        self.max_retries = config.LLM_MAX_RETRIES if max_retries is None else max_retries
+        self.backoff_base = backoff_base or config.LLM_BACKOFF_BASE
+        self.backoff_max = backoff_max or config.LLM_BACKOFF_MAX
+
+        limits = httpx.Limits(
+            max_connections=config.OPENAI_MAX_CONNECTIONS,
+            max_keepalive_connections=config.OPENAI_MAX_CONNECTIONS,
+        )
+        self.http_client = httpx.Client(limits=limits, timeout=config.OPENAI_TIMEOUT)
+        self.http_async_client = httpx.AsyncClient(limits=limits, timeout=config.OPENAI_TIMEOUT)
+        self.client = openai.OpenAI(
+            api_key=config.OPEN_API_KEY,
+            base_url=config.OPENAI_BASE_URL,
+            http_client=self.http_client,
+            max_retries=0,
+        )
+
+        self._cond = threading.Condition()
+        self._sequence = itertools.count()
+        self._usage: Dict[str, Dict[str, float]] = {}
+
+    def chat_model(self, **kwargs) -> ChatOpenAI:
+        """Build a LangChain chat model on the shared connection pools."""
+        return ChatOpenAI(
+            openai_api_key=config.OPEN_API_KEY,
+            base_url=config.OPENAI_BASE_URL,
+            http_client=self.http_client,
+            http_async_client=self.http_async_client,
+            max_retries=0,
+            **kwargs,
+        )
+
+    def _record(self, caller: str, **deltas: float) -> None:
+        with self._cond:
+            usage = self._usage.setdefault(caller, {
+                "requests": 0, "tokens": 0, "retries": 0, "rate_limited": 0, "errors": 0, "queue_seconds": 0.0,
+            })
+            for key, value in deltas.items():
+                usage[key] += value
+
+    def _ready_in(self, limit: RateLimit, ticket, tokens: int) -> Optional[float]:
+        """
+        Seconds until the call holding ticket may start, or None while other
+        callers are ahead of it. At 0 its budgets have been taken. Needs _cond.
+        """
+        if limit.waiters[0] != ticket:
+            return None
+        wait = max(
+            limit.paused_until - time.monotonic(),
+            limit.requests.delay(1),
+            limit.tokens.delay(tokens),
+        )
+        if wait > 0:
+            return wait
+        limit.requests.take(1)
+        limit.tokens.take(tokens)
+        return 0.0
+
+    def _leave(self, limit: RateLimit, ticket) -> None:
+        limit.waiters.remove(ticket)
+        heapq.heapify(limit.waiters)
+        self._cond.notify_all()
+
+    def _acquire(self, limit: RateLimit, priority: Priority, tokens: int) -> float:
+        """Block until this call may start; return the seconds spent waiting."""
+        start = time.monotonic()
+        ticket = (int(priority), next(self._sequence))
+        with self._cond:
+            heapq.heappush(limit.waiters, ticket)
+            try:
+                while True:
+                    wait = self._ready_in(limit, ticket, tokens)
+                    if wait == 0:
+                        return time.monotonic() - start
+                    self._cond.wait(wait)
+            finally:
+                self._leave(limit, ticket)
+
+    async def _aacquire(self, limit: RateLimit, priority: Priority, tokens: int) -> float:
+        """
+        Async _acquire: waits in the same priority queue with asyncio.sleep,
+        so a queued call holds no executor thread.
+        """
+        start = time.monotonic()
+        ticket = (int(priority), next(self._sequence))
+        with self._cond:
+            heapq.heappush(limit.waiters, ticket)
+        try:
+            while True:
+                with self._cond:
+                    wait = self._ready_in(limit, ticket, tokens)
+                if wait == 0:
+                    return time.monotonic() - start
+                await asyncio.sleep(ASYNC_POLL_SECONDS if wait is None else min(wait, ASYNC_POLL_SECONDS))
+        finally:
+            with self._cond:
+                self._leave(limit, ticket)
+
+    def _backoff(self, limit: RateLimit, error: Exception, attempt: int) -> float:
+        """Delay before the next attempt: Retry-After if given, else jittered exponential."""
+        retry_after = None
+        response = getattr(error, "response", None)
+        if response is not None:
+            try:
+                retry_after = float(response.headers.get("retry-after"))
+            except (TypeError, ValueError):
+                retry_after = None
+        if retry_after is not None:
+            delay = retry_after + random.uniform(0, self.backoff_base)
+        else:
+            delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        if isinstance(error, openai.RateLimitError):
+            # The limit is shared, so hold back every caller of this group, not just this one
+            with self._cond:
+                limit.paused_until = max(limit.paused_until, time.monotonic() + delay)
+                self._cond.notify_all()
+        return delay
+
+    @staticmethod
+    def _used_tokens(result: Any, estimate: int) -> int:
+        """Actual token usage reported by the response, or the estimate."""
+        usage = getattr(result, "usage", None)
+        if usage is not None and getattr(usage, "total_tokens", None):
+            return usage.total_tokens
+        usage = getattr(result, "usage_metadata", None)
+        if usage and usage.get("total_tokens"):
+            return usage["total_tokens"]
+        return estimate
+
+    def call(
+        self,
+        caller: str,
+        func: Callable[[], T],
+        priority: Priority = Priority.NORMAL,
+        tokens: int = 1000,
+        limit: str = "chat",
+    ) -> T:
+        """
+        Run one LLM call under the shared rate limits.
+
+        Args:
+            caller: Name usage is recorded under, e.g. "summary"
+            func: Performs the request and returns its result
+            priority: Scheduling class of the call
+            tokens: Estimated prompt plus completion tokens, charged to the TPM budget
+            limit: Rate-limit group whose budgets the call uses, "chat" or "embeddings"
+
+        Returns:
+            Whatever func returns
+
+        Raises:
+            LLMGatewayError: If the call still fails after all retries
+        """
+        rate_limit = self.limits[limit]
+        for attempt in range(self.max_retries + 1):
+            waited = self._acquire(rate_limit, priority, tokens)
+            self._record(caller, requests=1, queue_seconds=waited)
+            try:
+                result = func()
+            except RETRYABLE_ERRORS as e:
+                rate_limited = isinstance(e, openai.RateLimitError)
+                self._record(caller, rate_limited=int(rate_limited))
+                if attempt == self.max_retries:
+                    self._record(caller, errors=1)
+                    raise LLMGatewayError(f"{caller} call failed after {attempt + 1} attempts: {e}") from e
+                delay = self._backoff(rate_limit, e, attempt)
+                logger.warning(f"{caller} call failed ({e.__class__.__name__}), retrying in {delay:.1f}s")
+                self._record(caller, retries=1)
+                time.sleep(delay)
+                continue
+            except Exception:
+                self._record(caller, errors=1)
+                raise
+            self._record(caller, tokens=self._used_tokens(result, tokens))
+            return result
+
+    async def acall(
+        self,
+        caller: str,
+        func: Callable[[], Awaitable[T]],
+        priority: Priority = Priority.NORMAL,
+        tokens: int = 1000,
+        limit: str = "chat",
+    ) -> T:
+        """Async variant of call; waiting for capacity never blocks the event loop or a thread."""
+        rate_limit = self.limits[limit]
+        for attempt in range(self.max_retries + 1):
+            waited = await self._aacquire(rate_limit, priority, tokens)
+            self._record(caller, requests=1, queue_seconds=waited)
+            try:
+                result = await func()
+            except RETRYABLE_ERRORS as e:
+                rate_limited = isinstance(e, openai.RateLimitError)
+                self._record(caller, rate_limited=int(rate_limited))
+                if attempt == self.max_retries:
+                    self._record(caller, errors=1)
+                    raise LLMGatewayError(f"{caller} call failed after {attempt + 1} attempts: {e}") from e
+                delay = self._backoff(rate_limit, e, attempt)
+                logger.warning(f"{caller} call failed ({e.__class__.__name__}), retrying in {delay:.1f}s")
+                self._record(caller, retries=1)
+                await asyncio.sleep(delay)
+                continue
+            except Exception:
+                self._record(caller, errors=1)
+                raise
+            self._record(caller, tokens=self._used_tokens(result, tokens))
+            return result
+
+    def usage(self) -> Dict[str, Dict[str, float]]:
+        """Return per-caller request, token, retry and queue-time totals."""
+        with self._cond:
+            return {
+                caller: {key: round(value, 3) if isinstance(value, float) else value for key, value in usage.items()}
+                for caller, usage in self._usage.items()
+            }
+
+
+_default_gateway: Optional[LLMGateway] = None
+_default_gateway_lock = threading.Lock()
+
+
+def get_gateway() -> LLMGateway:
+    """Return the process-wide gateway so every caller shares limits and pools."""
+    global _default_gateway
+    with _default_gateway_lock:
+        if _default_gateway is None:
+            _default_gateway = LLMGateway()
+        return _default_gateway
@@ -0,0 +1,18 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import settings.config as config
+
+
+def new_process_pool(max_workers: int) -> ProcessPoolExecutor:
+    """
+    Create a process pool for CPU-bound work such as HTML cleaning and file parsing.
+
+    The app runs Slack, scheduler and executor threads, and forking a threaded
+    process could copy a lock held by another thread into the child, so workers
+    are started with PROCESS_START_METHOD (forkserver by default) instead.
+    """
+    return ProcessPoolExecutor(
+        max_workers=max_workers,
+        mp_context=multiprocessing.get_context(config.PROCESS_START_METHOD),
+    )
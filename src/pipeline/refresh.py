@@ -0,0 +1,297 @@
+import logging
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from globals import vector_db
+from settings import config
+from src.crud.store import prune_sources, store_data_vectordb
+from src.data_loaders.confluence_fetcher import ConfluenceSync, fetch_confluence_data
+from src.data_loaders.slack_fetcher import fetch_slack_delta
+from src.data_preprocessors.preprocess_data import remove_bot_mentions
+from src.generators.summary_generator import add_to_summary, generate_summary, remove_from_summary, summary_sources
+from src.llm.gateway import get_gateway
+from src.publishers.confluence_appender import get_publisher
+
+logger = logging.getLogger(__name__)
+
+
+def _load_all_confluence_pages() -> Iterator[Any]:
+    """Full-space load (CONFLUENCE_INCREMENTAL_SYNC=false), started lazily like the sync."""
+    yield from fetch_confluence_data()
+
+
+class RefreshPipeline:
+    """
+    Periodic delta refresh of the knowledge base and the published summaries.
+
+    Each run fetches only what changed since the last one (Slack watermarks,
+    Confluence version sync), cleans it, upserts it into the vector store,
+    updates the rolling summaries and publishes them. Confluence pages stream
+    through cleaning, storing and summarizing in batches of REFRESH_BATCH_SIZE
+    documents, so a large first sync never sits in memory at once. A source
+    is recorded as synced only after its batch is stored. Deleted Confluence
+    pages, and Slack messages deleted within a reconciled window, are pruned
+    from the stores. Runs happen on a single
+    background worker and never overlap: a run requested while another is in
+    progress is skipped. Readers keep using the current index throughout,
+    since the store adds new chunks before removing stale ones.
+    """
+
+    def __init__(self, vector_db, interval_seconds: Optional[float] = None):
+        self.vector_db = vector_db
+        self.interval_seconds = interval_seconds or config.REFRESH_INTERVAL_MINUTES * 60
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="refresh")
+        self._run_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._current_stage: Optional[str] = None
+        self._runs = 0
+        self._skipped = 0
+        self._last_run: Optional[Dict[str, Any]] = None
+        self._next_run_at: Optional[float] = None
+
+    @contextmanager
+    def _stage(self, name: str, timings: Dict[str, float]):
+        self._current_stage = name
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            # Stages run once per batch, so their time adds up over the run
+            timings[name] = round(timings.get(name, 0.0) + time.perf_counter() - start, 3)
+        # Left set on failure so the run report can name the failing stage
+        self._current_stage = None
+
+    def run_once(self) -> Dict[str, Any]:
+        """
+        Run one refresh unless another is already in progress.
+
+        Returns:
+            The run report, or {"skipped": True} if a run was already active
+        """
+        if not self._run_lock.acquire(blocking=False):
+            self._skipped += 1
+            logger.info("Refresh already running, skipping this trigger")
+            return {"skipped": True}
+        report: Dict[str, Any] = {
+            "started": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "status": "running",
+            "stages": {},
+            "counts": {},
+        }
+        start = time.perf_counter()
+        try:
+            self._refresh(report)
+            report["status"] = "ok"
+        except Exception as e:
+            report["status"] = "failed"
+            report["error"] = f"{self._current_stage or 'unknown'} stage: {e}"
+            logger.error(f"Refresh failed: {report['error']}")
+            logger.error(traceback.format_exc())
+        finally:
+            report["seconds"] = round(time.perf_counter() - start, 3)
+            report["embedding_cache"] = self._embedding_cache_stats()
+            self._runs += 1
+            self._last_run = report
+            self._current_stage = None
+            self._run_lock.release()
+        logger.info(f"Refresh {report['status']} in {report['seconds']}s, stage timings: {report['stages']}")
+        if report["embedding_cache"]:
+            logger.info(f"Embedding cache stats: {report['embedding_cache']}")
+        return report
+
+    def _embedding_cache_stats(self) -> Optional[Dict[str, Any]]:
+        """Hit/miss totals of the vector store's embedding cache, if it has one."""
+        embeddings = getattr(self.vector_db, "embeddings", None)
+        if not hasattr(embeddings, "stats"):
+            return None
+        stats = embeddings.stats()
+        stats["hit_rate"] = round(stats["hit_rate"], 3)
+        return stats
+
+    def _refresh(self, report: Dict[str, Any]) -> None:
+        timings, counts = report["stages"], report["counts"]
+        counts.update({"confluence": 0, "combined": 0, "duplicates_removed": 0})
+        report["ingestion"] = {}
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            # Slack is fetched in the background while Confluence pages stream through
+            slack_future = executor.submit(
+                fetch_slack_delta,
+                config.SLACK_CHANNEL_ID,
+                [config.SLACK_BOT_TOKEN, config.SLACK_BOT_TOKEN_SUPPORT],
+            )
+            confluence_sync = ConfluenceSync() if config.CONFLUENCE_INCREMENTAL_SYNC else None
+            pages = confluence_sync.pages() if confluence_sync else _load_all_confluence_pages()
+            for confluence_docs in self._batches(pages, timings):
+                counts["confluence"] += len(confluence_docs)
+                self._ingest(confluence_docs, report)
+                with self._stage("summarize", timings):
+                    add_to_summary(
+                        [doc.page_content for doc in confluence_docs], "Confluence", rolling_key="confluence",
+                        sources=[str(doc.metadata.get("id", "")) or None for doc in confluence_docs],
+                    )
+                if confluence_sync:
+                    confluence_sync.commit()
+            if confluence_sync:
+                if config.CONFLUENCE_PRUNE_DELETED:
+                    with self._stage("fetch", timings):
+                        deleted = set(confluence_sync.deleted_pages())
+                    with self._stage("store", timings):
+                        self._add_ingestion(report, prune_sources(self.vector_db, deleted.__contains__))
+                    with self._stage("summarize", timings):
+                        remove_from_summary("confluence", deleted)
+                confluence_sync.finish()
+
+            with self._stage("fetch", timings):
+                slack_delta = slack_future.result()
+        slack_docs_general = slack_delta.messages[config.SLACK_BOT_TOKEN]
+        slack_docs_support = slack_delta.messages[config.SLACK_BOT_TOKEN_SUPPORT]
+        counts.update({"slack_general": len(slack_docs_general), "slack_support": len(slack_docs_support)})
+        self._ingest(slack_docs_general, report)
+        if slack_delta.reconciled:
+            with self._stage("store", timings):
+                self._add_ingestion(report, prune_sources(
+                    self.vector_db, lambda source_id: slack_delta.is_deleted(source_id, config.SLACK_BOT_TOKEN)
+                ))
+            with self._stage("summarize", timings):
+                # Support messages are only summarized, so their partials are checked directly
+                for rolling_key, token in [("slack_general", config.SLACK_BOT_TOKEN),
+                                           ("slack_support", config.SLACK_BOT_TOKEN_SUPPORT)]:
+                    remove_from_summary(rolling_key, [
+                        source for source in summary_sources(rolling_key) if slack_delta.is_deleted(source, token)
+                    ])
+        # Only now are the messages safe; a failed run fetches them again next time
+        slack_delta.commit()
+
+        with self._stage("summarize", timings):
+            summaries = self._summarize(slack_docs_general, slack_docs_support)
+
+        with self._stage("publish", timings):
+            report["published"] = get_publisher().publish_many(summaries)
+
+    def _batches(self, documents: Iterator[Any], timings: Dict[str, float]) -> Iterator[List[Any]]:
+        """Group a lazy stream of documents into batches, timing the wait as fetching."""
+        while True:
+            with self._stage("fetch", timings):
+                batch = list(islice(documents, config.REFRESH_BATCH_SIZE))
+            if not batch:
+                return
+            yield batch
+
+    def _ingest(self, documents: Iterable[Any], report: Dict[str, Any]) -> None:
+        """Clean one batch and upsert it into the vector store, adding to the run's counts."""
+        timings, counts = report["stages"], report["counts"]
+        with self._stage("preprocess", timings):
+            cleaned = [remove_bot_mentions(doc) for doc in documents]
+            counts["combined"] += len(cleaned)
+
+        # Near duplicates are dropped per chunk by the store, against everything stored so far
+        with self._stage("store", timings):
+            summary = store_data_vectordb(cleaned, self.vector_db)
+            counts["duplicates_removed"] += summary["chunks_deduplicated"]
+            self._add_ingestion(report, summary)
+
+    @staticmethod
+    def _add_ingestion(report: Dict[str, Any], summary: Dict[str, Any]) -> None:
+        for key, value in summary.items():
+            report["ingestion"][key] = round(report["ingestion"].get(key, 0) + value, 3)
+
+    def _summarize(self, slack_docs_general: List[Any], slack_docs_support: List[Any]) -> Dict[str, str]:
+        """Update the rolling summaries and return them keyed by Confluence page ID."""
+        # Partials are keyed by message, so an edit replaces its partial and a deletion can drop it
+        general_sources = [doc.metadata.get("source_id") for doc in slack_docs_general]
+        support_sources = [doc.metadata.get("source_id") for doc in slack_docs_support]
+        slack_docs_general = [doc.page_content for doc in slack_docs_general]
+        slack_docs_support = [doc.page_content for doc in slack_docs_support]
+        # The three summaries are independent, so generate them in parallel
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            slack_future = executor.submit(
+                generate_summary, slack_docs_general, "Slack", rolling_key="slack_general", sources=general_sources
+            )
+            # Confluence pages were added batch by batch during ingestion; this only combines them
+            confluence_future = executor.submit(generate_summary, [], "Confluence", rolling_key="confluence")
+            support_future = executor.submit(
+                generate_summary, slack_docs_support, "Slack", rolling_key="slack_support", sources=support_sources
+            )
+            slack_summary = slack_future.result()
+            confluence_summary = confluence_future.result()
+            slack_support_summary = support_future.result()
+        logger.info(f"LLM usage: {get_gateway().usage()}")
+
+        formatted_summary = f"""
+            <h3>Slack Summary</h3>
+            <p>{slack_summary}</p>
+            <h3>Confluence Summary</h3>
+            <p>{confluence_summary}</p>
+            """
+        formatted_support_summary = f"""
+                <h3>Slack Summary</h3>
+                <p>{slack_support_summary}</p>
+            """
+        return {
+            config.CONFLUENCE_SUMMARY_PAGE_ID: formatted_summary,
+            config.CONFLUENCE_SUPPORT_SUMMARY_PAGE_ID: formatted_support_summary,
+        }
+
+    def trigger(self) -> bool:
+        """
+        Queue a refresh on the background worker.
+
+        Returns:
+            False if a refresh is already running, True otherwise
+        """
+        if self._run_lock.locked():
+            self._skipped += 1
+            return False
+        self._executor.submit(self.run_once)
+        return True
+
+    def _loop(self) -> None:
+        while True:
+            self.trigger()
+            self._next_run_at = time.time() + self.interval_seconds
+            if self._stop.wait(self.interval_seconds):
+                return
+
+    def start(self) -> None:
+        """Start refreshing now and then every interval, in the background."""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._loop, name="refresh-scheduler", daemon=True)
+        self._thread.start()
+        logger.info(f"Refresh pipeline started, running every {self.interval_seconds}s")
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def status(self) -> Dict[str, Any]:
+        """Return whether a run is active, its stage, and the last run's report."""
+        return {
+            "running": self._run_lock.locked(),
+            "current_stage": self._current_stage,
+            "runs": self._runs,
+            "skipped_runs": self._skipped,
+            "interval_seconds": self.interval_seconds,
+            "next_run_in_seconds": round(max(0.0, self._next_run_at - time.time()), 1) if self._next_run_at else None,
+            "last_run": self._last_run,
+        }
+
+
+_default_pipeline: Optional[RefreshPipeline] = None
+_default_pipeline_lock = threading.Lock()
+
+
+def get_refresh_pipeline() -> RefreshPipeline:
+    """Return the process-wide pipeline so the scheduler and Slack share one instance."""
+    global _default_pipeline
+    with _default_pipeline_lock:
+        if _default_pipeline is None:
+            _default_pipeline = RefreshPipeline(vector_db)
+        return _default_pipeline
@@ -1,31 +1,140 @@
+import hashlib
+import logging
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional
+
 import settings.config as config
 from atlassian import Confluence
-from datetime import datetime
+from src.crud.sqlite_cache import SQLiteCache
 
-def append_to_confluence_page(summary, pageId):
-    confluence_url = config.CONFLUENCE_URL
-    confluence_user = config.CONFLUENCE_USERNAME
-    confluence_api_token = config.CONFLUENCE_API_KEY
-    page_id = pageId
+logger = logging.getLogger(__name__)
+
+SECTION_MARKER = re.compile(r"(?=<h3>Summary - \d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}</h3>)")
+
+
+def _split_sections(content: str) -> List[str]:
+    """Split a page body into its preamble and summary sections, newest first."""
+    return SECTION_MARKER.split(content)
+
+
+class ConfluencePublisher:
+    """
+    Publish summaries to Confluence pages without unbounded page growth.
+
+    One client (and its HTTP session) is reused for every publish. A summary
+    whose hash matches the last one published to a page is skipped without
+    touching Confluence. Each page keeps the ``max_sections`` newest summaries;
+    older sections are moved into a monthly archive child page.
+    """
+
+    def __init__(self, confluence: Optional[Confluence] = None, state_path: Optional[str] = None,
+                 max_sections: Optional[int] = None):
+        self.confluence = confluence or Confluence(
+            url=config.CONFLUENCE_URL,
+            username=config.CONFLUENCE_USERNAME,
+            password=config.CONFLUENCE_API_KEY,
+        )
+        self.state = SQLiteCache(state_path or config.CONFLUENCE_PUBLISH_STATE_PATH, "published_summaries")
+        self.max_sections = max_sections or config.CONFLUENCE_MAX_SECTIONS
+
+    def publish(self, summary: str, page_id: str) -> bool:
+        """
+        Prepend a summary to a page unless it was already published there.
 
-    confluence = Confluence(url=confluence_url, username=confluence_user, password=confluence_api_token)
+        Args:
+            summary: Summary HTML in Confluence storage format
+            page_id: ID of the page to update
 
-    page = confluence.get_page_by_id(page_id, expand="body.storage,version")
-    current_content = page["body"]["storage"]["value"]
+        Returns:
+            True if the page was updated, False if the summary was unchanged
+        """
+        digest = hashlib.sha256(summary.encode("utf-8")).hexdigest()
+        published = self.state.get(page_id)
+        if published and published["hash"] == digest:
+            logger.info(f"Summary for page {page_id} unchanged, skipping publish")
+            return False
 
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    new_summary = f"<h3>Summary - {timestamp}</h3><p>{summary}</p>"
+        page = self.confluence.get_page_by_id(page_id, expand="body.storage,version,space")
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        new_section = f"<h3>Summary - {timestamp}</h3><p>{summary}</p>"
 
-    updated_content = new_summary + current_content
+        preamble, *sections = _split_sections(page["body"]["storage"]["value"])
+        sections = [new_section] + sections
+        kept, overflow = sections[:self.max_sections], sections[self.max_sections:]
+        if overflow:
+            self._archive(page, overflow)
 
-    # Update the page
-    confluence.update_page(
-        page_id=page_id,
-        title=page["title"],
-        body=updated_content,
-        parent_id=None,
-        type="page",
-        representation="storage"
-    )
+        self.confluence.update_page(
+            page_id=page_id,
+            title=page["title"],
+            body=preamble + "".join(kept),
+            parent_id=None,
+            type="page",
+            representation="storage"
+        )
+        self.state.set(page_id, {"hash": digest, "published": timestamp})
+        logger.info(f"Summary published to page {page_id} at {timestamp} ({len(overflow)} sections archived)")
+        return True
 
-    print(f"Summary appended to Confluence at {timestamp}!")
\ No newline at end of file
+    def _archive(self, page: Dict, sections: List[str]) -> None:
+        """Prepend rotated sections to the page's archive child page for this month."""
+        title = f"{page['title']} - Archive {datetime.now().strftime('%Y-%m')}"
+        space = page["space"]["key"]
+        archive = self.confluence.get_page_by_title(space, title, expand="body.storage")
+        if archive:
+            self.confluence.update_page(
+                page_id=archive["id"],
+                title=title,
+                body="".join(sections) + archive["body"]["storage"]["value"],
+                type="page",
+                representation="storage"
+            )
+        else:
+            self.confluence.create_page(
+                space=space,
+                title=title,
+                body="".join(sections),
+                parent_id=page["id"],
+                type="page",
+                representation="storage"
+            )
+
+    def publish_many(self, summaries: Dict[str, str]) -> Dict[str, bool]:
+        """
+        Publish summaries to several pages concurrently over the shared client.
+
+        Args:
+            summaries: Mapping of page ID to summary
+
+        Returns:
+            Mapping of page ID to whether it was updated; failed pages map to False
+        """
+        def publish_one(page_id: str) -> bool:
+            try:
+                return self.publish(summaries[page_id], page_id)
+            except Exception as e:
+                logger.error(f"Failed to publish summary to page {page_id}: {e}")
+                return False
+
+        with ThreadPoolExecutor(max_workers=max(1, min(len(summaries), 4))) as executor:
+            return dict(zip(summaries, executor.map(publish_one, summaries)))
+
+
+_default_publisher: Optional[ConfluencePublisher] = None
+_default_publisher_lock = threading.Lock()
+
+
+def get_publisher() -> ConfluencePublisher:
+    """Return the process-wide publisher so the client and its session are reused."""
+    global _default_publisher
+    with _default_publisher_lock:
+        if _default_publisher is None:
+            _default_publisher = ConfluencePublisher()
+        return _default_publisher
+
+
+def append_to_confluence_page(summary, pageId):
+    return get_publisher().publish(summary, pageId)
@@ -1,30 +1,159 @@
+import logging
+import threading
+from typing import Callable, List, Optional, Tuple
+
+import google_auth_httplib2
+import httplib2
 from google.oauth2 import service_account
-from googleapiclient.discovery import build
+from googleapiclient import discovery_cache
+from googleapiclient.discovery import build_from_document
+from settings import config
+
+logger = logging.getLogger(__name__)
 
 GOOGLE_DOCS_SCOPES = ["https://www.googleapis.com/auth/documents", "https://www.googleapis.com/auth/drive.file"]
 SERVICE_ACCOUNT_FILE = "key.json"
+SHARE_PERMISSION = {"type": "anyone", "role": "writer"}
+# Google rejects batch requests with more than 100 calls
+BATCH_LIMIT = 100
 
-def upload_to_google_docs(title, content):
-    """Uploads blog content to Google Docs and returns a shareable link."""
 
-    credentials = service_account.Credentials.from_service_account_file(
-        SERVICE_ACCOUNT_FILE, scopes=GOOGLE_DOCS_SCOPES
-    )
+def _doc_link(doc_id: str) -> str:
+    return f"https://docs.google.com/document/d/{doc_id}/edit"
+
+
+class GoogleDocsPublisher:
+    """
+    Create shareable Google Docs with services that are built once.
+
+    Credentials and the discovery documents (the static copies bundled with
+    google-api-python-client, so no discovery request is made) are loaded
+    once. httplib2 connections are not thread-safe, so each thread gets its own
+    services over its own keep-alive connection, reused for every document it
+    publishes. ``upload_many`` creates several documents in three batch HTTP
+    requests instead of three requests per document.
+    """
+
+    def __init__(self, http_factory: Optional[Callable[[], httplib2.Http]] = None):
+        self._http_factory = http_factory or self._authorized_http
+        self._credentials = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._docs_discovery = discovery_cache.get_static_doc("docs", "v1")
+        self._drive_discovery = discovery_cache.get_static_doc("drive", "v3")
+
+    def _authorized_http(self) -> httplib2.Http:
+        with self._lock:
+            if self._credentials is None:
+                self._credentials = service_account.Credentials.from_service_account_file(
+                    SERVICE_ACCOUNT_FILE, scopes=GOOGLE_DOCS_SCOPES
+                )
+        return google_auth_httplib2.AuthorizedHttp(
+            self._credentials, http=httplib2.Http(timeout=config.GOOGLE_API_TIMEOUT)
+        )
+
+    def _services(self):
+        """Return this thread's services and resources, building them on first use."""
+        services = getattr(self._local, "services", None)
+        if services is None:
+            http = self._http_factory()
+            docs_service = build_from_document(self._docs_discovery, http=http)
+            drive_service = build_from_document(self._drive_discovery, http=http)
+            # Each resource accessor call rebuilds every method of the resource, so keep them
+            services = (docs_service, docs_service.documents(), drive_service, drive_service.permissions())
+            self._local.services = services
+        return services
+
+    def upload(self, title: str, content: str) -> str:
+        """Upload one document and return its shareable link."""
+        _, documents, _, permissions = self._services()
+
+        document = documents.create(body={"title": title}).execute()
+        doc_id = document["documentId"]
+
+        requests = [{"insertText": {"location": {"index": 1}, "text": content}}]
+        documents.batchUpdate(documentId=doc_id, body={"requests": requests}).execute()
+        permissions.create(fileId=doc_id, body=SHARE_PERMISSION).execute()
 
-    docs_service = build("docs", "v1", credentials=credentials)
-    drive_service = build("drive", "v3", credentials=credentials)
+        doc_link = _doc_link(doc_id)
+        logger.info(f"Google Doc created: {doc_link}")
+        return doc_link
 
-    document = docs_service.documents().create(body={"title": title}).execute()
-    doc_id = document["documentId"]
+    def upload_many(self, blogs: List[Tuple[str, str]]) -> List[Optional[str]]:
+        """
+        Upload several documents with batch HTTP requests.
 
-    requests = [{"insertText": {"location": {"index": 1}, "text": content}}]
-    docs_service.documents().batchUpdate(documentId=doc_id, body={"requests": requests}).execute()
+        One batch creates every document, then one Docs batch inserts the
+        content and one Drive batch shares them.
 
-    permission = {"type": "anyone", "role": "writer"}
-    drive_service.permissions().create(fileId=doc_id, body=permission).execute()
+        Args:
+            blogs: (title, content) pairs
 
-    # Generate Document Link
-    doc_link = f"https://docs.google.com/document/d/{doc_id}/edit"
+        Returns:
+            Shareable link per blog, in order; None where a step failed
+        """
+        if len(blogs) > BATCH_LIMIT:
+            return self.upload_many(blogs[:BATCH_LIMIT]) + self.upload_many(blogs[BATCH_LIMIT:])
+        docs_service, documents, drive_service, permissions = self._services()
+        doc_ids: List[Optional[str]] = [None] * len(blogs)
+        failed = set()
 
-    print(f"Google Doc created: {doc_link}")
-    return doc_link
+        def on_create(request_id, response, exception):
+            if exception is not None:
+                logger.error(f"Failed to create Google Doc {request_id}: {exception}")
+                return
+            doc_ids[int(request_id)] = response["documentId"]
+
+        def on_update(request_id, response, exception):
+            if exception is not None:
+                step, index = request_id.split(":")
+                logger.error(f"Failed to {step} Google Doc {index}: {exception}")
+                failed.add(int(index))
+
+        create_batch = docs_service.new_batch_http_request(callback=on_create)
+        for i, (title, _) in enumerate(blogs):
+            create_batch.add(documents.create(body={"title": title}), request_id=str(i))
+        create_batch.execute()
+
+        content_batch = docs_service.new_batch_http_request(callback=on_update)
+        share_batch = drive_service.new_batch_http_request(callback=on_update)
+        for i, doc_id in enumerate(doc_ids):
+            if doc_id is None:
+                continue
+            requests = [{"insertText": {"location": {"index": 1}, "text": blogs[i][1]}}]
+            content_batch.add(
+                documents.batchUpdate(documentId=doc_id, body={"requests": requests}),
+                request_id=f"fill:{i}",
+            )
+            share_batch.add(
+                permissions.create(fileId=doc_id, body=SHARE_PERMISSION),
+                request_id=f"share:{i}",
+            )
+        if any(doc_ids):
+            content_batch.execute()
+            share_batch.execute()
+
+        links = [
+            _doc_link(doc_id) if doc_id is not None and i not in failed else None
+            for i, doc_id in enumerate(doc_ids)
+        ]
+        logger.info(f"Google Docs created in batch: {sum(link is not None for link in links)}/{len(blogs)}")
+        return links
+
+
+_default_publisher: Optional[GoogleDocsPublisher] = None
+_default_publisher_lock = threading.Lock()
+
+
+def get_google_docs_publisher() -> GoogleDocsPublisher:
+    """Return the process-wide publisher so credentials and services are reused."""
+    global _default_publisher
+    with _default_publisher_lock:
+        if _default_publisher is None:
+            _default_publisher = GoogleDocsPublisher()
+        return _default_publisher
+
+
+def upload_to_google_docs(title, content):
+    """Uploads blog content to Google Docs and returns a shareable link."""
+    return get_google_docs_publisher().upload(title, content)
@@ -0,0 +1,66 @@
+import logging
+import threading
+import time
+from typing import Optional
+
+import settings.config as config
+
+logger = logging.getLogger(__name__)
+
+
+class SlackStreamUpdater:
+    """
+    Stream growing text into a single Slack message.
+
+    The message is posted once and then edited with ``chat_update``. Edits are
+    throttled to at most one per ``min_interval`` seconds to stay inside Slack's
+    rate limits; the latest text is always sent by ``finish``.
+    """
+
+    def __init__(self, client, channel: str, min_interval: Optional[float] = None):
+        self.client = client
+        self.channel = channel
+        self.min_interval = min_interval if min_interval is not None else config.SLACK_STREAM_UPDATE_INTERVAL
+        self.ts = None
+        self._last_update = 0.0
+        self._last_text = None
+        self._lock = threading.Lock()
+
+    def start(self, text: str = "_Generating..._") -> None:
+        """Post the placeholder message that later updates will edit."""
+        response = self.client.chat_postMessage(channel=self.channel, text=text)
+        self.ts = response["ts"]
+        self._last_text = text
+        self._last_update = time.monotonic()
+
+    def update(self, text: str) -> None:
+        """Edit the message with the latest text unless an edit was sent too recently."""
+        with self._lock:
+            if self.ts is None or text == self._last_text:
+                return
+            if time.monotonic() - self._last_update < self.min_interval:
+                return
+            self._send(text)
+
+    def finish(self, text: str) -> None:
+        """Send the final text regardless of throttling."""
+        with self._lock:
+            if self.ts is None:
+                self.client.chat_postMessage(channel=self.channel, text=text)
+                return
+            for attempt in range(3):
+                if text == self._last_text or self._send(text):
+                    return
+                time.sleep(self.min_interval * (attempt + 1))
+            logger.error("Giving up on final update of streamed Slack message")
+
+    def _send(self, text: str) -> bool:
+        self._last_update = time.monotonic()
+        try:
+            self.client.chat_update(channel=self.channel, ts=self.ts, text=text)
+        except Exception as e:
+            # Most likely rate limited; a later update will catch up
+            logger.warning(f"Failed to update streamed Slack message: {e}")
+            return False
+        self._last_text = text
+        return True
@@ -1,10 +1,31 @@
-from fastapi import APIRouter, HTTPException
+import asyncio
+from fastapi import APIRouter, HTTPException, Request
 from pydantic import BaseModel
+from settings import config
 from src.chatbot.support_bot import SupportBot
-from typing import Dict
+from globals import answer_cache
+from typing import Awaitable, Dict, Optional, TypeVar
 
 router = APIRouter()
-support_bot = SupportBot()
+support_bot = SupportBot(answer_cache=answer_cache)
+
+T = TypeVar("T")
+
+async def run_until_disconnected(request: Request, awaitable: Awaitable[T]) -> T:
+    """
+    Await a coroutine, cancelling it if the HTTP client goes away first.
+
+    Raises:
+        HTTPException: 499 if the client disconnected before the result was ready
+    """
+    task = asyncio.ensure_future(awaitable)
+    while True:
+        done, _ = await asyncio.wait({task}, timeout=config.DISCONNECT_POLL_INTERVAL)
+        if done:
+            return task.result()
+        if await request.is_disconnected():
+            task.cancel()
+            raise HTTPException(status_code=499, detail="Client disconnected")
 
 class ChatRequest(BaseModel):
     message: str
@@ -15,20 +36,31 @@ class ChatResponse(BaseModel):
     session_id: str
 
 @router.post("/support/chat", response_model=ChatResponse)
-async def chat(request: ChatRequest):
+async def chat(payload: ChatRequest, request: Request):
     try:
-        response = support_bot.get_response(request.message)
+        session_id = payload.session_id or "default"
+        response = await run_until_disconnected(request, support_bot.aget_response(payload.message, session_id))
         return ChatResponse(
             response=response,
-            session_id=request.session_id or "default"
+            session_id=session_id
         )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/support/clear")
-async def clear_history():
+async def clear_history(session_id: Optional[str] = None):
     try:
-        support_bot.clear_history()
+        support_bot.clear_history(session_id)
         return {"message": "Conversation history cleared successfully"}
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/support/stats")
+async def stats():
+    return {
+        "sessions": support_bot.sessions.stats(),
+        "answer_cache": support_bot.answer_cache.stats() if support_bot.answer_cache else None,
+        "llm_usage": support_bot.gateway.usage(),
+    } 
\ No newline at end of file